@@ -8,16 +8,24 @@ try:
     # For Docker deployment (files copied to /app)
     from endpoints.classify import classify_ticket
     from endpoints.resolve import resolve_query_api
+    from endpoints.resolve_stream import resolve_query_stream_api
     from endpoints.bulk_classify import bulk_classify
     from endpoints.bulk_classify_stream import bulk_classify_stream
     from endpoints.reports import generate_reports
+    from endpoints.metrics import get_metrics
+    from endpoints.tickets import list_tickets
+    from endpoints.bulk_jobs import submit_bulk_job, get_bulk_job, get_bulk_job_results, get_bulk_job_runner
 except ImportError:
     # For local development (from backend directory)
     from backend.endpoints.classify import classify_ticket
     from backend.endpoints.resolve import resolve_query_api
+    from backend.endpoints.resolve_stream import resolve_query_stream_api
     from backend.endpoints.bulk_classify import bulk_classify
     from backend.endpoints.bulk_classify_stream import bulk_classify_stream
     from backend.endpoints.reports import generate_reports
+    from backend.endpoints.metrics import get_metrics
+    from backend.endpoints.tickets import list_tickets
+    from backend.endpoints.bulk_jobs import submit_bulk_job, get_bulk_job, get_bulk_job_results, get_bulk_job_runner
 
 load_dotenv()
 
@@ -40,11 +48,20 @@ def health_check():
 
 app.add_url_rule("/classify", "classify_ticket", classify_ticket, methods=["POST"])
 app.add_url_rule("/resolve", "resolve_query_api", resolve_query_api, methods=["POST", "OPTIONS"])
+app.add_url_rule("/resolve_stream", "resolve_query_stream_api", resolve_query_stream_api, methods=["POST", "OPTIONS"])
 app.add_url_rule("/bulk_classify", "bulk_classify", bulk_classify, methods=["POST", "OPTIONS"])
 app.add_url_rule("/bulk_classify_stream", "bulk_classify_stream", bulk_classify_stream, methods=["POST", "OPTIONS"])
 app.add_url_rule("/reports", "generate_reports", generate_reports, methods=["POST", "OPTIONS"])
+app.add_url_rule("/metrics", "get_metrics", get_metrics, methods=["GET"])
+app.add_url_rule("/tickets", "list_tickets", list_tickets, methods=["GET"])
+app.add_url_rule("/bulk_jobs", "submit_bulk_job", submit_bulk_job, methods=["POST", "OPTIONS"])
+app.add_url_rule("/bulk_jobs/<job_id>", "get_bulk_job", get_bulk_job, methods=["GET"])
+app.add_url_rule("/bulk_jobs/<job_id>/results", "get_bulk_job_results", get_bulk_job_results, methods=["GET"])
 
 if __name__ == "__main__":
+    # Started here, not at import: chart workers and tools that import this
+    # module must not run jobs. Resumes jobs left unfinished by a previous run.
+    get_bulk_job_runner().start()
     port = int(os.environ.get("PORT", 5000))
     print(f"Starting Flask app on port {port}")
     print(f"PORT environment variable: {os.environ.get('PORT', 'not set')}")
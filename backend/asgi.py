@@ -0,0 +1,239 @@
+# Async serving mode: the same routes and payloads as api.py, served over ASGI.
+# Handlers await graph.ainvoke (async OpenAI clients underneath), so one worker
+# keeps many LLM round-trips in flight instead of one per thread.
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 5000
+import json
+import os
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+try:
+    from graph import arun_classification_only, arun_rag_graph, astream_rag_graph
+    from services.bulk_engine import aclassify_tickets, aclassify_tickets_as_completed
+    from services.data_loader import load_sample_tickets
+    from endpoints.resolve import format_resolution
+    from endpoints.resolve_stream import resolve_event
+    from endpoints.bulk_classify_stream import sse_event, ticket_event
+    from endpoints.reports import build_report, CHART_FORMAT, CHART_FORMATS
+    from endpoints.metrics import collect_metrics
+    from endpoints.tickets import ticket_page
+    from endpoints.bulk_jobs import create_job, job_status, job_results, get_bulk_job_runner
+except ImportError:
+    from backend.graph import arun_classification_only, arun_rag_graph, astream_rag_graph
+    from backend.services.bulk_engine import aclassify_tickets, aclassify_tickets_as_completed
+    from backend.services.data_loader import load_sample_tickets
+    from backend.endpoints.resolve import format_resolution
+    from backend.endpoints.resolve_stream import resolve_event
+    from backend.endpoints.bulk_classify_stream import sse_event, ticket_event
+    from backend.endpoints.reports import build_report, CHART_FORMAT, CHART_FORMATS
+    from backend.endpoints.metrics import collect_metrics
+    from backend.endpoints.tickets import ticket_page
+    from backend.endpoints.bulk_jobs import create_job, job_status, job_results, get_bulk_job_runner
+
+load_dotenv()
+
+async def _json_body(request: Request) -> dict:
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, ValueError):
+        return {}
+    return body if isinstance(body, dict) else {}
+
+async def health_check(request: Request):
+    return JSONResponse({"status": "healthy", "service": "customer-support-copilot-backend"})
+
+async def classify_ticket(request: Request):
+    data = await _json_body(request)
+    question = data.get("question", "")
+    if not question:
+        return JSONResponse({"error": "Question is required"}, status_code=400)
+
+    try:
+        result = await arun_classification_only(question)
+        result["classification"]["original_question"] = question
+        return JSONResponse({"classification": result["classification"]})
+    except Exception as e:
+        return JSONResponse({"error": f"Classification failed: {str(e)}"}, status_code=500)
+
+async def resolve_query_api(request: Request):
+    if request.method == "OPTIONS":
+        return Response("", status_code=200)
+
+    data = await _json_body(request)
+    classification_output = data.get("classification", {})
+    if not classification_output:
+        return JSONResponse({"error": "Classification data required"}, status_code=400)
+
+    try:
+        question = classification_output.get('original_question', '')
+        if not question:
+            return JSONResponse({"error": "Original question required for resolution"}, status_code=400)
+
+        result = await arun_rag_graph(question, classification=classification_output)
+        return JSONResponse(format_resolution(result, classification_output))
+    except Exception as e:
+        return JSONResponse({"error": f"Resolution failed: {str(e)}"}, status_code=500)
+
+async def resolve_query_stream_api(request: Request):
+    if request.method == "OPTIONS":
+        return Response("", status_code=200)
+
+    data = await _json_body(request)
+    classification_output = data.get("classification", {})
+    if not classification_output:
+        return JSONResponse({"error": "Classification data required"}, status_code=400)
+
+    question = classification_output.get('original_question', '')
+    if not question:
+        return JSONResponse({"error": "Original question required for resolution"}, status_code=400)
+
+    async def generate_stream():
+        try:
+            async for event in astream_rag_graph(question, classification=classification_output):
+                yield resolve_event(event, classification_output)
+        except Exception as e:
+            yield sse_event({'type': 'error', 'error': f"Resolution failed: {str(e)}"})
+
+    return StreamingResponse(
+        generate_stream(),
+        media_type='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'Connection': 'keep-alive',
+            'X-Accel-Buffering': 'no',
+        }
+    )
+
+async def _tickets_or_samples(request: Request):
+    payload = await _json_body(request)
+    tickets = payload.get("tickets", [])
+    if not tickets:
+        tickets = await run_in_threadpool(load_sample_tickets)
+    return tickets
+
+async def bulk_classify(request: Request):
+    if request.method == "OPTIONS":
+        return Response("", status_code=200)
+
+    tickets = await _tickets_or_samples(request)
+    if not tickets:
+        return JSONResponse({"error": "No tickets provided and no sample tickets found"}, status_code=400)
+
+    try:
+        results = []
+        for result in await aclassify_tickets(tickets):
+            result.pop("index", None)
+            results.append(result)
+        return JSONResponse({"results": results})
+    except Exception as e:
+        return JSONResponse({"error": f"Bulk classification failed: {str(e)}"}, status_code=500)
+
+async def bulk_classify_stream(request: Request):
+    if request.method == "OPTIONS":
+        return Response("", status_code=200)
+
+    tickets = await _tickets_or_samples(request)
+    if not tickets:
+        return JSONResponse({"error": "No tickets provided and no sample tickets found"}, status_code=400)
+
+    async def generate_stream():
+        yield sse_event({'type': 'start', 'total': len(tickets)})
+        async for result in aclassify_tickets_as_completed(tickets):
+            yield ticket_event(result, len(tickets))
+        yield sse_event({'type': 'complete'})
+
+    return StreamingResponse(
+        generate_stream(),
+        media_type='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'Connection': 'keep-alive',
+            'X-Accel-Buffering': 'no',
+        }
+    )
+
+async def generate_reports(request: Request):
+    if request.method == "OPTIONS":
+        return Response("", status_code=200)
+
+    try:
+        payload = await _json_body(request)
+        chart_format = payload.get("chart_format", CHART_FORMAT)
+        if chart_format not in CHART_FORMATS:
+            return JSONResponse({"error": f"chart_format must be one of {list(CHART_FORMATS)}"}, status_code=400)
+        # Report aggregation blocks; charts themselves render in the chart worker processes
+        report = await run_in_threadpool(build_report, payload.get("ticket_ids", []), chart_format)
+        if report is None:
+            return JSONResponse({"error": "No tickets found"}, status_code=400)
+        return JSONResponse(report)
+    except Exception as e:
+        return JSONResponse({"error": f"Report generation failed: {str(e)}"}, status_code=500)
+
+async def get_metrics(request: Request):
+    # Store stats query SQLite and take locks a bulk job or report may hold
+    return JSONResponse(await run_in_threadpool(collect_metrics))
+
+async def list_tickets(request: Request):
+    try:
+        page = await run_in_threadpool(ticket_page, request.query_params, request.query_params.getlist)
+    except ValueError:
+        return JSONResponse({"error": "offset and limit must be integers"}, status_code=400)
+    return JSONResponse(page)
+
+async def submit_bulk_job(request: Request):
+    if request.method == "OPTIONS":
+        return Response("", status_code=200)
+
+    payload = await _json_body(request)
+    body, status = await run_in_threadpool(create_job, payload.get("tickets", []))
+    return JSONResponse(body, status_code=status)
+
+async def get_bulk_job(request: Request):
+    body, status = await run_in_threadpool(job_status, request.path_params["job_id"])
+    return JSONResponse(body, status_code=status)
+
+async def get_bulk_job_results(request: Request):
+    body, status = await run_in_threadpool(job_results, request.path_params["job_id"], request.query_params)
+    return JSONResponse(body, status_code=status)
+
+@asynccontextmanager
+async def lifespan(app):
+    # Resume jobs left unfinished by a previous run
+    get_bulk_job_runner().start()
+    yield
+    get_bulk_job_runner().stop()
+
+routes = [
+    Route("/health", health_check, methods=["GET"]),
+    Route("/classify", classify_ticket, methods=["POST"]),
+    Route("/resolve", resolve_query_api, methods=["POST", "OPTIONS"]),
+    Route("/resolve_stream", resolve_query_stream_api, methods=["POST", "OPTIONS"]),
+    Route("/bulk_classify", bulk_classify, methods=["POST", "OPTIONS"]),
+    Route("/bulk_classify_stream", bulk_classify_stream, methods=["POST", "OPTIONS"]),
+    Route("/reports", generate_reports, methods=["POST", "OPTIONS"]),
+    Route("/metrics", get_metrics, methods=["GET"]),
+    Route("/tickets", list_tickets, methods=["GET"]),
+    Route("/bulk_jobs", submit_bulk_job, methods=["POST", "OPTIONS"]),
+    Route("/bulk_jobs/{job_id}", get_bulk_job, methods=["GET"]),
+    Route("/bulk_jobs/{job_id}/results", get_bulk_job_results, methods=["GET"]),
+]
+
+app = Starlette(
+    routes=routes,
+    lifespan=lifespan,
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+)
+
+if __name__ == "__main__":
+    import uvicorn
+    port = int(os.environ.get("PORT", 5000))
+    print(f"Starting ASGI app on port {port}")
+    uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,27 @@
+import argparse
+try:
+    from graph import graph, classification_graph
+except ImportError:
+    from backend.graph import graph, classification_graph
+
+def main():
+    """
+    Render the LangGraph workflows on demand (this used to happen on every import of graph.py).
+    Mermaid text is generated locally; PNG output uses the remote mermaid.ink renderer.
+    """
+    parser = argparse.ArgumentParser(description="Render the support copilot graphs")
+    parser.add_argument("--graph", choices=["rag", "classification"], default="rag")
+    parser.add_argument("--output", default="graph.png", help="PNG output path")
+    parser.add_argument("--mermaid", action="store_true", help="Print Mermaid source instead of rendering a PNG")
+    args = parser.parse_args()
+
+    compiled = graph if args.graph == "rag" else classification_graph
+    if args.mermaid:
+        print(compiled.get_graph().draw_mermaid())
+        return
+
+    compiled.get_graph().draw_mermaid_png(output_file_path=args.output)
+    print(f"Graph saved as {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
 from flask import request, jsonify
 try:
-    from graph import run_classification_only
+    from services.bulk_engine import classify_tickets
     from services.data_loader import load_sample_tickets
 except ImportError:
-    from backend.graph import run_classification_only
+    from backend.services.bulk_engine import classify_tickets
     from backend.services.data_loader import load_sample_tickets
 from typing import List, Dict, Any
 
@@ -12,6 +12,8 @@ def bulk_classify():
     Input: { "tickets": [ {"id": "...", "subject": "...", "body": "..."}, ... ] }
     Output: { "results": [ {"id": "...", "classification": {...}}, ... ] }
     If no body provided, will attempt to load from sample tickets
+    Tickets are classified concurrently; results keep input order and a ticket
+    that fails is reported as {"id": "...", "error": "..."} without failing the batch
     """
     if request.method == "OPTIONS":
         return ("", 200)
@@ -26,14 +28,9 @@ def bulk_classify():
 
     try:
         results = []
-        for ticket in tickets:
-            text = f"{ticket.get('subject','')}\n{ticket.get('body','')}".strip()
-            result = run_classification_only(text)
-            result["classification"]["original_question"] = text
-            results.append({
-                "id": ticket.get("id"),
-                "classification": result["classification"]
-            })
+        for result in classify_tickets(tickets):
+            result.pop("index", None)
+            results.append(result)
 
         return jsonify({"results": results})
     except Exception as e:
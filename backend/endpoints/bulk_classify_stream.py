@@ -1,9 +1,9 @@
 from flask import request, Response
 try:
-    from graph import run_classification_only
+    from services.bulk_engine import classify_tickets_as_completed
     from services.data_loader import load_sample_tickets
 except ImportError:
-    from backend.graph import run_classification_only
+    from backend.services.bulk_engine import classify_tickets_as_completed
     from backend.services.data_loader import load_sample_tickets
 from typing import List, Dict, Any
 import json
@@ -11,7 +11,8 @@ import json
 def bulk_classify_stream():
     """
     Input: { "tickets": [ {"id": "...", "subject": "...", "body": "..."}, ... ] }
-    Output: Server-Sent Events stream with individual ticket results
+    Output: Server-Sent Events stream with individual ticket results, emitted in
+    completion order; each result's `index` is its position in the input
     If no body provided, will attempt to load from sample tickets
     """
     if request.method == "OPTIONS":
@@ -30,33 +31,12 @@ def bulk_classify_stream():
             )
 
     def generate_stream():
-        yield f"data: {json.dumps({'type': 'start', 'total': len(tickets)})}\n\n"
+        yield sse_event({'type': 'start', 'total': len(tickets)})
         
-        for i, ticket in enumerate(tickets):
-            try:
-                text = f"{ticket.get('subject','')}\n{ticket.get('body','')}".strip()
-                result = run_classification_only(text)
-                result["classification"]["original_question"] = text
-                
-                ticket_result = {
-                    "id": ticket.get("id"),
-                    "classification": result["classification"],
-                    "index": i,
-                    "total": len(tickets)
-                }
-                
-                yield f"data: {json.dumps({'type': 'ticket', 'data': ticket_result})}\n\n"
-                
-            except Exception as e:
-                error_result = {
-                    "id": ticket.get("id"),
-                    "error": str(e),
-                    "index": i,
-                    "total": len(tickets)
-                }
-                yield f"data: {json.dumps({'type': 'error', 'data': error_result})}\n\n"
+        for result in classify_tickets_as_completed(tickets):
+            yield ticket_event(result, len(tickets))
         
-        yield f"data: {json.dumps({'type': 'complete'})}\n\n"
+        yield sse_event({'type': 'complete'})
 
     return Response(
         generate_stream(),
@@ -66,4 +46,26 @@ def bulk_classify_stream():
             'Connection': 'keep-alive',
             'X-Accel-Buffering': 'no',
         }
-    )
\ No newline at end of file
+    )
+
+def sse_event(payload: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+def ticket_event(result: Dict[str, Any], total: int) -> str:
+    """SSE frame for one bulk engine result: a 'ticket' event, or 'error' if it failed"""
+    if "error" in result:
+        error_result = {
+            "id": result["id"],
+            "error": result["error"],
+            "index": result["index"],
+            "total": total
+        }
+        return sse_event({'type': 'error', 'data': error_result})
+
+    ticket_result = {
+        "id": result["id"],
+        "classification": result["classification"],
+        "index": result["index"],
+        "total": total
+    }
+    return sse_event({'type': 'ticket', 'data': ticket_result})
@@ -0,0 +1,101 @@
+from flask import request, jsonify
+try:
+    from services.bulk_jobs import BulkJobStore, BulkJobRunner
+    from services.data_loader import load_sample_tickets
+    from services.lazy import lazy_component
+except ImportError:
+    from backend.services.bulk_jobs import BulkJobStore, BulkJobRunner
+    from backend.services.data_loader import load_sample_tickets
+    from backend.services.lazy import lazy_component
+from typing import Any, Dict, List, Mapping, Tuple
+import os
+
+MAX_RESULTS_PAGE = 1000
+
+# Jobs survive restarts: unfinished tickets are claimed again once their owner
+# stops heartbeating or their lease expires, by this process or any other
+# sharing BULK_JOBS_PATH. A restart on the same host releases them at once.
+# The store opens on first use so importing this module creates no files.
+BULK_JOB_HEARTBEAT_SECONDS = float(os.getenv("BULK_JOB_HEARTBEAT_SECONDS", "10"))
+
+@lazy_component("bulk_job_store")
+def get_bulk_job_store():
+    return BulkJobStore(
+        os.getenv("BULK_JOBS_PATH", "./bulk_jobs.sqlite3"),
+        lease_seconds=float(os.getenv("BULK_JOB_LEASE_SECONDS", "300")),
+        heartbeat_timeout=3 * BULK_JOB_HEARTBEAT_SECONDS,
+    )
+
+@lazy_component("bulk_job_runner")
+def get_bulk_job_runner():
+    return BulkJobRunner(
+        get_bulk_job_store(),
+        runners=int(os.getenv("BULK_JOB_RUNNERS", "1")),
+        chunk_size=int(os.getenv("BULK_JOB_CHUNK_SIZE", "32")),
+        heartbeat_seconds=BULK_JOB_HEARTBEAT_SECONDS,
+    )
+
+def create_job(tickets: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], int]:
+    if not tickets:
+        tickets = load_sample_tickets()
+        if not tickets:
+            return {"error": "No tickets provided and no sample tickets found"}, 400
+    job_id = get_bulk_job_store().submit(tickets)
+    get_bulk_job_runner().start()
+    get_bulk_job_runner().notify()
+    return get_bulk_job_store().job(job_id), 202
+
+def job_status(job_id: str) -> Tuple[Dict[str, Any], int]:
+    job = get_bulk_job_store().job(job_id)
+    if job is None:
+        return {"error": "Job not found"}, 404
+    return job, 200
+
+def job_results(job_id: str, args: Mapping[str, Any]) -> Tuple[Dict[str, Any], int]:
+    job = get_bulk_job_store().job(job_id)
+    if job is None:
+        return {"error": "Job not found"}, 404
+    try:
+        offset = max(0, int(args.get("offset", 0)))
+        limit = min(MAX_RESULTS_PAGE, max(1, int(args.get("limit", 100))))
+    except ValueError:
+        return {"error": "offset and limit must be integers"}, 400
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "total": job["total"],
+        "offset": offset,
+        "limit": limit,
+        "results": get_bulk_job_store().results(job_id, offset, limit),
+    }, 200
+
+def submit_bulk_job():
+    """
+    Input: { "tickets": [ {"id": "...", "subject": "...", "body": "..."}, ... ] }
+    Output (202): job status, see get_bulk_job. Returns as soon as the job is
+    stored; tickets are classified in the background.
+    If no body provided, will attempt to load from sample tickets
+    """
+    if request.method == "OPTIONS":
+        return ("", 200)
+
+    payload = request.get_json(silent=True) or {}
+    body, status = create_job(payload.get("tickets", []))
+    return jsonify(body), status
+
+def get_bulk_job(job_id: str):
+    """
+    Output: { "job_id", "status": "queued" | "running" | "completed", "total",
+    "completed", "errors", "progress", "tickets_per_second", "eta_seconds", ... }
+    """
+    body, status = job_status(job_id)
+    return jsonify(body), status
+
+def get_bulk_job_results(job_id: str):
+    """
+    Input: ?offset=0&limit=100
+    Output: { "results": [ {"index", "id", "status", "classification" | "error"}, ... ], ... }
+    in input order; tickets not classified yet have status "pending"
+    """
+    body, status = job_results(job_id, request.args)
+    return jsonify(body), status
@@ -0,0 +1,36 @@
+from flask import jsonify
+try:
+    import graph
+    from endpoints import reports
+    from endpoints.bulk_jobs import get_bulk_job_runner
+except ImportError:
+    from backend import graph
+    from backend.endpoints import reports
+    from backend.endpoints.bulk_jobs import get_bulk_job_runner
+
+def get_metrics():
+    """
+    Output: { "classification_cache": {...}, "classification_batcher": {...}, "rag_routes": {...}, ... }
+    Runtime counters for the caching and batching layers in front of the LLM.
+    """
+    return jsonify(collect_metrics())
+
+def collect_metrics():
+    return {
+        "classification_cache": graph.get_classification_cache().stats(),
+        "classification_batcher": graph.classification_batcher.stats(),
+        "classification_abatcher": graph.classification_abatcher.stats(),
+        "rag_routes": graph.route_stats(),
+        "query_embedding_cache": graph.query_embedding_cache.stats(),
+        "semantic_answer_cache": graph.semantic_answer_cache.stats(),
+        "retriever": graph.get_retriever().stats() if graph.get_retriever.is_initialized() else None,
+        "hybrid_retrieval": graph.get_hybrid_retriever().stats() if graph.get_hybrid_retriever.is_initialized() else None,
+        "context_builder": graph.context_builder.stats(),
+        "confidence_scorer": graph.confidence_scorer.stats(),
+        "ticket_repository": reports.ticket_repository.stats(),
+        "ticket_results": reports.get_ticket_results().stats(),
+        "near_duplicates": reports.near_duplicates.stats(),
+        "chart_renderer": reports.chart_renderer.stats(),
+        "bulk_jobs": get_bulk_job_runner().stats(),
+        "component_init_seconds": dict(graph.component_timings),
+    }
@@ -1,22 +1,59 @@
 from flask import request, jsonify, Response
 try:
-    from services.data_loader import load_sample_tickets
-    from graph import run_classification_only
+    from services.data_loader import ticket_repository
+    from services.bulk_engine import classify_tickets, ticket_text
+    from services.ticket_results import TicketResultsStore, content_hash
+    from services.chart_renderer import ChartRenderer, CHART_FORMATS
+    from services.near_duplicates import NearDuplicateIndex
+    from services.ticket_analytics import TicketAnalytics, ticket_timestamps
+    from services.lazy import lazy_component
+    from graph import get_classification_cache
 except ImportError:
-    from backend.services.data_loader import load_sample_tickets
-    from backend.graph import run_classification_only
-from typing import List, Dict, Any
+    from backend.services.data_loader import ticket_repository
+    from backend.services.bulk_engine import classify_tickets, ticket_text
+    from backend.services.ticket_results import TicketResultsStore, content_hash
+    from backend.services.chart_renderer import ChartRenderer, CHART_FORMATS
+    from backend.services.near_duplicates import NearDuplicateIndex
+    from backend.services.ticket_analytics import TicketAnalytics, ticket_timestamps
+    from backend.services.lazy import lazy_component
+    from backend.graph import get_classification_cache
+from typing import List, Dict, Any, Optional
 import json
+import os
 import time
-from collections import Counter, defaultdict
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
-import base64
+from collections import Counter
+
+# Per-ticket classifications and running aggregates; a report classifies only
+# tickets that are new or whose text changed since they were last stored.
+# Opened on first use, like the stores in graph.py, so importing creates no files.
+@lazy_component("ticket_results")
+def get_ticket_results():
+    return TicketResultsStore(os.getenv("TICKET_RESULTS_PATH", "./ticket_results.sqlite3"))
+
+# MinHash/LSH clusters of near-identical tickets (subject + body), kept across
+# reports so each report only signs tickets it has not seen.
+near_duplicates = NearDuplicateIndex(
+    threshold=float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.5")),
+    num_perm=int(os.getenv("NEAR_DUPLICATE_NUM_PERM", "128")),
+)
+
+# Charts render in worker processes and are cached by their input series, so
+# an unchanged report never re-runs matplotlib.
+CHART_FORMAT = os.getenv("CHART_FORMAT", "png")
+if CHART_FORMAT not in CHART_FORMATS:
+    raise ValueError(f"CHART_FORMAT must be one of {CHART_FORMATS}, got {CHART_FORMAT!r}")
+chart_renderer = ChartRenderer(
+    workers=int(os.getenv("CHART_RENDER_WORKERS", "1")),
+    max_entries=int(os.getenv("CHART_CACHE_SIZE", "64")),
+    cache_dir=os.getenv("CHART_CACHE_DIR") or None,
+    timeout=float(os.getenv("CHART_RENDER_TIMEOUT", "10")),
+    worker_timeout=float(os.getenv("CHART_WORKER_TIMEOUT", "60")),
+)
 
 def generate_reports():
     """
-    Input: { "ticket_ids": [...] } (optional - if not provided, uses all tickets)
+    Input: { "ticket_ids": [...], "chart_format": "png" | "svg" | "data" | "none" }
+    (both optional - all tickets, CHART_FORMAT)
     Output: Comprehensive analytics report with charts and insights
     """
     if request.method == "OPTIONS":
@@ -24,90 +61,83 @@ def generate_reports():
 
     try:
         payload = request.json or {}
-        ticket_ids = payload.get("ticket_ids", [])
-        
-        # Load tickets
-        all_tickets = load_sample_tickets()
-        if not all_tickets:
+        chart_format = payload.get("chart_format", CHART_FORMAT)
+        if chart_format not in CHART_FORMATS:
+            return jsonify({"error": f"chart_format must be one of {list(CHART_FORMATS)}"}), 400
+        report = build_report(payload.get("ticket_ids", []), chart_format)
+        if report is None:
             return jsonify({"error": "No tickets found"}), 400
-        
-        # Filter by ticket IDs if provided
-        if ticket_ids:
-            tickets = [t for t in all_tickets if t.get("id") in ticket_ids]
-        else:
-            tickets = all_tickets
-        
-        # Generate analytics
-        analytics = analyze_tickets(tickets)
-        
-        # Generate charts
-        charts = generate_charts(analytics)
-        
-        # Generate insights
-        insights = generate_insights(analytics)
-        
-        return jsonify({
-            "analytics": analytics,
-            "charts": charts,
-            "insights": insights,
-            "summary": {
-                "total_tickets": len(tickets),
-                "analysis_date": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "report_type": "comprehensive_analytics"
-            }
-        })
+        return jsonify(report)
         
     except Exception as e:
         return jsonify({"error": f"Report generation failed: {str(e)}"}), 500
 
-def analyze_tickets(tickets: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Analyze tickets and generate comprehensive metrics"""
+def build_report(ticket_ids: List[Any], chart_format: str = CHART_FORMAT) -> Optional[Dict[str, Any]]:
+    """Build the /reports response body, or None when there are no tickets"""
+    # Load tickets (id lookups go through the repository's index)
+    tickets = ticket_repository.get_many(ticket_ids) if ticket_ids else ticket_repository.all()
+    if not len(ticket_repository):
+        return None
+    
+    # Generate analytics
+    analytics = analyze_tickets(tickets, whole_source=not ticket_ids)
+    classification_sync = analytics.pop("classification_sync")
+    
+    # Generate charts
+    charts = generate_charts(analytics, chart_format)
+    
+    # Generate insights
+    insights = generate_insights(analytics)
+    
+    return {
+        "analytics": analytics,
+        "charts": charts,
+        "insights": insights,
+        "summary": {
+            "total_tickets": len(tickets),
+            "analysis_date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "report_type": "comprehensive_analytics",
+            "classification_sync": classification_sync
+        }
+    }
+
+def report_ticket_id(ticket: Dict[str, Any]) -> str:
+    # Tickets without an id are keyed by their content
+    ticket_id = ticket.get("id")
+    return str(ticket_id) if ticket_id is not None else content_hash(ticket_text(ticket))
+
+def analyze_tickets(tickets: List[Dict[str, Any]], whole_source: bool = False) -> Dict[str, Any]:
+    """
+    Analyze tickets and generate comprehensive metrics. Classifications come
+    from the results store; only new or changed tickets are classified. With
+    `whole_source` the store is pruned to `tickets` and its running counters
+    are read directly; a subset is aggregated with vectorized group-bys over
+    the store's columnar frames. Time rollups need only ticket timestamps and
+    priorities, and are skipped when tickets carry no timestamps.
+    """
     
     # Basic stats
     total_tickets = len(tickets)
     
-    # Classification analysis
-    topics = Counter()
-    sentiments = Counter()
-    priorities = Counter()
-    repeated_queries = Counter()
-    high_priority_tickets = []
+    ticket_results = get_ticket_results()
+    sync = ticket_results.sync(tickets, report_ticket_id, ticket_text, classify_tickets,
+                               namespace=get_classification_cache().namespace)
+    timestamps = ticket_timestamps(tickets, report_ticket_id)
+    if whole_source:
+        sync["removed"] = ticket_results.remove_except(report_ticket_id(t) for t in tickets)
+        aggregates = ticket_results.aggregates()
+        frame = None
+        if not timestamps.empty:
+            frame = TicketAnalytics.from_store(ticket_results, None, timestamps, with_labels=False)
+    else:
+        frame = TicketAnalytics.from_store(ticket_results, [report_ticket_id(t) for t in tickets], timestamps)
+        aggregates = frame.aggregates()
     
-    # Process each ticket
-    for ticket in tickets:
-        try:
-            text = f"{ticket.get('subject','')}\n{ticket.get('body','')}".strip()
-            result = run_classification_only(text)
-            classification = result["classification"]
-            
-            # Extract classification data
-            labels = classification.get("label", [])
-            sentiment = classification.get("sentiment", "Neutral")
-            priority = classification.get("priority", "P2")
-            
-            # Update counters
-            for label in labels:
-                topics[label] += 1
-            sentiments[sentiment] += 1
-            priorities[priority] += 1
-            
-            # Track repeated queries (by subject similarity)
-            subject_key = ticket.get('subject', '').lower().strip()
-            repeated_queries[subject_key] += 1
-            
-            # Track high priority tickets
-            if priority in ['P0', 'P1']:
-                high_priority_tickets.append({
-                    "id": ticket.get("id"),
-                    "subject": ticket.get("subject"),
-                    "priority": priority,
-                    "sentiment": sentiment,
-                    "topics": labels
-                })
-                
-        except Exception as e:
-            print(f"Error processing ticket {ticket.get('id')}: {e}")
-            continue
+    topics = aggregates["topic"]
+    sentiments = aggregates["sentiment"]
+    priorities = aggregates["priority"]
+    repeated_queries = aggregates["subject"]
+    high_priority_tickets = aggregates["high_priority"]
     
     # Calculate metrics
     most_common_topics = topics.most_common(10)
@@ -115,8 +145,12 @@ def analyze_tickets(tickets: List[Dict[str, Any]]) -> Dict[str, Any]:
     most_common_priorities = priorities.most_common()
     repeated_query_issues = [(query, count) for query, count in repeated_queries.items() if count > 1]
     
+    # Near-duplicates: catches paraphrases and typos that exact subject matching misses
+    near_duplicates.sync(tickets, report_ticket_id, ticket_text, prune=whole_source)
+    duplicate_clusters = near_duplicates.clusters(None if whole_source else [report_ticket_id(t) for t in tickets])
+    
     # Time-based analysis (if tickets have timestamps)
-    time_analysis = analyze_time_patterns(tickets)
+    time_analysis = analyze_time_patterns(frame)
     
     return {
         "total_tickets": total_tickets,
@@ -124,115 +158,32 @@ def analyze_tickets(tickets: List[Dict[str, Any]]) -> Dict[str, Any]:
         "sentiment_distribution": dict(most_common_sentiments),
         "priority_distribution": dict(most_common_priorities),
         "repeated_queries": repeated_query_issues,
+        "near_duplicate_clusters": duplicate_clusters,
         "high_priority_tickets": high_priority_tickets,
+        "priority_by_sentiment": aggregates["priority_by_sentiment"],
+        "topic_by_priority": aggregates["topic_by_priority"],
         "time_analysis": time_analysis,
         "top_issues": {
             "most_common_topic": most_common_topics[0][0] if most_common_topics else "N/A",
             "most_common_sentiment": most_common_sentiments[0][0] if most_common_sentiments else "N/A",
             "high_priority_count": len(high_priority_tickets),
-            "repeated_query_count": len(repeated_query_issues)
-        }
+            "repeated_query_count": len(repeated_query_issues),
+            "near_duplicate_cluster_count": len(duplicate_clusters)
+        },
+        "classification_sync": sync
     }
 
-def analyze_time_patterns(tickets: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Analyze time-based patterns in tickets"""
-    # This would analyze patterns if tickets had timestamps
-    # For now, return basic structure
-    return {
-        "hourly_distribution": {},
-        "daily_distribution": {},
-        "trend_analysis": "No timestamp data available"
-    }
+def analyze_time_patterns(frame: Optional[TicketAnalytics]) -> Dict[str, Any]:
+    """Hourly/daily/weekly volume and trend; empty rollups when tickets carry no timestamps"""
+    return frame.time_rollups() if frame is not None else TicketAnalytics.no_time_data()
 
-def generate_charts(analytics: Dict[str, Any]) -> Dict[str, str]:
-    """Generate base64-encoded charts"""
-    charts = {}
-    
+def generate_charts(analytics: Dict[str, Any], chart_format: str = CHART_FORMAT) -> Dict[str, Any]:
+    """Charts for the report as data URIs (png/svg), raw series ("data") or none"""
     try:
-        # Set style
-        plt.style.use('seaborn-v0_8')
-        
-        # 1. Topic Distribution Pie Chart
-        if analytics.get("topic_distribution"):
-            fig, ax = plt.subplots(figsize=(10, 8))
-            topics = analytics["topic_distribution"]
-            ax.pie(topics.values(), labels=topics.keys(), autopct='%1.1f%%', startangle=90)
-            ax.set_title('Ticket Topics Distribution', fontsize=16, fontweight='bold')
-            charts["topic_distribution"] = fig_to_base64(fig)
-            plt.close(fig)
-        
-        # 2. Priority Distribution Bar Chart
-        if analytics.get("priority_distribution"):
-            fig, ax = plt.subplots(figsize=(10, 6))
-            priorities = analytics["priority_distribution"]
-            colors = {'P0': 'red', 'P1': 'orange', 'P2': 'green', 'P3': 'blue'}
-            bars = ax.bar(priorities.keys(), priorities.values(), 
-                         color=[colors.get(p, 'gray') for p in priorities.keys()])
-            ax.set_title('Priority Distribution', fontsize=16, fontweight='bold')
-            ax.set_ylabel('Number of Tickets')
-            ax.set_xlabel('Priority Level')
-            
-            # Add value labels on bars
-            for bar in bars:
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                       f'{int(height)}', ha='center', va='bottom')
-            
-            charts["priority_distribution"] = fig_to_base64(fig)
-            plt.close(fig)
-        
-        # 3. Sentiment Analysis
-        if analytics.get("sentiment_distribution"):
-            fig, ax = plt.subplots(figsize=(10, 6))
-            sentiments = analytics["sentiment_distribution"]
-            colors = {'Angry': 'red', 'Frustrated': 'orange', 'Neutral': 'gray', 'Curious': 'blue', 'Happy': 'green'}
-            bars = ax.bar(sentiments.keys(), sentiments.values(),
-                         color=[colors.get(s, 'gray') for s in sentiments.keys()])
-            ax.set_title('Sentiment Analysis', fontsize=16, fontweight='bold')
-            ax.set_ylabel('Number of Tickets')
-            ax.set_xlabel('Sentiment')
-            
-            for bar in bars:
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                       f'{int(height)}', ha='center', va='bottom')
-            
-            charts["sentiment_analysis"] = fig_to_base64(fig)
-            plt.close(fig)
-        
-        # 4. High Priority Tickets Overview
-        if analytics.get("high_priority_tickets"):
-            fig, ax = plt.subplots(figsize=(12, 8))
-            high_priority = analytics["high_priority_tickets"]
-            
-            # Group by priority and sentiment
-            priority_sentiment = defaultdict(int)
-            for ticket in high_priority:
-                key = f"{ticket['priority']} - {ticket['sentiment']}"
-                priority_sentiment[key] += 1
-            
-            if priority_sentiment:
-                labels = list(priority_sentiment.keys())
-                values = list(priority_sentiment.values())
-                bars = ax.bar(labels, values, color=['red', 'orange', 'yellow', 'green'][:len(labels)])
-                ax.set_title('High Priority Tickets by Sentiment', fontsize=16, fontweight='bold')
-                ax.set_ylabel('Number of Tickets')
-                ax.set_xlabel('Priority - Sentiment')
-                plt.xticks(rotation=45)
-                
-                for bar in bars:
-                    height = bar.get_height()
-                    ax.text(bar.get_x() + bar.get_width()/2., height,
-                           f'{int(height)}', ha='center', va='bottom')
-            
-            charts["high_priority_overview"] = fig_to_base64(fig)
-            plt.close(fig)
-        
+        return chart_renderer.charts(analytics, chart_format)
     except Exception as e:
         print(f"Error generating charts: {e}")
-        charts["error"] = f"Chart generation failed: {str(e)}"
-    
-    return charts
+        return {"error": f"Chart generation failed: {str(e)}"}
 
 def generate_insights(analytics: Dict[str, Any]) -> List[Dict[str, str]]:
     """Generate actionable insights from analytics"""
@@ -258,6 +209,19 @@ def generate_insights(analytics: Dict[str, Any]) -> List[Dict[str, str]]:
             "action": "Consider creating FAQ or knowledge base entries"
         })
     
+    # Near-duplicate insights
+    clusters = analytics.get("near_duplicate_clusters", [])
+    if clusters:
+        largest = clusters[0]
+        duplicated = sum(c["size"] for c in clusters)
+        insights.append({
+            "type": "info",
+            "title": "Near-Duplicate Tickets",
+            "message": f"{duplicated} tickets fall into {len(clusters)} near-duplicate clusters; the largest "
+                       f"({largest['size']} tickets) is like '{largest['representative']['subject']}'",
+            "action": "Answer the largest clusters once (macro or KB article) and link the duplicates"
+        })
+    
     # Topic insights
     topic_dist = analytics.get("topic_distribution", {})
     if topic_dist:
@@ -286,11 +250,3 @@ def generate_insights(analytics: Dict[str, Any]) -> List[Dict[str, str]]:
                 })
     
     return insights
-
-def fig_to_base64(fig):
-    """Convert matplotlib figure to base64 string"""
-    img_buffer = io.BytesIO()
-    fig.savefig(img_buffer, format='png', dpi=150, bbox_inches='tight')
-    img_buffer.seek(0)
-    img_base64 = base64.b64encode(img_buffer.getvalue()).decode()
-    return f"data:image/png;base64,{img_base64}"
@@ -1,13 +1,17 @@
 from flask import request, jsonify
 try:
     from graph import run_rag_graph
+    from services.confidence import CONFIDENCE_HIGH, CONFIDENCE_LOW
 except ImportError:
     from backend.graph import run_rag_graph
+    from backend.services.confidence import CONFIDENCE_HIGH, CONFIDENCE_LOW
 
 def resolve_query_api():
     """
     Input: { "classification": {...} }
-    Output: { "needs_rag": True/False, "response": "...", "reason": "..." }
+    Output: { "needs_rag": True/False, "response": "...", "reason": "...", "classification_reused": True/False }
+    A classification carrying a "label" list (as returned by /classify) is reused
+    as-is instead of classifying the question again
     """
     if request.method == "OPTIONS":
         return ("", 200)
@@ -22,30 +26,35 @@ def resolve_query_api():
         if not question:
             return jsonify({"error": "Original question required for resolution"}), 400
         
-        result = run_rag_graph(question)
+        result = run_rag_graph(question, classification=classification_output)
         
-        needs_rag = result.get("resolution_decision", {}).get("needs_rag", False)
-        confidence = result.get("confidence", 0.0)
-        final_response = result.get("final_response", "")
-        
-        if needs_rag:
-            if confidence >= 0.75:
-                reason = f"High confidence ({confidence:.2f}) RAG answer."
-            elif confidence >= 0.4:
-                reason = f"Medium confidence ({confidence:.2f}). Sent templated reply and queued human review."
-            else:
-                reason = f"Low confidence ({confidence:.2f}). Escalated to human team with context."
-                final_response = None
+        return jsonify(format_resolution(result, classification_output))
+    except Exception as e:
+        return jsonify({"error": f"Resolution failed: {str(e)}"}), 500
+
+def format_resolution(result: dict, classification_output: dict) -> dict:
+    """Shape a run_rag_graph result into the /resolve response body"""
+    needs_rag = result.get("resolution_decision", {}).get("needs_rag", False)
+    confidence = result.get("confidence", 0.0)
+    final_response = result.get("final_response", "")
+
+    if needs_rag:
+        if confidence >= CONFIDENCE_HIGH:
+            reason = f"High confidence ({confidence:.2f}) RAG answer."
+        elif confidence >= CONFIDENCE_LOW:
+            reason = f"Medium confidence ({confidence:.2f}). Sent templated reply and queued human review."
         else:
-            reason = f"No RAG needed for labels {classification_output.get('label', [])}"
-            final_response = result.get("final_response", "")
+            reason = f"Low confidence ({confidence:.2f}). Escalated to human team with context."
+            final_response = None
+    else:
+        reason = f"No RAG needed for labels {classification_output.get('label', [])}"
+        final_response = result.get("final_response", "")
 
-        return jsonify({
-            "needs_rag": needs_rag,
-            "response": final_response,
-            "reason": reason,
-            "answer_confidence": confidence,
-            "routing_team": result.get("resolution_decision", {}).get("routing_team", "General Support")
-        })
-    except Exception as e:
-        return jsonify({"error": f"Resolution failed: {str(e)}"}), 500
\ No newline at end of file
+    return {
+        "needs_rag": needs_rag,
+        "response": final_response,
+        "reason": reason,
+        "answer_confidence": confidence,
+        "routing_team": result.get("resolution_decision", {}).get("routing_team", "General Support"),
+        "classification_reused": result.get("classification_reused", False)
+    }
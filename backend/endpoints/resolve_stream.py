@@ -0,0 +1,59 @@
+from flask import request, Response, jsonify
+try:
+    from graph import stream_rag_graph
+    from endpoints.resolve import format_resolution
+    from endpoints.bulk_classify_stream import sse_event
+except ImportError:
+    from backend.graph import stream_rag_graph
+    from backend.endpoints.resolve import format_resolution
+    from backend.endpoints.bulk_classify_stream import sse_event
+from typing import Any, Dict
+
+def resolve_query_stream_api():
+    """
+    Input: { "classification": {...} }  (same as /resolve)
+    Output: Server-Sent Events stream:
+      {"type": "token", "content": "..."}   answer tokens as generate produces them
+      {"type": "final", "data": {...}}      the /resolve response body plus "sources"
+      {"type": "error", "error": "..."}     if the pipeline fails mid-stream
+    The final event is authoritative: a low-confidence answer is escalated and
+    its "response" is null even though its tokens were streamed.
+    """
+    if request.method == "OPTIONS":
+        return ("", 200)
+
+    data = request.json or {}
+    classification_output = data.get("classification", {})
+    if not classification_output:
+        return jsonify({"error": "Classification data required"}), 400
+
+    question = classification_output.get('original_question', '')
+    if not question:
+        return jsonify({"error": "Original question required for resolution"}), 400
+
+    def generate_stream():
+        try:
+            for event in stream_rag_graph(question, classification=classification_output):
+                yield resolve_event(event, classification_output)
+        except Exception as e:
+            yield sse_event({'type': 'error', 'error': f"Resolution failed: {str(e)}"})
+
+    return Response(
+        generate_stream(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'Connection': 'keep-alive',
+            'X-Accel-Buffering': 'no',
+        }
+    )
+
+def resolve_event(event: Dict[str, Any], classification_output: dict) -> str:
+    """SSE frame for one stream_rag_graph event"""
+    if event["type"] == "token":
+        return sse_event(event)
+
+    result = event["result"]
+    final = format_resolution(result, classification_output)
+    final["sources"] = result.get("sources", [])
+    return sse_event({'type': 'final', 'data': final})
@@ -0,0 +1,29 @@
+from flask import request, jsonify
+try:
+    from services.data_loader import ticket_repository
+except ImportError:
+    from backend.services.data_loader import ticket_repository
+from typing import Any, Dict, Mapping
+
+MAX_PAGE_SIZE = 500
+
+def ticket_page(args: Mapping[str, Any], getlist) -> Dict[str, Any]:
+    """
+    Query args -> repository page. `offset` and `limit` page through the
+    tickets; any other arg filters on that ticket field and may repeat
+    (?id=1&id=7, ?priority=P0&priority=P1).
+    """
+    offset = max(0, int(args.get("offset", 0)))
+    limit = min(MAX_PAGE_SIZE, max(1, int(args.get("limit", 50))))
+    where = {field: getlist(field) for field in args if field not in ("offset", "limit")}
+    return ticket_repository.page(offset, limit, where)
+
+def list_tickets():
+    """
+    Input: GET /tickets?offset=0&limit=50&<field>=<value>...
+    Output: { "tickets": [...], "offset": 0, "limit": 50, "total": n }
+    """
+    try:
+        return jsonify(ticket_page(request.args, request.args.getlist))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
@@ -1,43 +1,132 @@
 import os
-import getpass
+import asyncio
+import threading
+from typing import Optional
 from typing_extensions import TypedDict, List
 from dotenv import load_dotenv
 
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
-from langchain import hub
 from langchain_core.documents import Document
-from langchain.chat_models import init_chat_model
 from langgraph.graph import StateGraph, START, END
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from pydantic import BaseModel, Field
 
+try:
+    from services.classification_cache import ClassificationCache, schema_version
+    from services.micro_batcher import AsyncMicroBatcher, MicroBatcher
+    from services.lazy import lazy_component, component_timings
+    from services.embedding_cache import EmbeddingCache
+    from services.semantic_cache import SemanticAnswerCache
+    from services.index_version import read_index_version
+    from services.embedding_profile import EmbeddingProfile
+    from services.context_builder import ContextBuilder, make_token_counter
+    from services.confidence import CONFIDENCE_HIGH, CONFIDENCE_LOW, LexicalGroundingScorer, TieredConfidenceScorer
+    from services.retrievers import RETRIEVAL_MODES, make_hybrid_retriever, make_retriever, open_chroma
+except ImportError:
+    from backend.services.classification_cache import ClassificationCache, schema_version
+    from backend.services.micro_batcher import AsyncMicroBatcher, MicroBatcher
+    from backend.services.lazy import lazy_component, component_timings
+    from backend.services.embedding_cache import EmbeddingCache
+    from backend.services.semantic_cache import SemanticAnswerCache
+    from backend.services.index_version import read_index_version
+    from backend.services.embedding_profile import EmbeddingProfile
+    from backend.services.context_builder import ContextBuilder, make_token_counter
+    from backend.services.confidence import CONFIDENCE_HIGH, CONFIDENCE_LOW, LexicalGroundingScorer, TieredConfidenceScorer
+    from backend.services.retrievers import RETRIEVAL_MODES, make_hybrid_retriever, make_retriever, open_chroma
+
 load_dotenv()
 
-# Environment variables should be set via Docker or .env file
-if not os.getenv("LANGSMITH_API_KEY"):
-    raise EnvironmentError("LANGSMITH_API_KEY environment variable is required")
-if not os.getenv("OPENAI_API_KEY"):
-    raise EnvironmentError("OPENAI_API_KEY environment variable is required")
+CHAT_MODEL = "gpt-4o-mini"
+# Model, output dimensions and storage quantization; must match build_index.py
+embedding_profile = EmbeddingProfile.from_env()
+EMBEDDING_MODEL = embedding_profile.model
+
+def _require_api_keys():
+    # Environment variables should be set via Docker or .env file
+    if not os.getenv("LANGSMITH_API_KEY"):
+        raise EnvironmentError("LANGSMITH_API_KEY environment variable is required")
+    if not os.getenv("OPENAI_API_KEY"):
+        raise EnvironmentError("OPENAI_API_KEY environment variable is required")
+
+# Clients and stores are built on first use so importing this module (and
+# serving /health) needs no network access, API keys or Chroma files.
+@lazy_component("llm")
+def get_llm():
+    _require_api_keys()
+    from langchain.chat_models import init_chat_model
+    return init_chat_model(CHAT_MODEL, model_provider="openai")
+
+@lazy_component("embeddings")
+def get_embeddings():
+    _require_api_keys()
+    return embedding_profile.make_embeddings()
+
+CHROMA_PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_langchain_db")
+
+# chroma | mmap (services/mmap_index.py, written by build_index)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+
+@lazy_component("vector_store")
+def get_vector_store():
+    return open_chroma(embedding_profile, get_embeddings(), CHROMA_PERSIST_DIRECTORY)
+
+@lazy_component("retriever")
+def get_retriever():
+    return make_retriever(VECTOR_BACKEND, embedding_profile, CHROMA_PERSIST_DIRECTORY, get_vector_store)
+
+# dense | hybrid (BM25 + dense, rank-fused) | lexical_first (hybrid, but a
+# decisive BM25 match answers from lexical hits without embedding the question)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")
+if RETRIEVAL_MODE not in RETRIEVAL_MODES:
+    raise ValueError(f"RETRIEVAL_MODE must be one of {RETRIEVAL_MODES}, got {RETRIEVAL_MODE!r}")
+
+@lazy_component("hybrid_retriever")
+def get_hybrid_retriever():
+    return make_hybrid_retriever(get_retriever(), embedding_profile, CHROMA_PERSIST_DIRECTORY)
+
+# Retrieval over-fetches CONTEXT_CANDIDATES chunks; the builder keeps the ones
+# worth their tokens (adaptive k, MMR, overlap merge) within the budget, which
+# is capped at the cost of the top-4 join so it never exceeds that baseline.
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "8"))
+context_builder = ContextBuilder(
+    budget_tokens=int(os.getenv("CONTEXT_BUDGET_TOKENS", "1500")),
+    max_chunks=int(os.getenv("CONTEXT_MAX_CHUNKS", "4")),
+    min_relative_score=float(os.getenv("CONTEXT_MIN_RELATIVE_SCORE", "0.85")),
+    mmr_lambda=float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7")),
+    token_counter=make_token_counter(CHAT_MODEL),
+)
+
+# Repeated /resolve questions reuse their embedding instead of re-embedding
+query_embedding_cache = EmbeddingCache(
+    model=embedding_profile.name,
+    max_bytes=int(float(os.getenv("EMBEDDING_CACHE_MAX_MB", "64")) * 1024 * 1024),
+)
 
-llm = init_chat_model("gpt-4o-mini", model_provider="openai")
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+# Paraphrased questions reuse an earlier high-confidence answer. Entries are
+# dropped whenever build_index stamps a new index version.
+semantic_answer_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_SIZE", "2000")),
+    min_confidence=float(os.getenv("SEMANTIC_CACHE_MIN_CONFIDENCE", "0.75")),
+    index_version_fn=lambda: read_index_version(CHROMA_PERSIST_DIRECTORY),
+)
 
-vector_store = Chroma(
-    collection_name="example_collection",
-    embedding_function=embeddings,
-    persist_directory=os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_langchain_db"),
+# Vendored copy of the "rlm/rag-prompt" hub prompt, so startup never calls the hub
+rag_prompt_template = (
+    "You are an assistant for question-answering tasks. Use the following pieces of "
+    "retrieved context to answer the question. If you don't know the answer, just say "
+    "that you don't know. Use three sentences maximum and keep the answer concise.\n"
+    "Question: {question} \nContext: {context} \nAnswer:"
 )
 
-prompt = hub.pull("rlm/rag-prompt")
+prompt = ChatPromptTemplate.from_messages([("human", rag_prompt_template)])
 
 tag_list = [
     "How-to", "Product", "Connector", "Lineage", "API/SDK", "SSO",
     "Glossary", "Best practices", "Sensitive data", "Bug", "Permissions"
 ]
 
-tagging_prompt = ChatPromptTemplate.from_template(
-    """
+tagging_template = """
 Extract the desired information from the following passage.
 
 Only extract the properties mentioned in the 'Classification' function.
@@ -45,7 +134,8 @@ Only extract the properties mentioned in the 'Classification' function.
 Passage:
 {input}
 """
-)
+
+tagging_prompt = ChatPromptTemplate.from_template(tagging_template)
 
 class Classification(BaseModel):
     label: List[str] = Field(
@@ -57,8 +147,48 @@ class Classification(BaseModel):
 class AnswerConfidence(BaseModel):
     confidence: float = Field(description="Confidence 0-1 that the generated answer is correct and grounded")
 
-structured_llm = llm.with_structured_output(Classification)
-confidence_llm = llm.with_structured_output(AnswerConfidence)
+@lazy_component("structured_llm")
+def get_structured_llm():
+    return get_llm().with_structured_output(Classification)
+
+@lazy_component("confidence_llm")
+def get_confidence_llm():
+    return get_llm().with_structured_output(AnswerConfidence)
+
+@lazy_component("classification_cache")
+def get_classification_cache():
+    return ClassificationCache(
+        model=CHAT_MODEL,
+        prompt_template=tagging_template,
+        schema=schema_version(Classification),
+        max_entries=int(os.getenv("CLASSIFICATION_CACHE_SIZE", "1024")),
+        db_path=os.getenv("CLASSIFICATION_CACHE_PATH", "./classification_cache.sqlite3") or None,
+    )
+
+def _classify_batch(prompts):
+    return get_structured_llm().batch(prompts, return_exceptions=True)
+
+# Coalesces concurrent classify calls (single /classify requests, bulk workers)
+# into one structured_llm.batch. A window of 0 disables batching.
+CLASSIFY_BATCH_WINDOW_MS = float(os.getenv("CLASSIFY_BATCH_WINDOW_MS", "10"))
+CLASSIFY_MAX_BATCH_SIZE = int(os.getenv("CLASSIFY_MAX_BATCH_SIZE", "16"))
+classification_batcher = MicroBatcher(
+    _classify_batch,
+    max_batch_size=CLASSIFY_MAX_BATCH_SIZE,
+    max_wait_ms=CLASSIFY_BATCH_WINDOW_MS,
+    name="classify-batcher",
+)
+
+async def _aclassify_batch(prompts):
+    return await get_structured_llm().abatch(prompts, return_exceptions=True)
+
+# The async graph path batches on the event loop through structured_llm.abatch
+classification_abatcher = AsyncMicroBatcher(
+    _aclassify_batch,
+    max_batch_size=CLASSIFY_MAX_BATCH_SIZE,
+    max_wait_ms=CLASSIFY_BATCH_WINDOW_MS,
+    name="classify-abatcher",
+)
 
 class State(TypedDict):
     question: str
@@ -69,50 +199,176 @@ class State(TypedDict):
     resolution_decision: dict
     final_response: str
     sources: List[str]
+    query_vector: List[float]
+    semantic_cache_hit: bool
+    lexical_shortcut: bool
+    context_text: str
+    context_tokens_saved: int
+
+def _cache_classification(question: str, response) -> dict:
+    classification = response.model_dump()
+    get_classification_cache().put(question, classification)
+    return {"classification": classification}
 
 def classify(state: State):
+    cached = get_classification_cache().get(state["question"])
+    if cached is not None:
+        return {"classification": cached}
+
     classification_prompt = tagging_prompt.invoke({"input": state["question"]})
-    response = structured_llm.invoke(classification_prompt)
-    return {"classification": response.model_dump()}
+    if CLASSIFY_BATCH_WINDOW_MS > 0:
+        response = classification_batcher(classification_prompt)
+    else:
+        response = get_structured_llm().invoke(classification_prompt)
+    return _cache_classification(state["question"], response)
+
+async def aclassify(state: State):
+    # The memory tier answers inline; the SQLite tier runs off the event loop
+    if get_classification_cache.is_initialized():
+        cache = get_classification_cache()
+    else:
+        # Opening the SQLite file happens once, also off the loop
+        cache = await asyncio.to_thread(get_classification_cache)
+    cached = cache.peek(state["question"])
+    if cached is None:
+        cached = await asyncio.to_thread(cache.get, state["question"])
+    if cached is not None:
+        return {"classification": cached}
+
+    classification_prompt = tagging_prompt.invoke({"input": state["question"]})
+    if CLASSIFY_BATCH_WINDOW_MS > 0:
+        response = await classification_abatcher.submit(classification_prompt)
+    else:
+        response = await get_structured_llm().ainvoke(classification_prompt)
+    return await asyncio.to_thread(_cache_classification, state["question"], response)
+
+def _semantic_lookup_result(query_vector: List[float]) -> dict:
+    update = {"query_vector": query_vector}
+    cached = semantic_answer_cache.lookup(query_vector)
+    if cached is not None:
+        update.update({
+            "answer": cached["answer"],
+            "answer_confidence": cached["confidence"],
+            "sources": cached["sources"],
+            "semantic_cache_hit": True,
+        })
+    return update
+
+def _assembled_context(docs: List[Document]) -> dict:
+    built = context_builder.build(docs)
+    return {
+        "context": built["docs"],
+        "context_text": built["text"],
+        "context_tokens_saved": built["tokens_saved"],
+    }
+
+def semantic_lookup(state: State):
+    if RETRIEVAL_MODE == "lexical_first":
+        docs = get_hybrid_retriever().lexical_first(state["question"], CONTEXT_CANDIDATES)
+        if docs:
+            return {**_assembled_context(docs), "lexical_shortcut": True}
+    query_vector = query_embedding_cache.embed_query(state["question"], get_embeddings().embed_query)
+    return _semantic_lookup_result(query_vector)
+
+async def asemantic_lookup(state: State):
+    if RETRIEVAL_MODE == "lexical_first":
+        docs = await asyncio.to_thread(get_hybrid_retriever().lexical_first, state["question"], CONTEXT_CANDIDATES)
+        if docs:
+            return {**_assembled_context(docs), "lexical_shortcut": True}
+    query_vector = await query_embedding_cache.aembed_query(state["question"], get_embeddings().aembed_query)
+    return _semantic_lookup_result(query_vector)
+
+def route_after_lookup(state: State):
+    if state.get("semantic_cache_hit"):
+        return "resolve_and_format"
+    # A decisive exact-identifier match already has its context: no embedding, no vector search
+    if state.get("lexical_shortcut"):
+        return "generate"
+    return "retrieve"
 
 def retrieve(state: State):
-    retrieved_docs = vector_store.similarity_search(state["question"])
-    return {"context": retrieved_docs}
+    query_vector = state.get("query_vector") or query_embedding_cache.embed_query(
+        state["question"], get_embeddings().embed_query)
+    if RETRIEVAL_MODE == "dense":
+        retrieved_docs = get_retriever().search_by_vector(query_vector, CONTEXT_CANDIDATES)
+    else:
+        retrieved_docs = get_hybrid_retriever().search(state["question"], query_vector, CONTEXT_CANDIDATES)
+    return _assembled_context(retrieved_docs)
+
+async def aretrieve(state: State):
+    query_vector = state.get("query_vector") or await query_embedding_cache.aembed_query(
+        state["question"], get_embeddings().aembed_query)
+    if RETRIEVAL_MODE == "dense":
+        retrieved_docs = await get_retriever().asearch_by_vector(query_vector, CONTEXT_CANDIDATES)
+    else:
+        retrieved_docs = await get_hybrid_retriever().asearch(state["question"], query_vector, CONTEXT_CANDIDATES)
+    return _assembled_context(retrieved_docs)
 
-def generate(state: State):
-    docs_content = "\n\n".join(doc.page_content for doc in state["context"])
-    messages = prompt.invoke({"question": state["question"], "context": docs_content})
-    answer_msg = llm.invoke(messages)
+def _context_text(state: State) -> str:
+    if state.get("context_text") is not None:
+        return state["context_text"]
+    return "\n\n".join(doc.page_content for doc in state["context"])
+
+def _generation_messages(state: State):
+    docs_content = _context_text(state)
+    return prompt.invoke({"question": state["question"], "context": docs_content})
+
+# The node config is passed on so stream_mode="messages" sees the answer tokens
+def generate(state: State, config: RunnableConfig):
+    answer_msg = get_llm().invoke(_generation_messages(state), config)
+    return {"answer": answer_msg.content}
+
+async def agenerate(state: State, config: RunnableConfig):
+    answer_msg = await get_llm().ainvoke(_generation_messages(state), config)
     return {"answer": answer_msg.content}
 
+confidence_prompt = ChatPromptTemplate.from_template(
+    """
+    You are evaluating the quality of an assistant's answer given retrieved context.
+    Score a single number 'confidence' from 0 to 1 (float) for how well the answer is grounded,
+    accurate, and complete according to the provided context.
+    Return only the 'confidence' field.
+
+    Question:\n{question}\n\nContext:\n{context}\n\nAnswer:\n{answer}
+    """
+)
+
+def _judge_confidence(question: str, context: str, answer: str) -> float:
+    messages = confidence_prompt.invoke({"question": question, "context": context, "answer": answer})
+    return float(getattr(get_confidence_llm().invoke(messages), 'confidence', 0.0))
+
+async def _ajudge_confidence(question: str, context: str, answer: str) -> float:
+    messages = confidence_prompt.invoke({"question": question, "context": context, "answer": answer})
+    return float(getattr(await get_confidence_llm().ainvoke(messages), 'confidence', 0.0))
+
+# Lexical grounding scores every answer; the LLM judge runs only within
+# CONFIDENCE_JUDGE_BAND of the 0.4 / 0.75 decision thresholds (plus a small
+# audit sample). CONFIDENCE_SCORER=judge restores judging every answer.
+confidence_scorer = TieredConfidenceScorer(
+    LexicalGroundingScorer(
+        floor=float(os.getenv("CONFIDENCE_LEXICAL_FLOOR", "0.3")),
+        ceiling=float(os.getenv("CONFIDENCE_LEXICAL_CEILING", "0.9")),
+    ),
+    mode=os.getenv("CONFIDENCE_SCORER", "tiered"),
+    band=float(os.getenv("CONFIDENCE_JUDGE_BAND", "0.1")),
+    audit_rate=float(os.getenv("CONFIDENCE_AUDIT_RATE", "0.02")),
+)
+
 def evaluate_confidence(state: State):
-    docs_content = "\n\n".join(doc.page_content for doc in state["context"])
-    confidence_prompt = ChatPromptTemplate.from_template(
-        """
-        You are evaluating the quality of an assistant's answer given retrieved context.
-        Score a single number 'confidence' from 0 to 1 (float) for how well the answer is grounded,
-        accurate, and complete according to the provided context.
-        Return only the 'confidence' field.
-
-        Question:\n{question}\n\nContext:\n{context}\n\nAnswer:\n{answer}
-        """
-    )
-    conf_messages = confidence_prompt.invoke({
-        "question": state["question"],
-        "context": docs_content,
-        "answer": state["answer"],
-    })
-    conf_resp = confidence_llm.invoke(conf_messages)
-    return {"answer_confidence": float(getattr(conf_resp, 'confidence', 0.0))}
+    confidence = confidence_scorer.score(state["question"], _context_text(state), state["answer"], _judge_confidence)
+    return {"answer_confidence": confidence}
 
-def resolve_and_format(state: State):
-    # Decision logic
-    labels = state["classification"].get('label', [])
-    confidence = state.get("answer_confidence", 0.0)
-    
-    rag_labels = {'How-to', 'Product', 'Best practices', 'API/SDK', 'SSO'}
+async def aevaluate_confidence(state: State):
+    confidence = await confidence_scorer.ascore(
+        state["question"], _context_text(state), state["answer"], _ajudge_confidence)
+    return {"answer_confidence": confidence}
+
+rag_labels = {'How-to', 'Product', 'Best practices', 'API/SDK', 'SSO'}
+
+def decide_routing(labels: List[str]) -> dict:
+    """Label-only routing decision; needs no retrieval or generation."""
     needs_rag = bool(set(labels) & rag_labels)
-    
+
     if 'Bug' in labels:
         routing_team = 'Engineering'
     elif 'Permissions' in labels or 'SSO' in labels:
@@ -121,6 +377,17 @@ def resolve_and_format(state: State):
         routing_team = 'Data Engineering'
     else:
         routing_team = 'General Support'
+
+    return {"needs_rag": needs_rag, "routing_team": routing_team}
+
+def resolve_and_format(state: State):
+    # Decision logic
+    labels = state["classification"].get('label', [])
+    confidence = state.get("answer_confidence", 0.0)
+    
+    routing = decide_routing(labels)
+    needs_rag = routing["needs_rag"]
+    routing_team = routing["routing_team"]
     
     # Extract sources
     sources = []
@@ -133,6 +400,12 @@ def resolve_and_format(state: State):
                 sources.append(src)
     except Exception:
         pass
+    if not sources and state.get("semantic_cache_hit"):
+        sources = state.get("sources", [])
+    
+    if needs_rag and state.get("query_vector") and not state.get("semantic_cache_hit"):
+        semantic_answer_cache.store(state["query_vector"], state["question"],
+                                    state.get("answer", ""), confidence, sources)
     
     # Format response
     answer = state.get("answer", "")
@@ -141,11 +414,11 @@ def resolve_and_format(state: State):
         routed_topic = labels[0] if labels else 'General'
         final_response = f"This ticket has been classified as a '{routed_topic}' issue and routed to the {routing_team} team."
     else:
-        if confidence >= 0.75:
+        if confidence >= CONFIDENCE_HIGH:
             final_response = answer
             if sources:
                 final_response += "\n\nSources:\n" + "\n".join(f"- {s}" for s in sources[:5])
-        elif confidence >= 0.4:
+        elif confidence >= CONFIDENCE_LOW:
             final_response = (
                 "Thanks for reaching out! We believe the following may resolve your issue. "
                 "A specialist will also review and follow up if needed.\n\n" + answer
@@ -167,15 +440,45 @@ def resolve_and_format(state: State):
 
 graph_builder = StateGraph(State)
 
-graph_builder.add_node("classify", classify)
-graph_builder.add_node("retrieve", retrieve)
-graph_builder.add_node("generate", generate)
-graph_builder.add_node("evaluate_confidence", evaluate_confidence)
+# Each I/O node has a sync and an async implementation: graph.invoke uses the
+# former, graph.ainvoke (the ASGI server) the latter with async OpenAI clients.
+graph_builder.add_node("classify", RunnableLambda(classify, afunc=aclassify))
+graph_builder.add_node("semantic_lookup", RunnableLambda(semantic_lookup, afunc=asemantic_lookup))
+graph_builder.add_node("retrieve", RunnableLambda(retrieve, afunc=aretrieve))
+graph_builder.add_node("generate", RunnableLambda(generate, afunc=agenerate))
+graph_builder.add_node("evaluate_confidence", RunnableLambda(evaluate_confidence, afunc=aevaluate_confidence))
 graph_builder.add_node("resolve_and_format", resolve_and_format)
 
-graph_builder.add_edge(START, "classify")
-graph_builder.add_edge(START, "retrieve")
-graph_builder.add_edge("classify", "generate")
+# Per-route counters; a "direct" ticket skips retrieve (one embedding call),
+# generate and evaluate_confidence (two LLM calls).
+_route_lock = threading.Lock()
+route_counts = {"rag": 0, "direct": 0}
+
+def route_stats() -> dict:
+    with _route_lock:
+        counts = dict(route_counts)
+    return {
+        **counts,
+        "llm_calls_saved": 2 * counts["direct"],
+        "embedding_calls_saved": counts["direct"],
+    }
+
+def route_by_labels(state: State):
+    route = "rag" if decide_routing(state["classification"].get("label", []))["needs_rag"] else "direct"
+    with _route_lock:
+        route_counts[route] += 1
+    return "semantic_lookup" if route == "rag" else "resolve_and_format"
+
+def route_entry(state: State):
+    # A caller that already classified the ticket (e.g. /classify then /resolve)
+    # passes the result in, so routing can happen before any node runs.
+    if state.get("classification"):
+        return route_by_labels(state)
+    return "classify"
+
+graph_builder.add_conditional_edges(START, route_entry, ["classify", "semantic_lookup", "resolve_and_format"])
+graph_builder.add_conditional_edges("classify", route_by_labels, ["semantic_lookup", "resolve_and_format"])
+graph_builder.add_conditional_edges("semantic_lookup", route_after_lookup, ["retrieve", "generate", "resolve_and_format"])
 graph_builder.add_edge("retrieve", "generate")
 graph_builder.add_edge("generate", "evaluate_confidence")
 graph_builder.add_edge("evaluate_confidence", "resolve_and_format")
@@ -183,24 +486,110 @@ graph_builder.add_edge("resolve_and_format", END)
 
 graph = graph_builder.compile()
 
-def run_rag_graph(question: str) -> dict:
-    response = graph.invoke({"question": question})
+# Classification-only pipeline: runs just the classify node, so callers that
+# only return labels/sentiment/priority skip retrieval, generation and scoring.
+classification_builder = StateGraph(State)
+classification_builder.add_node("classify", RunnableLambda(classify, afunc=aclassify))
+classification_builder.add_edge(START, "classify")
+classification_builder.add_edge("classify", END)
+
+classification_graph = classification_builder.compile()
+
+def precomputed_classification(classification: Optional[dict]) -> Optional[dict]:
+    """Keep only the Classification fields of a client-supplied result, or None if unusable"""
+    if not isinstance(classification, dict) or not isinstance(classification.get("label"), list):
+        return None
+    return {
+        "label": [str(l) for l in classification["label"]],
+        "sentiment": str(classification.get("sentiment", "Neutral")),
+        "priority": str(classification.get("priority", "P2")),
+    }
+
+def _rag_initial_state(question: str, classification: Optional[dict]) -> dict:
+    initial_state = {"question": question}
+    if classification:
+        initial_state["classification"] = classification
+    return initial_state
+
+def run_rag_graph(question: str, classification: Optional[dict] = None) -> dict:
+    classification = precomputed_classification(classification)
+    response = graph.invoke(_rag_initial_state(question, classification))
+    return _rag_result(response, classification)
+
+async def arun_rag_graph(question: str, classification: Optional[dict] = None) -> dict:
+    classification = precomputed_classification(classification)
+    response = await graph.ainvoke(_rag_initial_state(question, classification))
+    return _rag_result(response, classification)
+
+def _answer_token(chunk) -> Optional[str]:
+    message, metadata = chunk
+    if metadata.get("langgraph_node") != "generate":
+        return None
+    return getattr(message, "content", None) or None
+
+def stream_rag_graph(question: str, classification: Optional[dict] = None):
+    """
+    Run the RAG graph and yield {"type": "token", "content": ...} for each
+    answer token from generate as it arrives, then {"type": "result",
+    "result": <run_rag_graph result>} once resolve_and_format has finished.
+    Tickets answered without generate (direct routes, semantic cache hits)
+    yield only the result.
+    """
+    classification = precomputed_classification(classification)
+    final_state = {}
+    for mode, chunk in graph.stream(_rag_initial_state(question, classification), stream_mode=["messages", "values"]):
+        if mode == "values":
+            final_state = chunk
+        else:
+            token = _answer_token(chunk)
+            if token:
+                yield {"type": "token", "content": token}
+    yield {"type": "result", "result": _rag_result(final_state, classification)}
+
+async def astream_rag_graph(question: str, classification: Optional[dict] = None):
+    """Async form of stream_rag_graph for the ASGI server"""
+    classification = precomputed_classification(classification)
+    final_state = {}
+    async for mode, chunk in graph.astream(_rag_initial_state(question, classification), stream_mode=["messages", "values"]):
+        if mode == "values":
+            final_state = chunk
+        else:
+            token = _answer_token(chunk)
+            if token:
+                yield {"type": "token", "content": token}
+    yield {"type": "result", "result": _rag_result(final_state, classification)}
+
+def _rag_result(response: dict, classification: Optional[dict]) -> dict:
     return {
         "answer": response.get("answer", ""),
         "confidence": response.get("answer_confidence", 0.0),
         "sources": response.get("sources", []),
         "classification": response.get("classification", {}),
         "resolution_decision": response.get("resolution_decision", {}),
-        "final_response": response.get("final_response", "")
+        "final_response": response.get("final_response", ""),
+        "classification_reused": classification is not None,
+        "semantic_cache_hit": response.get("semantic_cache_hit", False),
+        "lexical_shortcut": response.get("lexical_shortcut", False),
+        "context_tokens_saved": response.get("context_tokens_saved", 0)
     }
 
 def run_classification_only(question: str) -> dict:
-    response = graph.invoke({"question": question})
+    response = classification_graph.invoke({"question": question})
+    return _classification_result(response)
+
+async def arun_classification_only(question: str) -> dict:
+    response = await classification_graph.ainvoke({"question": question})
+    return _classification_result(response)
+
+def _classification_result(response: dict) -> dict:
+    classification = response.get("classification", {})
+    routing = decide_routing(classification.get("label", []))
     return {
-        "classification": response.get("classification", {}),
-        "resolution_decision": response.get("resolution_decision", {})
+        "classification": classification,
+        "resolution_decision": {
+            "needs_rag": routing["needs_rag"],
+            # No answer is generated on this path, so there is no answer confidence
+            "confidence_threshold": None,
+            "routing_team": routing["routing_team"]
+        }
     }
-
-import matplotlib.pyplot as plt
-graph.get_graph().draw_mermaid_png(output_file_path="graph.png")
-print("Graph saved as graph.png")
\ No newline at end of file
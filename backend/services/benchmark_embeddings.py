@@ -0,0 +1,158 @@
+import argparse
+import math
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+try:
+    from services.vector_quant import QuantizedIndex, normalize_rows, reduce_dimensions, recall_at_k, top_k
+    from services.mmap_index import MmapVectorIndex, default_probes, write_mmap_index
+except ImportError:
+    from backend.services.vector_quant import QuantizedIndex, normalize_rows, reduce_dimensions, recall_at_k, top_k
+    from backend.services.mmap_index import MmapVectorIndex, default_probes, write_mmap_index
+
+load_dotenv()
+
+def load_chroma_vectors(collection_name: str, persist_directory: str, page_size: int = 5000):
+    """Every stored vector at full precision, paged out of Chroma"""
+    from langchain_chroma import Chroma
+    store = Chroma(collection_name=collection_name, persist_directory=persist_directory)
+    ids, vectors, offset = [], [], 0
+    while True:
+        page = store.get(include=["embeddings"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            break
+        ids.extend(page["ids"])
+        vectors.append(np.asarray(page["embeddings"], dtype=np.float32))
+        offset += len(page["ids"])
+    return ids, np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+def load_ticket_queries(model: str, limit: int):
+    """Embed sample ticket texts as realistic queries (needs OPENAI_API_KEY)"""
+    from langchain_openai import OpenAIEmbeddings
+    try:
+        from services.data_loader import load_sample_tickets
+    except ImportError:
+        from backend.services.data_loader import load_sample_tickets
+    texts = [f"{t.get('subject','')}\n{t.get('body','')}".strip() for t in load_sample_tickets()[:limit]]
+    return np.asarray(OpenAIEmbeddings(model=model).embed_documents(texts), dtype=np.float32)
+
+def mmap_rows(vectors: np.ndarray, queries: np.ndarray, exact: np.ndarray, k: int, dimensions: int, mode: str,
+              rescore_factor: int, ivf_lists: int, probes: int):
+    """The mmap backend as served (IVF probes, full-precision rescoring when quantized), built in a temp dir"""
+    with tempfile.TemporaryDirectory() as directory:
+        n = len(vectors)
+        write_mmap_index(directory, "benchmark", [str(i) for i in range(n)], vectors, [""] * n, [None] * n,
+                         mode, ivf_lists)
+        index = MmapVectorIndex(directory, "benchmark")
+        conn = sqlite3.connect(index.docs_path)
+        try:
+            row_ids = dict(conn.execute("SELECT row, id FROM docs").fetchall())
+        finally:
+            conn.close()
+        lists = len(index.centroids)
+        probes = (probes or default_probes(lists)) if lists else 0
+        start = time.perf_counter()
+        approx = [[int(row_ids[row]) for row, _ in index.search(q, k, probes or None, rescore_factor)] for q in queries]
+        elapsed = time.perf_counter() - start
+        nbytes = index.codes.nbytes + (index.scales.nbytes if index.scales is not None else 0)
+        row = {
+            "dimensions": dimensions,
+            "storage": f"mmap-{mode}",
+            "rescore": index.full is not None,
+            "ivf": f"{probes}/{lists}" if lists else "exact",
+            "recall": recall_at_k(exact, np.asarray(approx), k),
+            "bytes_per_vector": nbytes / max(1, n),
+            "ms_per_query": 1000.0 * elapsed / max(1, len(queries)),
+        }
+        # Drop the maps before the directory is removed
+        del index
+    return row
+
+def run_benchmark(vectors: np.ndarray, queries: np.ndarray, k: int, dimensions_options, modes, rescore_factor: int,
+                  ivf_lists: int = 0, probes: int = 0):
+    vectors = normalize_rows(vectors)
+    queries = normalize_rows(queries)
+    ids = [str(i) for i in range(len(vectors))]
+    exact = top_k(queries @ vectors.T, k)
+    rows = []
+
+    for dimensions in dimensions_options:
+        reduced = reduce_dimensions(vectors, dimensions)
+        for mode in modes:
+            index = QuantizedIndex.build(ids, reduced, mode)
+            for rescore in ([False, True] if mode != "none" else [False]):
+                full_fn = (lambda cand: {c: reduced[int(c)] for c in cand}) if rescore else None
+                start = time.perf_counter()
+                approx = [[int(i) for i, _ in index.search(q, k, rescore_factor, full_fn)] for q in queries]
+                elapsed = time.perf_counter() - start
+                rows.append({
+                    "dimensions": dimensions,
+                    "storage": mode,
+                    "rescore": rescore,
+                    "ivf": "exact",
+                    "recall": recall_at_k(exact, np.asarray(approx), k),
+                    "bytes_per_vector": index.nbytes / max(1, len(ids)),
+                    "ms_per_query": 1000.0 * elapsed / max(1, len(queries)),
+                })
+            if ivf_lists:
+                rows.append(mmap_rows(reduced, reduce_dimensions(queries, dimensions), exact, k, dimensions, mode,
+                                      rescore_factor, ivf_lists, probes))
+    return rows
+
+def main():
+    """
+    Recall@k of reduced-dimension and quantized storage, and of the IVF mmap
+    index, against exact float32 search at native dimensions, with memory per
+    vector and query latency.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark embedding storage profiles")
+    parser.add_argument("--collection", default="example_collection")
+    parser.add_argument("--persist-directory", default=os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_langchain_db"))
+    parser.add_argument("--vectors", help="Load vectors from a .npy file instead of Chroma")
+    parser.add_argument("--queries", type=int, default=200, help="Number of query vectors")
+    parser.add_argument("--ticket-queries", action="store_true", help="Embed sample tickets as queries instead of reusing stored vectors")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "text-embedding-3-large"))
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--dimensions", default="native,1024,512,256")
+    parser.add_argument("--modes", default="none,float16,int8")
+    parser.add_argument("--rescore-factor", type=int, default=int(os.getenv("EMBEDDING_RESCORE_FACTOR", "4")))
+    parser.add_argument("--ivf-lists", type=int, default=int(os.getenv("MMAP_IVF_LISTS", "0")),
+                        help="IVF lists for the mmap rows; 0 uses sqrt(vectors), -1 skips them")
+    parser.add_argument("--probes", type=int, default=int(os.getenv("MMAP_IVF_PROBES", "0")),
+                        help="IVF lists scanned per query; 0 scans a third of them")
+    args = parser.parse_args()
+
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float32)
+    else:
+        _, vectors = load_chroma_vectors(args.collection, args.persist_directory)
+    if not len(vectors):
+        print("No vectors to benchmark")
+        return
+
+    if args.ticket_queries:
+        queries = load_ticket_queries(args.model, args.queries)
+    else:
+        # Stored chunks stand in for queries; each one's nearest neighbour is itself in every profile
+        rng = np.random.default_rng(0)
+        queries = vectors[rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)]
+
+    native = vectors.shape[1]
+    dimensions_options = [native if d == "native" else min(int(d), native) for d in args.dimensions.split(",")]
+    ivf_lists = args.ivf_lists if args.ivf_lists else max(1, int(math.sqrt(len(vectors))))
+    rows = run_benchmark(vectors, queries, args.k, dimensions_options, args.modes.split(","), args.rescore_factor,
+                         max(0, ivf_lists), args.probes)
+
+    print(f"{len(vectors)} vectors, {len(queries)} queries, recall@{args.k} vs float32 at {native} dims\n")
+    print(f"{'dims':>6} {'storage':>13} {'rescore':>8} {'ivf':>9} {'recall':>8} {'bytes/vec':>10} {'ms/query':>9}")
+    for row in rows:
+        print(f"{row['dimensions']:>6} {row['storage']:>13} {str(row['rescore']):>8} {row['ivf']:>9} {row['recall']:>8.3f} "
+              f"{row['bytes_per_vector']:>10.0f} {row['ms_per_query']:>9.3f}")
+
+if __name__ == "__main__":
+    main()
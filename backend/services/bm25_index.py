@@ -0,0 +1,203 @@
+import json
+import os
+import re
+import sqlite3
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Identifiers such as `snowflake-connector`, `asset.get_by_guid` or `ATLAN-403`
+# stay whole; their parts are indexed as well so either spelling matches.
+_TOKEN_RE = re.compile(r"[A-Za-z0-9]+(?:[._\-/:][A-Za-z0-9]+)*")
+_PART_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from how i if in is it my of on or our so that the "
+    "this to was we what when where which who why will with you your".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for match in _TOKEN_RE.finditer(text or ""):
+        word = match.group(0)
+        lowered = word.lower()
+        if lowered not in STOPWORDS:
+            tokens.append(lowered)
+        parts = _PART_RE.findall(word)
+        if len(parts) > 1:
+            tokens.extend(p.lower() for p in parts if p.lower() not in STOPWORDS)
+    return tokens
+
+def bm25_index_path(persist_directory: str, collection_name: str) -> str:
+    return os.path.join(persist_directory, f"{collection_name}.bm25.sqlite3")
+
+# Bumped when the table layout changes; an older file is rebuilt by the next build
+BM25_SCHEMA_VERSION = 2
+# Chunk ids per IN (...) clause, under SQLite's bound-parameter limit
+_ID_BATCH = 500
+
+class BM25Writer:
+    """
+    Incremental writer for the BM25 inverted index: one `docs` row per chunk
+    and one `postings` row per (term, chunk), clustered by term so a query
+    reads only its own terms. build_index adds and removes chunks batch by
+    batch as it writes Chroma, so a build costs what it changed, not the
+    corpus. Document count and total length are kept in `meta` for BM25's
+    length normalization. WAL lets serving workers read during a build.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        if self._meta("schema") != BM25_SCHEMA_VERSION:
+            self._reset()
+
+    def _meta(self, key: str):
+        try:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def _reset(self):
+        with self._conn:
+            for table in ("meta", "docs", "postings"):
+                self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self._conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value)")
+            self._conn.execute(
+                "CREATE TABLE docs (row INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, text TEXT NOT NULL, "
+                "metadata TEXT NOT NULL, length INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE postings (term TEXT NOT NULL, row INTEGER NOT NULL, tf INTEGER NOT NULL, "
+                "PRIMARY KEY (term, row)) WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE INDEX postings_by_row ON postings(row)")
+            self._conn.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [("schema", BM25_SCHEMA_VERSION), ("documents", 0), ("total_length", 0), ("complete", 0)],
+            )
+
+    @property
+    def complete(self) -> bool:
+        """False until every chunk already in the store has been added once (see mark_complete)"""
+        return bool(self._meta("complete"))
+
+    def mark_complete(self):
+        with self._conn:
+            self._conn.execute("UPDATE meta SET value = 1 WHERE key = 'complete'")
+
+    def _adjust(self, documents: int, length: int):
+        self._conn.execute("UPDATE meta SET value = value + ? WHERE key = 'documents'", (documents,))
+        self._conn.execute("UPDATE meta SET value = value + ? WHERE key = 'total_length'", (length,))
+
+    def _remove(self, ids: Sequence[str]):
+        ids = list(ids)
+        for start in range(0, len(ids), _ID_BATCH):
+            batch = ids[start:start + _ID_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(f"SELECT row, length FROM docs WHERE id IN ({placeholders})", batch).fetchall()
+            if not rows:
+                continue
+            self._conn.executemany("DELETE FROM postings WHERE row = ?", [(row,) for row, _ in rows])
+            self._conn.executemany("DELETE FROM docs WHERE row = ?", [(row,) for row, _ in rows])
+            self._adjust(-len(rows), -sum(length for _, length in rows))
+
+    def add(self, ids: Sequence[str], documents: Sequence[str], metadatas: Sequence[Optional[Dict[str, Any]]]):
+        """Index chunks, replacing any already indexed under the same id"""
+        with self._conn:
+            self._remove(ids)
+            total = 0
+            for doc_id, text, metadata in zip(ids, documents, metadatas):
+                counts = Counter(tokenize(text))
+                length = sum(counts.values())
+                row = self._conn.execute(
+                    "INSERT INTO docs (id, text, metadata, length) VALUES (?, ?, ?, ?)",
+                    (doc_id, text or "", json.dumps(metadata or {}), length),
+                ).lastrowid
+                self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                                       ((term, row, tf) for term, tf in counts.items()))
+                total += length
+            self._adjust(len(ids), total)
+
+    def remove(self, ids: Sequence[str]):
+        with self._conn:
+            self._remove(ids)
+
+    def __len__(self) -> int:
+        return int(self._meta("documents") or 0)
+
+    def close(self):
+        self._conn.close()
+
+class BM25Index:
+    """Okapi BM25 over the chunks build_index wrote, read from the file BM25Writer maintains"""
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+
+    def _connect(self):
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    @staticmethod
+    def _totals(conn) -> Tuple[int, float]:
+        meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('documents', 'total_length')"))
+        return int(meta.get("documents", 0)), float(meta.get("total_length", 0))
+
+    def __len__(self) -> int:
+        conn = self._connect()
+        try:
+            return self._totals(conn)[0]
+        finally:
+            conn.close()
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[int, float]]:
+        """Top-k (row, score) pairs; empty when no query term is in the index"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        conn = self._connect()
+        try:
+            n, total_length = self._totals(conn)
+            placeholders = ",".join("?" * len(terms))
+            postings = conn.execute(
+                f"SELECT p.term, p.row, p.tf, d.length FROM postings p JOIN docs d ON d.row = p.row "
+                f"WHERE p.term IN ({placeholders})",
+                terms,
+            ).fetchall()
+        finally:
+            conn.close()
+        if not postings or not n:
+            return []
+
+        term_ids = {term: i for i, term in enumerate(terms)}
+        term_index = np.fromiter((term_ids[p[0]] for p in postings), dtype=np.int64, count=len(postings))
+        rows = np.fromiter((p[1] for p in postings), dtype=np.int64, count=len(postings))
+        tfs = np.fromiter((p[2] for p in postings), dtype=np.float32, count=len(postings))
+        lengths = np.fromiter((p[3] for p in postings), dtype=np.float32, count=len(postings))
+
+        df = np.bincount(term_index, minlength=len(terms))
+        idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+        norm = self.k1 * (1.0 - self.b + self.b * lengths / ((total_length / n) or 1.0))
+        contributions = idf[term_index] * tfs * (self.k1 + 1.0) / (tfs + norm)
+        matched, inverse = np.unique(rows, return_inverse=True)
+        scores = np.bincount(inverse, weights=contributions)
+        top = np.argsort(-scores)[:k]
+        return [(int(matched[i]), float(scores[i])) for i in top]
+
+    def documents(self, rows: List[int]) -> List[Tuple[int, str, str, Dict[str, Any]]]:
+        """(row, chunk id, text, metadata) for `rows` still stored, in the order given"""
+        if not rows:
+            return []
+        conn = self._connect()
+        try:
+            placeholders = ",".join("?" * len(rows))
+            records = conn.execute(f"SELECT row, id, text, metadata FROM docs WHERE row IN ({placeholders})", rows)
+            by_row = {row: (row, doc_id, text, json.loads(metadata)) for row, doc_id, text, metadata in records}
+        finally:
+            conn.close()
+        return [by_row[row] for row in rows if row in by_row]
@@ -1,27 +1,74 @@
+import json
 import os
+import time
 from dotenv import load_dotenv
 from datetime import datetime
 
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
+import numpy as np
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import SitemapLoader, SeleniumURLLoader
+from langchain_community.document_loaders import SitemapLoader
 from bs4 import BeautifulSoup
 import requests
+try:
+    from services.index_version import write_index_version
+    from services.index_manifest import IndexManifest, chunk_id, diff_source
+    from services.crawler import iter_crawl
+    from services.embedding_profile import EmbeddingProfile
+    from services.vector_quant import QuantizedIndex, quantized_index_path
+    from services.mmap_index import mmap_index_pointer, write_mmap_pages
+    from services.retrievers import open_chroma
+    from services.bm25_index import BM25Writer, bm25_index_path
+except ImportError:
+    from backend.services.index_version import write_index_version
+    from backend.services.index_manifest import IndexManifest, chunk_id, diff_source
+    from backend.services.crawler import iter_crawl
+    from backend.services.embedding_profile import EmbeddingProfile
+    from backend.services.vector_quant import QuantizedIndex, quantized_index_path
+    from backend.services.mmap_index import mmap_index_pointer, write_mmap_pages
+    from backend.services.retrievers import open_chroma
+    from backend.services.bm25_index import BM25Writer, bm25_index_path
 
 load_dotenv()
 
+CHROMA_PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_langchain_db")
+CRAWL_CACHE_DIR = os.getenv("CRAWL_CACHE_DIR", os.path.join(CHROMA_PERSIST_DIRECTORY, "crawl_cache"))
+INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "64"))
+# Must match graph.py, which reads the same env vars
+embedding_profile = EmbeddingProfile.from_env()
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+MMAP_IVF_LISTS = int(os.getenv("MMAP_IVF_LISTS", "0"))
+# A sitemap listing fewer than this share of a site's indexed pages is treated as partial: nothing is pruned
+INDEX_PRUNE_MIN_COVERAGE = float(os.getenv("INDEX_PRUNE_MIN_COVERAGE", "0.5"))
+
+class TimedEmbeddings:
+    """Embeddings proxy that records how many texts were embedded and how long it took"""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.texts = 0
+        self.seconds = 0.0
+
+    def embed_documents(self, texts):
+        start = time.perf_counter()
+        vectors = self.inner.embed_documents(texts)
+        self.seconds += time.perf_counter() - start
+        self.texts += len(texts)
+        return vectors
+
+    def embed_query(self, text):
+        return self.inner.embed_query(text)
+
 # Initialize embeddings and vector store
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-vector_store = Chroma(
-    collection_name="example_collection",
-    embedding_function=embeddings,
-    persist_directory=os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_langchain_db"),
-)
-
-def get_all_urls(base_url: str) -> list:
-    """Get URLs from sitemap and fallback to scraping"""
+embeddings = TimedEmbeddings(embedding_profile.make_embeddings())
+vector_store = open_chroma(embedding_profile, embeddings, CHROMA_PERSIST_DIRECTORY)
+
+def get_all_urls(base_url: str) -> tuple:
+    """
+    Get URLs from sitemap and fallback to scraping.
+    Returns (urls, source) with source "sitemap", "homepage" or None.
+    """
     urls = []
+    source = None
 
     # Try sitemap first
     try:
@@ -30,6 +77,8 @@ def get_all_urls(base_url: str) -> list:
         docs = loader.load()
         urls.extend([doc.metadata['source'] for doc in docs])
         print(f"Loaded {len(urls)} URLs from sitemap")
+        if urls:
+            source = "sitemap"
     except Exception as e:
         print(f"Sitemap loading failed: {e}")
 
@@ -46,60 +95,281 @@ def get_all_urls(base_url: str) -> list:
                 elif href and href.startswith('/'):
                     urls.append(f"{base_url.rstrip('/')}{href}")
             print(f"Loaded {len(urls)} URLs from homepage scraping")
+            if urls:
+                source = "homepage"
         except Exception as e:
             print(f"Scraping failed: {e}")
 
-    return list(set(urls))
+    return list(set(urls)), source
 
-def build_index():
-    # Build index for both docs.atlan.com and developer.atlan.com
-    base_urls = [
-        "https://docs.atlan.com",
-        "https://developer.atlan.com"
-    ]
-    
-    all_docs = []
-    
+def vanished_sources(manifest: IndexManifest, base_url: str, urls: list, url_source: str) -> set:
+    """
+    Indexed pages of `base_url` missing from `urls`. Only a full sitemap is
+    trusted to list every page: homepage scraping, or a sitemap covering less
+    than INDEX_PRUNE_MIN_COVERAGE of the indexed pages, prunes nothing.
+    """
+    indexed = manifest.sources_for_site(base_url)
+    vanished = indexed - set(urls)
+    if not vanished:
+        return vanished
+    if url_source != "sitemap":
+        print(f"Not pruning {len(vanished)} pages of {base_url}: URLs came from {url_source}, not the sitemap")
+        return set()
+    coverage = len(indexed & set(urls)) / len(indexed)
+    if coverage < INDEX_PRUNE_MIN_COVERAGE:
+        print(f"Not pruning {len(vanished)} pages of {base_url}: sitemap lists only "
+              f"{coverage:.0%} of indexed pages (INDEX_PRUNE_MIN_COVERAGE={INDEX_PRUNE_MIN_COVERAGE})")
+        return set()
+    return vanished
+
+def new_pipeline_stats() -> dict:
+    return {
+        "stages": {stage: {"items": 0, "seconds": 0.0} for stage in ("fetch", "split", "embed", "write")},
+        "added": 0, "updated": 0, "deleted": 0, "skipped": 0, "batches": 0,
+    }
+
+def iter_pages(base_urls: list, manifest: IndexManifest, bm25: BM25Writer, stats: dict):
+    """Fetch stage: yield pages one at a time as the crawler completes them"""
+    fetch_stats = stats["stages"]["fetch"]
     for base_url in base_urls:
         print(f"\n=== Building index for {base_url} ===")
-        urls = get_all_urls(base_url)
+        urls, url_source = get_all_urls(base_url)
 
         if not urls:
             print(f"No URLs found for {base_url}")
             continue
 
-        # Load content from URLs
-        loader = SeleniumURLLoader(urls=urls)
-        docs = loader.load()
-        print(f"Loaded {len(docs)} documents from {len(urls)} URLs")
+        # Pages that were indexed before but are no longer listed by their site
+        for source in vanished_sources(manifest, base_url, urls, url_source):
+            delete_chunks(manifest, bm25, manifest.chunk_ids_for(source), stats)
 
-        # Add source and last_updated metadata
-        for doc in docs:
+        crawl_stats = {}
+        for doc in iter_crawl(urls, stats=crawl_stats, cache_dir=CRAWL_CACHE_DIR):
+            # Add source and last_updated metadata
             doc.metadata["last_updated"] = datetime.utcnow().isoformat()
             doc.metadata["source_site"] = base_url
+            yield doc
 
-        all_docs.extend(docs)
+        fetch_stats["items"] += crawl_stats["pages"]
+        fetch_stats["seconds"] += crawl_stats["seconds"]
+        print(
+            f"Crawl: {crawl_stats['fetched']} fetched, {crawl_stats['not_modified']} not modified, "
+            f"{crawl_stats['needs_js']} via Selenium, {crawl_stats['error']} failed"
+        )
 
-    if not all_docs:
-        raise Exception("No documents found to load from any source")
+def iter_page_chunks(pages, stats: dict, chunk_size: int = 1000, chunk_overlap: int = 200):
+    """Split stage: yield (source, source_site, {chunk_id: chunk}) per page"""
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    split_stats = stats["stages"]["split"]
+    for page in pages:
+        source = page.metadata.get("source")
+        if not source:
+            continue
+        start = time.perf_counter()
+        chunks = {chunk_id(source, c.page_content): c for c in text_splitter.split_documents([page])}
+        split_stats["seconds"] += time.perf_counter() - start
+        split_stats["items"] += len(chunks)
+        yield source, page.metadata.get("source_site", ""), chunks
+
+def iter_index_batches(page_chunks, manifest: IndexManifest, bm25: BM25Writer, stats: dict, batch_size: int,
+                       legacy_index: bool):
+    """
+    Diff stage: compare each page's chunks with the manifest, delete chunks that
+    left the page right away, and yield fixed-size batches of chunks to embed.
+    """
+    batch = []
+    for source, source_site, chunks in page_chunks:
+        diff = diff_source(manifest, source, list(chunks))
+        stats["updated" if diff["existed"] else "added"] += len(diff["add"])
+        stats["skipped"] += len(diff["keep"])
+
+        stale = set(diff["delete"])
+        if legacy_index:
+            # Index predates the manifest: its chunks have random ids, find them by source
+            legacy_ids = set(vector_store.get(where={"source": source}, include=[]).get("ids", []))
+            stale |= legacy_ids - diff["keep"]
+        delete_chunks(manifest, bm25, stale, stats)
+
+        for doc_id in diff["add"]:
+            batch.append((doc_id, chunks[doc_id], source_site))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
 
-    print(f"\nTotal documents loaded: {len(all_docs)}")
+def delete_chunks(manifest: IndexManifest, bm25: BM25Writer, chunk_ids, stats: dict):
+    if not chunk_ids:
+        return
+    vector_store.delete(ids=list(chunk_ids))
+    bm25.remove(list(chunk_ids))
+    manifest.remove(chunk_ids)
+    stats["deleted"] += len(chunk_ids)
 
-    # Split documents
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    all_splits = text_splitter.split_documents(all_docs)
-    print(f"Split into {len(all_splits)} chunks")
+def write_batch(batch: list, manifest: IndexManifest, bm25: BM25Writer, stats: dict):
+    """
+    Embed + write stage for one batch. The chunks go to Chroma, then to the
+    BM25 index, and only then to the manifest, so it doubles as the resume
+    checkpoint: an interrupted build re-run finds these chunks already indexed
+    in both and skips them.
+    """
+    embedded_before = embeddings.seconds
+    start = time.perf_counter()
+    _ = vector_store.add_documents(
+        documents=[doc for _, doc, _ in batch],
+        ids=[doc_id for doc_id, _, _ in batch],
+    )
+    bm25.add(
+        [doc_id for doc_id, _, _ in batch],
+        [doc.page_content for _, doc, _ in batch],
+        [doc.metadata for _, doc, _ in batch],
+    )
+    elapsed = time.perf_counter() - start
+    embed_seconds = embeddings.seconds - embedded_before
 
-    # Avoid re-indexing existing sources
-    existing = vector_store.get(include=["metadatas"])
-    existing_sources = {m["source"] for m in existing["metadatas"] if "source" in m}
-    new_splits = [d for d in all_splits if d.metadata.get("source") not in existing_sources]
+    manifest.add((doc_id, doc.metadata.get("source", ""), site) for doc_id, doc, site in batch)
+    stats["stages"]["embed"]["items"] += len(batch)
+    stats["stages"]["embed"]["seconds"] += embed_seconds
+    stats["stages"]["write"]["items"] += len(batch)
+    stats["stages"]["write"]["seconds"] += elapsed - embed_seconds
+    stats["batches"] += 1
+
+def stored_count() -> int:
+    return vector_store._collection.count()
+
+def iter_stored(include: list, page_size: int = 5000):
+    """Page every record out of Chroma: dicts of ids, a float32 `embeddings` matrix and any other `include` fields"""
+    offset = 0
+    while True:
+        page = vector_store.get(include=include, limit=page_size, offset=offset)
+        if not page["ids"]:
+            return
+        if "embeddings" in include:
+            page["embeddings"] = np.asarray(page["embeddings"], dtype=np.float32)
+        yield page
+        offset += len(page["ids"])
+
+def export_quantized_index():
+    """
+    Write the compact search matrix graph.py loads when EMBEDDING_QUANTIZATION
+    is float16 or int8. Chroma keeps the float32 vectors, which retrieval reads
+    back only to rescore candidates.
+    """
+    pages = ((page["ids"], page["embeddings"]) for page in iter_stored(["embeddings"]))
+    index = QuantizedIndex.from_pages(pages, stored_count(), embedding_profile.quantization)
+    if not index.ids:
+        return None
+
+    index.save(quantized_index_path(CHROMA_PERSIST_DIRECTORY, embedding_profile.collection_name()))
+    print(
+        f"Exported {len(index.ids)} vectors as {index.mode} x {index.dimensions} "
+        f"({index.nbytes / max(1, len(index.ids)):.0f} bytes/vector, {index.nbytes / 1024 / 1024:.1f} MiB)"
+    )
+    return index
+
+def export_mmap_index():
+    """
+    Write the memory-mapped index MmapRetriever serves from when
+    VECTOR_BACKEND=mmap, with MMAP_IVF_LISTS coarse lists (0 = exact search).
+    """
+    pages = (
+        (page["ids"], page["embeddings"], page["documents"], page["metadatas"])
+        for page in iter_stored(["embeddings", "documents", "metadatas"])
+    )
+    info = write_mmap_pages(
+        CHROMA_PERSIST_DIRECTORY, embedding_profile.collection_name(), pages, stored_count(),
+        embedding_profile.quantization, MMAP_IVF_LISTS,
+    )
+    if info is None:
+        return None
+    print(
+        f"Exported {info['count']} vectors to the mmap index "
+        f"({info['quantization']} x {info['dimensions']}, {info['ivf_lists']} IVF lists)"
+    )
+    return info
+
+def open_bm25_index() -> BM25Writer:
+    """
+    The BM25 index write_batch and delete_chunks keep in step with Chroma. A
+    missing or outdated file is backfilled once from the stored chunks; later
+    builds only touch the chunks they change.
+    """
+    bm25 = BM25Writer(bm25_index_path(CHROMA_PERSIST_DIRECTORY, embedding_profile.collection_name()))
+    if not bm25.complete:
+        started = time.perf_counter()
+        for page in iter_stored(["documents", "metadatas"]):
+            bm25.add(page["ids"], page["documents"], page["metadatas"])
+        bm25.mark_complete()
+        print(f"Backfilled BM25 index: {len(bm25)} chunks ({time.perf_counter() - started:.1f}s)")
+    return bm25
+
+def mmap_index_stale() -> bool:
+    try:
+        with open(mmap_index_pointer(CHROMA_PERSIST_DIRECTORY, embedding_profile.collection_name())) as f:
+            info = json.load(f)
+    except OSError:
+        return True
+    expected_lists = MMAP_IVF_LISTS if info["count"] > MMAP_IVF_LISTS else 0
+    return info["quantization"] != embedding_profile.quantization or info["ivf_lists"] != expected_lists
+
+def quantized_index_stale() -> bool:
+    path = quantized_index_path(CHROMA_PERSIST_DIRECTORY, embedding_profile.collection_name())
+    if not os.path.exists(path):
+        return True
+    return QuantizedIndex.load(path).mode != embedding_profile.quantization
+
+def build_index(batch_size: int = INDEX_BATCH_SIZE):
+    """
+    Streaming pipeline: fetch -> split -> diff -> embed/write in fixed-size batches.
+    Pages flow through one at a time, so memory is bounded by the crawler's
+    look-ahead plus one batch rather than by the corpus size.
+    """
+    # Build index for both docs.atlan.com and developer.atlan.com
+    base_urls = [
+        "https://docs.atlan.com",
+        "https://developer.atlan.com"
+    ]
+
+    stats = new_pipeline_stats()
+    manifest = IndexManifest(CHROMA_PERSIST_DIRECTORY, embedding_profile.collection_name())
+    # Chunks written before the manifest existed are replaced page by page until
+    # one full build completes, even across interrupted runs.
+    legacy_index = manifest.get_meta("legacy_migrated") is None and bool(
+        vector_store.get(limit=1, include=[]).get("ids")
+    )
+    bm25 = open_bm25_index()
+    try:
+        pages = iter_pages(base_urls, manifest, bm25, stats)
+        page_chunks = iter_page_chunks(pages, stats)
+        for batch in iter_index_batches(page_chunks, manifest, bm25, stats, batch_size, legacy_index):
+            write_batch(batch, manifest, bm25, stats)
+            print(f"Indexed batch {stats['batches']} ({len(batch)} chunks)")
+        manifest.set_meta("legacy_migrated", datetime.utcnow().isoformat())
+    finally:
+        manifest.close()
+        bm25.close()
+        changed = bool(stats["batches"] or stats["deleted"])
+        if VECTOR_BACKEND == "mmap":
+            if changed or mmap_index_stale():
+                export_mmap_index()
+        elif embedding_profile.quantization != "none" and (changed or quantized_index_stale()):
+            export_quantized_index()
+        if changed:
+            # Lets running API workers drop answers cached against the old index
+            write_index_version(CHROMA_PERSIST_DIRECTORY)
+
+    if not stats["stages"]["fetch"]["items"]:
+        raise Exception("No documents found to load from any source")
 
-    if new_splits:
-        _ = vector_store.add_documents(documents=new_splits)
-        print(f"Indexed {len(new_splits)} new/updated chunks")
-    else:
-        print("No new documents to index (all up-to-date)")
+    print(
+        f"\nIndex sync: {stats['added']} added, {stats['updated']} updated, "
+        f"{stats['deleted']} deleted, {stats['skipped']} unchanged "
+        f"({stats['skipped']} chunk embeddings saved)"
+    )
+    for stage, stage_stats in stats["stages"].items():
+        rate = stage_stats["items"] / stage_stats["seconds"] if stage_stats["seconds"] else 0.0
+        print(f"  {stage:<6} {stage_stats['items']:>7} items  {stage_stats['seconds']:8.2f}s  {rate:8.1f}/s")
+    return stats
 
 if __name__ == "__main__":
     build_index()
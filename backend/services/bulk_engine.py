@@ -0,0 +1,89 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Dict, Any, Iterator, AsyncIterator, Optional
+try:
+    from graph import run_classification_only, arun_classification_only
+except ImportError:
+    from backend.graph import run_classification_only, arun_classification_only
+
+# One pool per process bounds LLM concurrency across all bulk requests,
+# not just within a single batch.
+BULK_CLASSIFY_WORKERS = max(1, int(os.getenv("BULK_CLASSIFY_WORKERS", "8")))
+
+_executor = ThreadPoolExecutor(max_workers=BULK_CLASSIFY_WORKERS, thread_name_prefix="bulk-classify")
+
+def ticket_text(ticket: Dict[str, Any]) -> str:
+    return f"{ticket.get('subject','')}\n{ticket.get('body','')}".strip()
+
+def classify_ticket(index: int, ticket: Dict[str, Any]) -> Dict[str, Any]:
+    """Classify one ticket; failures are returned, never raised, so they stay per-ticket"""
+    text = ticket_text(ticket)
+    try:
+        result = run_classification_only(text)
+        result["classification"]["original_question"] = text
+        return {"index": index, "id": ticket.get("id"), "classification": result["classification"]}
+    except Exception as e:
+        return {"index": index, "id": ticket.get("id"), "error": str(e)}
+
+def classify_tickets_as_completed(tickets: List[Dict[str, Any]], max_in_flight: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield per-ticket results in completion order, each carrying its input `index`.
+    At most `max_in_flight` tickets from this batch are queued on the shared pool
+    at once, so a huge batch cannot starve concurrent requests.
+    """
+    max_in_flight = max(1, max_in_flight or BULK_CLASSIFY_WORKERS)
+    pending = set()
+    queued = iter(enumerate(tickets))
+
+    try:
+        for index, ticket in queued:
+            pending.add(_executor.submit(classify_ticket, index, ticket))
+            if len(pending) >= max_in_flight:
+                break
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                next_item = next(queued, None)
+                if next_item is not None:
+                    pending.add(_executor.submit(classify_ticket, *next_item))
+    finally:
+        # Client went away mid-stream: drop work that has not started yet
+        for future in pending:
+            future.cancel()
+
+def classify_tickets(tickets: List[Dict[str, Any]], max_in_flight: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Classify tickets concurrently and return results in input order"""
+    results: List[Optional[Dict[str, Any]]] = [None] * len(tickets)
+    for result in classify_tickets_as_completed(tickets, max_in_flight):
+        results[result["index"]] = result
+    return results
+
+async def aclassify_ticket(index: int, ticket: Dict[str, Any], semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    text = ticket_text(ticket)
+    async with semaphore:
+        try:
+            result = await arun_classification_only(text)
+            result["classification"]["original_question"] = text
+            return {"index": index, "id": ticket.get("id"), "classification": result["classification"]}
+        except Exception as e:
+            return {"index": index, "id": ticket.get("id"), "error": str(e)}
+
+async def aclassify_tickets_as_completed(tickets: List[Dict[str, Any]], max_in_flight: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Async counterpart of classify_tickets_as_completed for the ASGI server"""
+    semaphore = asyncio.Semaphore(max(1, max_in_flight or BULK_CLASSIFY_WORKERS))
+    tasks = [asyncio.ensure_future(aclassify_ticket(i, t, semaphore)) for i, t in enumerate(tickets)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def aclassify_tickets(tickets: List[Dict[str, Any]], max_in_flight: Optional[int] = None) -> List[Dict[str, Any]]:
+    results: List[Optional[Dict[str, Any]]] = [None] * len(tickets)
+    async for result in aclassify_tickets_as_completed(tickets, max_in_flight):
+        results[result["index"]] = result
+    return results
@@ -0,0 +1,345 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    from services.bulk_engine import classify_tickets_as_completed
+except ImportError:
+    from backend.services.bulk_engine import classify_tickets_as_completed
+
+class BulkJobStore:
+    """
+    Durable bulk classification jobs in SQLite: one `jobs` row per job and one
+    `items` row per ticket holding its result once classified.
+
+    Items are claimed with a lease (`owner`, `claimed_at`). Owners heartbeat
+    into `runners`; a claim goes back to pending when its lease expires or its
+    owner has not heartbeated for `heartbeat_timeout` seconds, so an
+    interrupted job resumes where it stopped. A restarted process also
+    releases, at once, the claims of dead owners on its own host. Results are
+    written only by the claim's owner, so a ticket is never counted twice.
+    """
+
+    def __init__(self, db_path: str, lease_seconds: float = 300.0, heartbeat_timeout: float = 30.0):
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.heartbeat_timeout = heartbeat_timeout
+        self._lock = threading.Lock()
+        # Autocommit; writes that must be atomic go through _transaction()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                completed INTEGER NOT NULL DEFAULT 0,
+                errors INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS items (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                ticket TEXT NOT NULL,
+                status TEXT NOT NULL,
+                owner TEXT,
+                claimed_at REAL,
+                result TEXT,
+                PRIMARY KEY (job_id, idx)
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS runners (
+                owner TEXT PRIMARY KEY,
+                host TEXT NOT NULL,
+                pid INTEGER NOT NULL,
+                heartbeat_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS items_by_status ON items(job_id, status)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs(status, created_at)")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def heartbeat(self, owner: str, host: str, pid: int):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO runners VALUES (?, ?, ?, ?)", (owner, host, pid, time.time()))
+
+    def reclaim_dead(self, owner: str, host: str, pid: int, pid_alive: Callable[[int], bool]) -> int:
+        """
+        Release the claims of other owners on `host` whose process is gone, or
+        which had this pid before a restart (pid 1 in a container), and forget
+        those owners. Returns the number of items put back to pending.
+        """
+        with self._transaction() as conn:
+            dead = [
+                other for other, other_pid in
+                conn.execute("SELECT owner, pid FROM runners WHERE host = ? AND owner != ?", (host, owner))
+                if other_pid == pid or not pid_alive(other_pid)
+            ]
+            released = 0
+            for other in dead:
+                released += conn.execute(
+                    "UPDATE items SET status = 'pending', owner = NULL, claimed_at = NULL "
+                    "WHERE status = 'claimed' AND owner = ?",
+                    (other,),
+                ).rowcount
+                conn.execute("DELETE FROM runners WHERE owner = ?", (other,))
+        return released
+
+    def submit(self, tickets: List[Dict[str, Any]]) -> str:
+        """Queue a job; its status goes queued -> running -> completed"""
+        if not tickets:
+            raise ValueError("a bulk job needs at least one ticket")
+        job_id = uuid.uuid4().hex
+        with self._transaction() as conn:
+            conn.execute("INSERT INTO jobs (job_id, status, total, created_at) VALUES (?, 'queued', ?, ?)",
+                         (job_id, len(tickets), time.time()))
+            conn.executemany(
+                "INSERT INTO items (job_id, idx, ticket, status) VALUES (?, ?, ?, 'pending')",
+                ((job_id, i, json.dumps(ticket, ensure_ascii=False)) for i, ticket in enumerate(tickets)),
+            )
+        return job_id
+
+    def claim(self, owner: str, limit: int) -> Optional[Dict[str, Any]]:
+        """
+        Lease up to `limit` pending items of the oldest unfinished job.
+        Returns {"job_id", "items": [(idx, ticket), ...]} or None when idle.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE items SET status = 'pending', owner = NULL, claimed_at = NULL "
+                "WHERE status = 'claimed' AND (claimed_at < ? "
+                "OR owner IN (SELECT owner FROM runners WHERE heartbeat_at < ?))",
+                (now - self.lease_seconds, now - self.heartbeat_timeout),
+            )
+            # Their claims were released above; the rows only matter while they might come back
+            conn.execute("DELETE FROM runners WHERE heartbeat_at < ?", (now - self.lease_seconds,))
+            row = conn.execute(
+                "SELECT j.job_id FROM jobs j WHERE j.status IN ('queued', 'running') "
+                "AND EXISTS (SELECT 1 FROM items i WHERE i.job_id = j.job_id AND i.status = 'pending') "
+                "ORDER BY j.created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            job_id = row[0]
+            items = conn.execute(
+                "SELECT idx, ticket FROM items WHERE job_id = ? AND status = 'pending' ORDER BY idx LIMIT ?",
+                (job_id, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE items SET status = 'claimed', owner = ?, claimed_at = ? WHERE job_id = ? AND idx = ?",
+                ((owner, now, job_id, idx) for idx, _ in items),
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?) WHERE job_id = ?",
+                (now, job_id),
+            )
+        return {"job_id": job_id, "items": [(idx, json.loads(ticket)) for idx, ticket in items]}
+
+    def record(self, owner: str, job_id: str, idx: int, result: Dict[str, Any]):
+        """Store one ticket's result and finish the job when nothing is left"""
+        status = "error" if "error" in result else "done"
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE items SET status = ?, result = ?, owner = NULL WHERE job_id = ? AND idx = ? "
+                "AND status = 'claimed' AND owner = ?",
+                (status, json.dumps(result, ensure_ascii=False), job_id, idx, owner),
+            ).rowcount
+            if not updated:
+                # Lease expired and the item was reclaimed elsewhere; that claim records it
+                return
+            conn.execute(
+                "UPDATE jobs SET completed = completed + 1, errors = errors + ? WHERE job_id = ?",
+                (1 if status == "error" else 0, job_id),
+            )
+            remaining = conn.execute(
+                "SELECT 1 FROM items WHERE job_id = ? AND status IN ('pending', 'claimed') LIMIT 1", (job_id,)
+            ).fetchone()
+            if remaining is None:
+                conn.execute("UPDATE jobs SET status = 'completed', finished_at = ? WHERE job_id = ?",
+                             (time.time(), job_id))
+
+    def job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, total, completed, errors, created_at, started_at, finished_at FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        status, total, completed, errors, created_at, started_at, finished_at = row
+        elapsed = ((finished_at or time.time()) - started_at) if started_at else 0.0
+        throughput = completed / elapsed if elapsed > 0 else 0.0
+        return {
+            "job_id": job_id,
+            "status": status,
+            "total": total,
+            "completed": completed,
+            "errors": errors,
+            "pending": total - completed,
+            "progress": completed / total if total else 1.0,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "elapsed_seconds": elapsed,
+            "tickets_per_second": throughput,
+            "eta_seconds": (total - completed) / throughput if throughput and status != "completed" else None,
+        }
+
+    def results(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Items in input order; unfinished ones carry only index, id and status"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, ticket, status, result FROM items WHERE job_id = ? ORDER BY idx LIMIT ? OFFSET ?",
+                (job_id, limit, offset),
+            ).fetchall()
+        page = []
+        for idx, ticket, status, result in rows:
+            if result is not None:
+                entry = json.loads(result)
+                entry.pop("index", None)
+            else:
+                entry = {"id": json.loads(ticket).get("id")}
+            page.append({"index": idx, "status": "pending" if status == "claimed" else status, **entry})
+        return page
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class BulkJobRunner:
+    """
+    `runners` background threads that claim `chunk_size` items at a time and
+    classify them through the bulk engine (run_classification_only on the
+    shared BULK_CLASSIFY_WORKERS pool), recording each result as it finishes.
+    Idle runners poll every `poll_seconds`, so jobs submitted by another
+    process, or left unfinished before a restart, are picked up too.
+    A heartbeat thread refreshes this process's owner row every
+    `heartbeat_seconds`; start() first releases claims of dead owners on
+    this host instead of waiting for their leases.
+    """
+
+    def __init__(self, store: BulkJobStore, runners: int = 1, chunk_size: int = 32, poll_seconds: float = 2.0,
+                 heartbeat_seconds: float = 10.0,
+                 classify_fn: Callable[..., Iterator[Dict[str, Any]]] = classify_tickets_as_completed):
+        self.store = store
+        self.runners = max(1, runners)
+        self.chunk_size = max(1, chunk_size)
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.classify_fn = classify_fn
+        self.host = socket.gethostname()
+        self.owner = f"{self.host}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._counts = {"chunks": 0, "tickets": 0, "busy_seconds": 0.0}
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            pid = os.getpid()
+            self.store.heartbeat(self.owner, self.host, pid)
+            released = self.store.reclaim_dead(self.owner, self.host, pid, _pid_alive)
+            if released:
+                print(f"Released {released} bulk job tickets claimed by dead runners on {self.host}")
+            thread = threading.Thread(target=self._heartbeat, name="bulk-job-heartbeat", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+            for i in range(self.runners):
+                thread = threading.Thread(target=self._run, name=f"bulk-job-runner-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def notify(self):
+        self._wake.set()
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.heartbeat_seconds):
+            try:
+                self.store.heartbeat(self.owner, self.host, os.getpid())
+            except sqlite3.Error as e:
+                print(f"Bulk job heartbeat failed: {str(e)}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                claim = self.store.claim(self.owner, self.chunk_size)
+            except sqlite3.Error as e:
+                print(f"Bulk job claim failed: {str(e)}")
+                claim = None
+            if claim is None:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                continue
+            try:
+                self._process(claim)
+            except Exception as e:
+                # Unrecorded items stay claimed until their lease expires, then run again
+                print(f"Bulk job {claim['job_id']} chunk failed: {str(e)}")
+
+    def _process(self, claim: Dict[str, Any]):
+        started = time.perf_counter()
+        indexes = [idx for idx, _ in claim["items"]]
+        tickets = [ticket for _, ticket in claim["items"]]
+        for result in self.classify_fn(tickets):
+            self.store.record(self.owner, claim["job_id"], indexes[result["index"]], result)
+        with self._lock:
+            self._counts["chunks"] += 1
+            self._counts["tickets"] += len(tickets)
+            self._counts["busy_seconds"] += time.perf_counter() - started
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            "runners": self.runners,
+            "running": any(t.is_alive() for t in self._threads),
+            "jobs": self.store.counts(),
+            **counts,
+            "tickets_per_busy_second": counts["tickets"] / counts["busy_seconds"] if counts["busy_seconds"] else 0.0,
+        }
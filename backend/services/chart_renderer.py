@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import queue
+import select
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Dict, Optional
+
+CHART_FORMATS = ("png", "svg", "data", "none")
+# Bump when the chart drawing code changes so cached images are not reused
+CHART_STYLE_VERSION = "1"
+
+CHART_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chart_worker.py")
+
+def chart_series(analytics: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    """The numbers behind each report chart; also what the "data" format returns"""
+    series = {}
+    if analytics.get("topic_distribution"):
+        series["topic_distribution"] = dict(analytics["topic_distribution"])
+    if analytics.get("priority_distribution"):
+        series["priority_distribution"] = dict(analytics["priority_distribution"])
+    if analytics.get("sentiment_distribution"):
+        series["sentiment_analysis"] = dict(analytics["sentiment_distribution"])
+    if analytics.get("high_priority_tickets"):
+        priority_sentiment = defaultdict(int)
+        for ticket in analytics["high_priority_tickets"]:
+            priority_sentiment[f"{ticket['priority']} - {ticket['sentiment']}"] += 1
+        series["high_priority_overview"] = dict(priority_sentiment)
+    return series
+
+class ChartRenderError(RuntimeError):
+    """The worker could not draw the charts; the worker itself is still usable"""
+
+class ChartWorkerTimeout(RuntimeError):
+    """The worker did not reply in time; it is killed and replaced"""
+
+class _ChartWorker:
+    """One `chart_worker.py` process, used by a single thread at a time"""
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, CHART_WORKER_SCRIPT], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+        self._buffer = bytearray()
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _read_line(self, timeout: float) -> bytes:
+        """One reply line, read straight from the pipe so select() sees every unread byte"""
+        deadline = time.monotonic() + timeout
+        fd = self.process.stdout.fileno()
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ChartWorkerTimeout(f"chart worker did not reply within {timeout:g}s")
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if ready:
+                chunk = os.read(fd, 1 << 16)
+                if not chunk:
+                    raise RuntimeError("chart worker exited")
+                self._buffer += chunk
+        end = self._buffer.index(b"\n")
+        line = bytes(self._buffer[:end])
+        del self._buffer[:end + 1]
+        return line
+
+    def render(self, series: Dict[str, Any], fmt: str, timeout: float) -> Dict[str, str]:
+        self.process.stdin.write((json.dumps({"series": series, "format": fmt}) + "\n").encode("utf-8"))
+        self.process.stdin.flush()
+        reply = json.loads(self._read_line(timeout))
+        if "error" in reply:
+            raise ChartRenderError(reply["error"])
+        return reply["charts"]
+
+    def close(self):
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+
+class ChartRenderer:
+    """
+    Renders report charts in up to `workers` chart_worker.py processes and
+    caches the result by a hash of the chart series and format, in memory and
+    optionally on disk. Workers are plain scripts fed over pipes, so they load
+    matplotlib and nothing of the API process.
+    Concurrent requests for the same charts share one render. A request waits
+    at most `timeout` seconds; a slower render keeps going into the cache and
+    the caller gets {"pending": True} for now. A worker that has not replied
+    after `worker_timeout` seconds is killed, the render fails with
+    ChartWorkerTimeout and the next render starts a fresh process.
+    """
+
+    def __init__(self, workers: int = 1, max_entries: int = 64, cache_dir: Optional[str] = None,
+                 timeout: float = 10.0, worker_timeout: float = 60.0):
+        self.workers = max(1, workers)
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.worker_timeout = worker_timeout
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._idle: "queue.Queue[_ChartWorker]" = queue.Queue()
+        self._memory: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._counts = {"hits": 0, "renders": 0, "pending": 0, "errors": 0, "worker_timeouts": 0}
+
+    @staticmethod
+    def cache_key(series: Dict[str, Any], fmt: str) -> str:
+        payload = json.dumps([CHART_STYLE_VERSION, fmt, series], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        # One thread per worker process; the threads only wait on pipes
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="chart-render")
+        return self._pool
+
+    def _render(self, series: Dict[str, Any], fmt: str) -> Dict[str, str]:
+        try:
+            worker = self._idle.get_nowait()
+        except queue.Empty:
+            worker = None
+        if worker is None or not worker.alive():
+            worker = _ChartWorker()
+        try:
+            return worker.render(series, fmt, self.worker_timeout)
+        except ChartRenderError:
+            raise
+        except ChartWorkerTimeout:
+            # Hung on a render: kill it and start a replacement for the next one
+            with self._lock:
+                self._counts["worker_timeouts"] += 1
+            worker.close()
+            worker = _ChartWorker()
+            raise
+        except Exception:
+            # A broken pipe or dead worker: replace it on the next render
+            worker.close()
+            worker = None
+            raise
+        finally:
+            if worker is not None:
+                self._idle.put(worker)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def _cached(self, key: str) -> Optional[Dict[str, str]]:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                    charts = json.load(f)
+            except (OSError, ValueError):
+                return None
+            self._remember(key, charts)
+            return charts
+        return None
+
+    def _remember(self, key: str, charts: Dict[str, str]):
+        self._memory[key] = charts
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _store(self, key: str, future: Future):
+        with self._lock:
+            self._inflight.pop(key, None)
+            if future.exception() is not None:
+                self._counts["errors"] += 1
+                return
+            charts = future.result()
+            self._remember(key, charts)
+        if self.cache_dir:
+            tmp_path = self._disk_path(key) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(charts, f)
+            os.replace(tmp_path, self._disk_path(key))
+
+    def charts(self, analytics: Dict[str, Any], fmt: str = "png") -> Dict[str, Any]:
+        if fmt not in CHART_FORMATS:
+            raise ValueError(f"chart format must be one of {CHART_FORMATS}, got {fmt!r}")
+        if fmt == "none":
+            return {}
+        series = chart_series(analytics)
+        if fmt == "data":
+            return series
+
+        key = self.cache_key(series, fmt)
+        with self._lock:
+            cached = self._cached(key)
+            if cached is not None:
+                self._counts["hits"] += 1
+                return cached
+            future = self._inflight.get(key)
+            submitted = future is None
+            if submitted:
+                self._counts["renders"] += 1
+                future = self._get_pool().submit(self._render, series, fmt)
+                self._inflight[key] = future
+        if submitted:
+            # Outside the lock: the callback runs inline if the render already finished
+            future.add_done_callback(lambda f: self._store(key, f))
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self._counts["pending"] += 1
+            return {"pending": True}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._counts, "entries": len(self._memory), "in_flight": len(self._inflight)}
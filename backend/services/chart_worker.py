@@ -0,0 +1,97 @@
+# Chart worker process: `python chart_worker.py` reads one JSON request per
+# line on stdin ({"series": ..., "format": "png" | "svg"}) and writes one JSON
+# reply per line on stdout ({"charts": ...} or {"error": ...}).
+#
+# Run as a standalone script by services/chart_renderer.py, so a worker loads
+# only the standard library and matplotlib: never the API app, graph.py or
+# their clients and stores. Keep it free of repo imports.
+import base64
+import io
+import json
+import sys
+from typing import Dict
+
+PRIORITY_COLORS = {'P0': 'red', 'P1': 'orange', 'P2': 'green', 'P3': 'blue'}
+SENTIMENT_COLORS = {'Angry': 'red', 'Frustrated': 'orange', 'Neutral': 'gray', 'Curious': 'blue', 'Happy': 'green'}
+
+def _bar_chart(ax, values: Dict[str, int], colors, title: str, xlabel: str):
+    bars = ax.bar(list(values.keys()), list(values.values()), color=colors)
+    ax.set_title(title, fontsize=16, fontweight='bold')
+    ax.set_ylabel('Number of Tickets')
+    ax.set_xlabel(xlabel)
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width() / 2., height, f'{int(height)}', ha='center', va='bottom')
+
+def _encode(fig, fmt: str) -> str:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    FigureCanvasAgg(fig)
+    buffer = io.BytesIO()
+    if fmt == "svg":
+        fig.savefig(buffer, format='svg', bbox_inches='tight')
+        mime = "image/svg+xml"
+    else:
+        fig.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
+        mime = "image/png"
+    return f"data:{mime};base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+def render_charts(series: Dict[str, Dict[str, int]], fmt: str = "png") -> Dict[str, str]:
+    """
+    Draw every chart in `series` as a data URI. Figures are built with the
+    object API, never through pyplot's global figure manager.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.style
+    from matplotlib.figure import Figure
+
+    matplotlib.style.use('seaborn-v0_8')
+    # Keep SVG text as <text> instead of outlined glyph paths: far smaller files
+    matplotlib.rcParams['svg.fonttype'] = 'none'
+    charts = {}
+
+    if "topic_distribution" in series:
+        fig = Figure(figsize=(10, 8))
+        ax = fig.add_subplot()
+        topics = series["topic_distribution"]
+        ax.pie(list(topics.values()), labels=list(topics.keys()), autopct='%1.1f%%', startangle=90)
+        ax.set_title('Ticket Topics Distribution', fontsize=16, fontweight='bold')
+        charts["topic_distribution"] = _encode(fig, fmt)
+
+    if "priority_distribution" in series:
+        fig = Figure(figsize=(10, 6))
+        priorities = series["priority_distribution"]
+        _bar_chart(fig.add_subplot(), priorities, [PRIORITY_COLORS.get(p, 'gray') for p in priorities],
+                   'Priority Distribution', 'Priority Level')
+        charts["priority_distribution"] = _encode(fig, fmt)
+
+    if "sentiment_analysis" in series:
+        fig = Figure(figsize=(10, 6))
+        sentiments = series["sentiment_analysis"]
+        _bar_chart(fig.add_subplot(), sentiments, [SENTIMENT_COLORS.get(s, 'gray') for s in sentiments],
+                   'Sentiment Analysis', 'Sentiment')
+        charts["sentiment_analysis"] = _encode(fig, fmt)
+
+    if "high_priority_overview" in series:
+        fig = Figure(figsize=(12, 8))
+        ax = fig.add_subplot()
+        overview = series["high_priority_overview"]
+        _bar_chart(ax, overview, ['red', 'orange', 'yellow', 'green'][:len(overview)],
+                   'High Priority Tickets by Sentiment', 'Priority - Sentiment')
+        ax.tick_params(axis='x', labelrotation=45)
+        charts["high_priority_overview"] = _encode(fig, fmt)
+
+    return charts
+
+def main():
+    for line in sys.stdin:
+        try:
+            request = json.loads(line)
+            reply = {"charts": render_charts(request["series"], request.get("format", "png"))}
+        except Exception as e:
+            reply = {"error": f"{type(e).__name__}: {e}"}
+        sys.stdout.write(json.dumps(reply) + "\n")
+        sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def normalize_text(text: str) -> str:
+    """Normalize ticket text so trivially different copies share a cache key"""
+    text = unicodedata.normalize("NFC", text or "")
+    return " ".join(text.split())
+
+
+def schema_version(model_cls) -> str:
+    """Short, stable fingerprint of a pydantic model's JSON schema"""
+    schema = json.dumps(model_cls.model_json_schema(), sort_keys=True)
+    return hashlib.sha256(schema.encode("utf-8")).hexdigest()[:16]
+
+
+class ClassificationCache:
+    """
+    Content-addressed cache for ticket classifications.
+
+    Two tiers: a bounded in-process LRU and a SQLite table that survives
+    restarts. Keys hash the normalized ticket text together with a namespace
+    built from the model name, prompt template and output schema version, so
+    changing any of those invalidates every existing entry automatically.
+    """
+
+    def __init__(self, model: str, prompt_template: str, schema: str,
+                 max_entries: int = 1024, db_path: Optional[str] = None):
+        self.namespace = hashlib.sha256(
+            json.dumps([model, prompt_template, schema]).encode("utf-8")
+        ).hexdigest()
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "writes": 0,
+        }
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path: str):
+        try:
+            directory = os.path.dirname(os.path.abspath(db_path))
+            os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS classifications (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    classification TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            # Entries written under an older model/prompt/schema can never hit again
+            self._conn.execute(
+                "DELETE FROM classifications WHERE namespace != ?", (self.namespace,)
+            )
+            self._conn.commit()
+        except Exception as e:
+            print(f"Classification cache disk tier disabled ({db_path}): {str(e)}")
+            self._conn = None
+
+    def key_for(self, text: str) -> str:
+        payload = f"{self.namespace}\n{normalize_text(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def peek(self, text: str) -> Optional[Dict[str, Any]]:
+        """Memory tier only: never touches SQLite, so it is safe on an event loop. Misses are not counted."""
+        key = self.key_for(text)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return copy.deepcopy(self._memory[key])
+        return None
+
+    def get(self, text: str) -> Optional[Dict[str, Any]]:
+        key = self.key_for(text)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return copy.deepcopy(self._memory[key])
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT classification FROM classifications WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    classification = json.loads(row[0])
+                    self._remember(key, classification)
+                    self._counters["disk_hits"] += 1
+                    return copy.deepcopy(classification)
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, text: str, classification: Dict[str, Any]):
+        key = self.key_for(text)
+        classification = copy.deepcopy(classification)
+        with self._lock:
+            self._remember(key, classification)
+            self._counters["writes"] += 1
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO classifications VALUES (?, ?, ?, ?)",
+                        (key, self.namespace, json.dumps(classification), time.time()),
+                    )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"Failed to persist classification cache entry: {str(e)}")
+
+    def _remember(self, key: str, classification: Dict[str, Any]):
+        self._memory[key] = classification
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM classifications")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            memory_entries = len(self._memory)
+            disk_entries = None
+            if self._conn is not None:
+                disk_entries = self._conn.execute(
+                    "SELECT COUNT(*) FROM classifications"
+                ).fetchone()[0]
+
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        return {
+            **counters,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": memory_entries,
+            "max_memory_entries": self.max_entries,
+            "disk_entries": disk_entries,
+            "namespace": self.namespace[:16],
+        }
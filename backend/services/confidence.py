@@ -0,0 +1,136 @@
+import random
+import re
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+try:
+    from services.bm25_index import tokenize
+except ImportError:
+    from backend.services.bm25_index import tokenize
+
+# resolve_and_format: >= HIGH answers directly, >= LOW answers and queues review, below escalates
+CONFIDENCE_LOW = 0.4
+CONFIDENCE_HIGH = 0.75
+CONFIDENCE_SCORERS = ("judge", "lexical", "tiered")
+
+_NON_ANSWER_RE = re.compile(
+    r"\b(i (do not|don't) know|not (mentioned|covered|provided|specified) in the (context|documentation)|"
+    r"(context|documentation) does not|unable to (find|determine)|no information)\b",
+    re.IGNORECASE,
+)
+
+def decision_band(confidence: float, low: float = CONFIDENCE_LOW, high: float = CONFIDENCE_HIGH) -> str:
+    if confidence >= high:
+        return "answer"
+    if confidence >= low:
+        return "review"
+    return "escalate"
+
+def _bigrams(tokens: List[str]) -> Set[tuple]:
+    return set(zip(tokens, tokens[1:]))
+
+class LexicalGroundingScorer:
+    """
+    Fast local confidence: how much of the answer's wording (terms and term
+    pairs) appears in the retrieved context, linearly mapped from
+    [floor, ceiling] to [0, 1]. Answers that say the context lacks the
+    information score 0.
+    """
+
+    name = "lexical"
+
+    def __init__(self, floor: float = 0.3, ceiling: float = 0.9):
+        self.floor = floor
+        self.ceiling = ceiling
+
+    def score(self, question: str, context: str, answer: str) -> float:
+        answer_tokens = tokenize(answer)
+        if not answer_tokens or _NON_ANSWER_RE.search(answer):
+            return 0.0
+        context_tokens = tokenize(context)
+        context_terms = set(context_tokens)
+        term_coverage = sum(t in context_terms for t in answer_tokens) / len(answer_tokens)
+        answer_pairs = _bigrams(answer_tokens)
+        pair_coverage = len(answer_pairs & _bigrams(context_tokens)) / len(answer_pairs) if answer_pairs else term_coverage
+        grounding = 0.5 * term_coverage + 0.5 * pair_coverage
+        return min(1.0, max(0.0, (grounding - self.floor) / (self.ceiling - self.floor)))
+
+class TieredConfidenceScorer:
+    """
+    Score with the fast tier and call the LLM judge only when that score is
+    within `band` of a decision threshold, where a small error would change
+    how the ticket is handled. `audit_rate` of the clear-cut cases are judged
+    anyway so agreement between the tiers is measured outside the band too.
+
+    mode "judge" always calls the judge (the previous behaviour), "lexical"
+    never does.
+    """
+
+    def __init__(self, fast: LexicalGroundingScorer, mode: str = "tiered", band: float = 0.1,
+                 audit_rate: float = 0.02, low: float = CONFIDENCE_LOW, high: float = CONFIDENCE_HIGH):
+        if mode not in CONFIDENCE_SCORERS:
+            raise ValueError(f"CONFIDENCE_SCORER must be one of {CONFIDENCE_SCORERS}, got {mode!r}")
+        self.fast = fast
+        self.mode = mode
+        self.band = band
+        self.audit_rate = audit_rate
+        self.low = low
+        self.high = high
+        self._lock = threading.Lock()
+        self._counts = {"scored": 0, "judge_calls": 0, "audits": 0, "agreements": 0, "abs_error": 0.0}
+
+    def _needs_judge(self, fast_score: float) -> str:
+        """Reason to call the judge: empty string to skip, "band" or "audit"."""
+        if self.mode == "judge":
+            return "band"
+        if self.mode == "lexical":
+            return ""
+        if abs(fast_score - self.low) < self.band or abs(fast_score - self.high) < self.band:
+            return "band"
+        return "audit" if random.random() < self.audit_rate else ""
+
+    def _record(self, fast_score: float, judge_score, reason: str):
+        with self._lock:
+            self._counts["scored"] += 1
+            if judge_score is None:
+                return
+            self._counts["judge_calls"] += 1
+            if reason == "audit":
+                self._counts["audits"] += 1
+            if decision_band(fast_score, self.low, self.high) == decision_band(judge_score, self.low, self.high):
+                self._counts["agreements"] += 1
+            self._counts["abs_error"] += abs(fast_score - judge_score)
+
+    def score(self, question: str, context: str, answer: str,
+              judge: Callable[[str, str, str], float]) -> float:
+        fast_score = self.fast.score(question, context, answer)
+        reason = self._needs_judge(fast_score)
+        judge_score = judge(question, context, answer) if reason else None
+        self._record(fast_score, judge_score, reason)
+        return fast_score if judge_score is None else judge_score
+
+    async def ascore(self, question: str, context: str, answer: str,
+                     judge: Callable[[str, str, str], Awaitable[float]]) -> float:
+        fast_score = self.fast.score(question, context, answer)
+        reason = self._needs_judge(fast_score)
+        judge_score = await judge(question, context, answer) if reason else None
+        self._record(fast_score, judge_score, reason)
+        return fast_score if judge_score is None else judge_score
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        scored, judged = counts["scored"], counts["judge_calls"]
+        return {
+            "mode": self.mode,
+            "fast_tier": self.fast.name,
+            "band": self.band,
+            "scored": scored,
+            "judge_calls": judged,
+            "judge_skipped": scored - judged,
+            "skip_rate": (scored - judged) / scored if scored else 0.0,
+            "audits": counts["audits"],
+            # Over every judged answer: same answer/review/escalate decision, and mean score gap
+            "decision_agreement": counts["agreements"] / judged if judged else None,
+            "mean_abs_error": counts["abs_error"] / judged if judged else None,
+        }
@@ -0,0 +1,180 @@
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from langchain_core.documents import Document
+
+try:
+    from services.bm25_index import tokenize
+except ImportError:
+    from backend.services.bm25_index import tokenize
+
+# Lines shorter than this (headings, "Next", breadcrumbs) are never treated as duplicate spans
+MIN_DEDUP_LINE_CHARS = 40
+_WS_RE = re.compile(r"\s+")
+
+def make_token_counter(model: str = "gpt-4o-mini") -> Callable[[str], int]:
+    """tiktoken count for `model` (installed with langchain-openai), else ~4 characters per token"""
+    try:
+        import tiktoken
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception:
+        return lambda text: (len(text) + 3) // 4
+
+def merge_overlapping(first: str, second: str, min_overlap: int = 20) -> Optional[str]:
+    """
+    Join two chunks of one page if the end of `first` repeats at the start of
+    `second` (the splitter's chunk_overlap) or one contains the other.
+    Returns None when they do not overlap.
+    """
+    if second in first:
+        return first
+    if first in second:
+        return second
+    longest = min(len(first), len(second))
+    for size in range(longest, min_overlap - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return None
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+class ContextBuilder:
+    """
+    Turn retrieved chunks into the context block sent to generate and
+    evaluate_confidence:
+
+    1. adaptive k: drop chunks scoring below `min_relative_score` of the best
+       (scores come from `metadata["score"]`; rank order when absent)
+    2. MMR: prefer relevant chunks that add new terms over near-repeats
+    3. merge chunks of the same page whose text overlaps, drop lines already
+       included from another chunk
+    4. stop adding chunks once the budget would be exceeded: `budget_tokens`,
+       capped at what joining the top `baseline_k` chunks costs, so the
+       context is never larger than the plain top-k join it replaces
+    """
+
+    def __init__(self, budget_tokens: int = 1500, max_chunks: int = 4, min_relative_score: float = 0.85,
+                 mmr_lambda: float = 0.7, baseline_k: int = 4, token_counter: Optional[Callable[[str], int]] = None):
+        self.budget_tokens = budget_tokens
+        self.max_chunks = max_chunks
+        self.min_relative_score = min_relative_score
+        self.mmr_lambda = mmr_lambda
+        self.baseline_k = baseline_k
+        self.count_tokens = token_counter or make_token_counter()
+        self._lock = threading.Lock()
+        self._totals = {"requests": 0, "chunks_in": 0, "chunks_used": 0, "naive_tokens": 0, "context_tokens": 0}
+
+    def _select_order(self, docs: List[Document]) -> List[int]:
+        """Candidate indexes in MMR order, after the adaptive-k cutoff"""
+        scores = [(d.metadata or {}).get("score") for d in docs]
+        if all(isinstance(s, (int, float)) for s in scores):
+            relevance = [float(s) for s in scores]
+            best = max(relevance)
+            candidates = [i for i, r in enumerate(relevance) if r >= best * self.min_relative_score] or [0]
+        else:
+            # Fused or lexical results carry no comparable score: rank order, no cutoff
+            relevance = [1.0 - i / len(docs) for i in range(len(docs))]
+            candidates = list(range(len(docs)))
+        terms = {i: set(tokenize(docs[i].page_content)) for i in candidates}
+
+        order: List[int] = []
+        while candidates:
+            def mmr(i):
+                redundancy = max((_jaccard(terms[i], terms[j]) for j in order), default=0.0)
+                return self.mmr_lambda * relevance[i] - (1 - self.mmr_lambda) * redundancy
+            pick = max(candidates, key=mmr)
+            order.append(pick)
+            candidates.remove(pick)
+        return order
+
+    @staticmethod
+    def _render(groups: Dict[str, List[str]]) -> str:
+        """One block per page; lines already emitted by an earlier block are dropped"""
+        seen: Set[str] = set()
+        blocks = []
+        for texts in groups.values():
+            lines = []
+            for line in "\n".join(texts).splitlines():
+                key = _WS_RE.sub(" ", line).strip().lower()
+                if len(key) >= MIN_DEDUP_LINE_CHARS:
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                lines.append(line)
+            if any(l.strip() for l in lines):
+                blocks.append("\n".join(lines))
+        return "\n\n".join(blocks)
+
+    @staticmethod
+    def _add_to_group(texts: List[str], text: str) -> List[str]:
+        merged = list(texts)
+        for i, existing in enumerate(merged):
+            joined = merge_overlapping(existing, text) or merge_overlapping(text, existing)
+            if joined is not None:
+                merged[i] = joined
+                return merged
+        merged.append(text)
+        return merged
+
+    def build(self, docs: List[Document]) -> Dict[str, Any]:
+        """
+        Returns {"text", "docs", "tokens", "naive_tokens", "tokens_saved"}.
+        `naive_tokens` is what joining the top `baseline_k` chunks, as retrieve
+        used to, would have cost; `tokens_saved` is the signed difference.
+        """
+        naive_tokens = self.count_tokens("\n\n".join(d.page_content for d in docs[:self.baseline_k]))
+        if not docs:
+            return {"text": "", "docs": [], "tokens": 0, "naive_tokens": 0, "tokens_saved": 0}
+
+        budget = min(self.budget_tokens, naive_tokens)
+        groups: Dict[str, List[str]] = {}
+        used: List[Document] = []
+        text, tokens = "", 0
+
+        for i in self._select_order(docs):
+            if len(used) >= self.max_chunks:
+                break
+            doc = docs[i]
+            source = (doc.metadata or {}).get("source") or f"_doc{i}"
+            trial = dict(groups)
+            trial[source] = self._add_to_group(groups.get(source, []), doc.page_content)
+            trial_text = self._render(trial)
+            trial_tokens = self.count_tokens(trial_text)
+            # The first chunk always goes in so generation never runs on empty context
+            if used and trial_tokens > budget:
+                continue
+            groups, text, tokens = trial, trial_text, trial_tokens
+            used.append(doc)
+
+        with self._lock:
+            self._totals["requests"] += 1
+            self._totals["chunks_in"] += len(docs)
+            self._totals["chunks_used"] += len(used)
+            self._totals["naive_tokens"] += naive_tokens
+            self._totals["context_tokens"] += tokens
+        return {
+            "text": text,
+            "docs": used,
+            "tokens": tokens,
+            "naive_tokens": naive_tokens,
+            "tokens_saved": naive_tokens - tokens,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = dict(self._totals)
+        requests = totals["requests"]
+        saved = totals["naive_tokens"] - totals["context_tokens"]
+        return {
+            **totals,
+            "budget_tokens": self.budget_tokens,
+            "avg_context_tokens": totals["context_tokens"] / requests if requests else 0.0,
+            # The context goes out twice per request: generate and evaluate_confidence
+            "avg_prompt_tokens_saved": 2 * saved / requests if requests else 0.0,
+        }
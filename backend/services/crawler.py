@@ -0,0 +1,235 @@
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from langchain_core.documents import Document
+
+# Pages whose static HTML yields less text than this are assumed to be rendered client-side
+MIN_STATIC_TEXT_CHARS = 200
+JS_ROOT_IDS = ("root", "__next", "app", "__nuxt")
+
+class HttpCache:
+    """
+    On-disk cache of fetched pages with their ETag / Last-Modified validators.
+    Client-rendered pages are cached with `needs_js` and get their text once
+    the browser has rendered them.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, entry: Dict[str, Any]):
+        path = self._path(url)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def put_rendered(self, url: str, title: str, text: str):
+        """Attach browser-rendered text to a `needs_js` entry so a 304 can serve it"""
+        entry = self.get(url)
+        if entry is not None and entry.get("needs_js"):
+            self.put(url, {**entry, "title": title, "text": text})
+
+class HostLimiter:
+    """Per-host politeness: at most `concurrency` requests in flight and `delay` seconds between starts"""
+
+    def __init__(self, concurrency: int = 4, delay: float = 0.1):
+        self.concurrency = max(1, concurrency)
+        self.delay = max(0.0, delay)
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    def acquire(self, host: str):
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.concurrency))
+        semaphore.acquire()
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start_at + self.delay
+        if start_at > now:
+            time.sleep(start_at - now)
+
+    def release(self, host: str):
+        self._semaphores[host].release()
+
+def extract_page(html: str) -> Tuple[str, str, bool]:
+    """Return (title, text, needs_js) for an HTML page"""
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    js_root = any(soup.find(id=root_id) is not None for root_id in JS_ROOT_IDS)
+    for tag in soup(["script", "style", "noscript", "nav", "header", "footer", "svg"]):
+        tag.decompose()
+    main = soup.find("main") or soup.find("article") or soup.body or soup
+    text = "\n".join(line.strip() for line in main.get_text("\n").splitlines() if line.strip())
+    needs_js = len(text) < MIN_STATIC_TEXT_CHARS and (js_root or not text)
+    return title, text, needs_js
+
+def fetch_page(session: requests.Session, url: str, cache: Optional[HttpCache], timeout: float = 20.0) -> Dict[str, Any]:
+    """
+    Conditional GET for one page. Returns a dict with `status` one of
+    "fetched", "not_modified", "needs_js" or "error", plus title/text when known.
+    """
+    cached = cache.get(url) if cache else None
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    try:
+        response = session.get(url, headers=headers, timeout=timeout)
+    except requests.RequestException as e:
+        return {"url": url, "status": "error", "error": str(e)}
+
+    if response.status_code == 304 and cached:
+        if "text" not in cached:
+            # Client-rendered page whose last render failed: render it again
+            return {"url": url, "status": "needs_js"}
+        return {"url": url, "status": "not_modified", "title": cached.get("title", ""), "text": cached["text"]}
+    if response.status_code != 200:
+        return {"url": url, "status": "error", "error": f"HTTP {response.status_code}"}
+
+    title, text, needs_js = extract_page(response.text)
+    if cache:
+        entry = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        }
+        # A needs_js entry keeps only the validators until put_rendered adds the browser's text
+        cache.put(url, {**entry, "needs_js": True} if needs_js else {**entry, "title": title, "text": text})
+    if needs_js:
+        return {"url": url, "status": "needs_js"}
+    return {"url": url, "status": "fetched", "title": title, "text": text}
+
+def load_with_selenium(urls: List[str]) -> List[Document]:
+    from langchain_community.document_loaders import SeleniumURLLoader
+    return SeleniumURLLoader(urls=urls).load()
+
+def iter_crawl(urls: List[str], stats: Optional[Dict[str, Any]] = None, max_workers: Optional[int] = None,
+               per_host: Optional[int] = None, delay: Optional[float] = None, cache_dir: Optional[str] = None,
+               session_factory: Callable[[], requests.Session] = requests.Session,
+               js_loader: Callable[[List[str]], List[Document]] = load_with_selenium,
+               js_batch_size: int = 20) -> Iterator[Document]:
+    """
+    Fetch `urls` concurrently over plain HTTP and yield Documents as pages complete,
+    falling back to a headless browser only for pages whose static HTML has no
+    usable text. Pages answered with 304 Not Modified are served from the on-disk
+    cache, browser-rendered ones included. At most 2 * max_workers pages are fetched ahead of the consumer, so a
+    slow downstream stage holds back the crawl instead of buffering the site.
+    Counters and timings are accumulated into `stats`.
+    """
+    stats = stats if stats is not None else {}
+    for key in ("fetched", "not_modified", "needs_js", "error", "pages"):
+        stats.setdefault(key, 0)
+    stats.setdefault("seconds", 0.0)
+
+    max_workers = max_workers or int(os.getenv("CRAWL_MAX_WORKERS", "16"))
+    limiter = HostLimiter(
+        concurrency=per_host or int(os.getenv("CRAWL_PER_HOST", "4")),
+        delay=delay if delay is not None else float(os.getenv("CRAWL_DELAY_SECONDS", "0.1")),
+    )
+    cache_dir = cache_dir or os.getenv("CRAWL_CACHE_DIR")
+    cache = HttpCache(cache_dir) if cache_dir else None
+    local = threading.local()
+
+    def fetch(url: str) -> Dict[str, Any]:
+        if not hasattr(local, "session"):
+            local.session = session_factory()
+        host = urlparse(url).netloc
+        limiter.acquire(host)
+        try:
+            return fetch_page(local.session, url, cache)
+        finally:
+            limiter.release(host)
+
+    def render(js_urls: List[str]) -> List[Document]:
+        print(f"Rendering {len(js_urls)} JavaScript pages with Selenium")
+        try:
+            docs = js_loader(js_urls)
+        except Exception as e:
+            print(f"Selenium fallback failed: {e}")
+            stats["error"] += len(js_urls)
+            return []
+        if cache:
+            for doc in docs:
+                cache.put_rendered(doc.metadata.get("source", ""), doc.metadata.get("title", ""), doc.page_content)
+        return docs
+
+    js_urls: List[str] = []
+    queued = iter(urls)
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crawler") as executor:
+        pending = {executor.submit(fetch, url) for url in itertools.islice(queued, 2 * max_workers)}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                ready: List[Document] = []
+                for future in done:
+                    page = future.result()
+                    stats[page["status"]] += 1
+                    if page["status"] == "needs_js":
+                        js_urls.append(page["url"])
+                    elif page["status"] in ("fetched", "not_modified"):
+                        ready.append(Document(
+                            page_content=page["text"],
+                            metadata={"source": page["url"], "title": page["title"]},
+                        ))
+                    else:
+                        print(f"Failed to fetch {page['url']}: {page['error']}")
+                    next_url = next(queued, None)
+                    if next_url is not None:
+                        pending.add(executor.submit(fetch, next_url))
+                if len(js_urls) >= js_batch_size:
+                    ready.extend(render(js_urls))
+                    js_urls = []
+
+                stats["seconds"] += time.perf_counter() - started
+                for doc in ready:
+                    stats["pages"] += 1
+                    yield doc
+                started = time.perf_counter()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    if js_urls:
+        rendered = render(js_urls)
+        stats["seconds"] += time.perf_counter() - started
+        for doc in rendered:
+            stats["pages"] += 1
+            yield doc
+    else:
+        stats["seconds"] += time.perf_counter() - started
+
+def crawl(urls: List[str], **kwargs) -> Tuple[List[Document], Dict[str, Any]]:
+    """Eager form of iter_crawl: every page, plus counters and pages per second"""
+    stats: Dict[str, Any] = {}
+    docs = list(iter_crawl(urls, stats=stats, **kwargs))
+    stats["pages_per_second"] = stats["pages"] / stats["seconds"] if stats["seconds"] else 0.0
+    return docs, stats
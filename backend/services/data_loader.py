@@ -1,28 +1,289 @@
 import json
 import os
-from typing import List, Dict, Any
+import tempfile
+import threading
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
 
-def load_sample_tickets() -> List[Dict[str, Any]]:
+def sample_ticket_paths() -> List[str]:
+    """SAMPLE_TICKETS_PATH if set, then sample_tickets.json at the repo root or in backend/"""
+    configured = os.getenv("SAMPLE_TICKETS_PATH")
     root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, "sample_tickets.json"))
     backend_path = os.path.join(os.path.dirname(__file__), "..", "sample_tickets.json")
-    
-    for sample_path in [root_path, backend_path]:
-        if os.path.exists(sample_path):
+    return ([configured] if configured else []) + [root_path, backend_path]
+
+def _is_jsonl(path: str) -> bool:
+    return path.endswith((".jsonl", ".ndjson"))
+
+def iter_jsonl(stream: IO[bytes], offset: int = 0, complete_lines: bool = True) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """
+    (ticket, end offset) per line of a binary JSONL stream, one line in memory
+    at a time. With `complete_lines` a trailing line without a newline is a
+    write still in progress and is left for the next read. Blank and
+    non-object lines are skipped.
+    """
+    position = offset
+    for line in stream:
+        if complete_lines and not line.endswith(b"\n"):
+            break
+        position += len(line)
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            ticket = json.loads(line)
+        except ValueError as e:
+            print(f"Skipping malformed ticket line ending at byte {position}: {str(e)}")
+            continue
+        if isinstance(ticket, dict):
+            yield ticket, position
+
+def ticket_key(ticket_id: Any) -> str:
+    """Ids are indexed as strings, so 42 and "42" find the same ticket"""
+    return str(ticket_id)
+
+class TicketRepository:
+    """
+    Tickets from the first sample file that holds any, parsed once and re-read
+    only when a candidate file's mtime or size changes. A missing, empty or
+    unreadable file falls through to the next path, so an empty
+    SAMPLE_TICKETS_PATH still serves sample_tickets.json. A JSONL file that
+    only grew (same inode) is read from where the last read stopped; a rewrite
+    is loaded again.
+
+    `by_id` maps each ticket id to its positions in file order, so id lookups
+    are hash lookups instead of list scans.
+    """
+
+    def __init__(self, paths: Optional[List[str]] = None):
+        self.paths = paths or sample_ticket_paths()
+        self._lock = threading.Lock()
+        self._tickets: List[Dict[str, Any]] = []
+        self._by_id: Dict[str, List[int]] = {}
+        self._path: Optional[str] = None
+        self._signatures: Optional[Tuple[Optional[Tuple[int, int, int]], ...]] = None
+        self._offset = 0
+        self._counts = {"loads": 0, "incremental_loads": 0, "ingested": 0}
+
+    def _path_signatures(self) -> Tuple[Optional[Tuple[int, int, int]], ...]:
+        signatures = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                signatures.append(None)
+                continue
+            signatures.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        return tuple(signatures)
+
+    def _index(self, tickets: Iterable[Dict[str, Any]]):
+        for ticket in tickets:
+            if "id" in ticket:
+                self._by_id.setdefault(ticket_key(ticket["id"]), []).append(len(self._tickets))
+            self._tickets.append(ticket)
+
+    def _reset(self):
+        self._tickets, self._by_id, self._offset = [], {}, 0
+
+    def _read_jsonl(self, path: str):
+        with open(path, "rb") as f:
+            f.seek(self._offset)
+            for ticket, end in iter_jsonl(f, self._offset):
+                self._index([ticket])
+                self._offset = end
+
+    def _read_json(self, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            self._index(t for t in data if isinstance(t, dict))
+
+    def _grew(self, signatures) -> bool:
+        """The loaded JSONL file only had lines appended, and no path before it changed"""
+        if self._path is None or self._signatures is None or not _is_jsonl(self._path):
+            return False
+        i = self.paths.index(self._path)
+        old, new = self._signatures[i], signatures[i]
+        return (signatures[:i] == self._signatures[:i] and new is not None
+                and new[0] == old[0] and new[2] >= self._offset)
+
+    def _refresh(self):
+        signatures = self._path_signatures()
+        if signatures == self._signatures:
+            return
+
+        if self._grew(signatures):
+            try:
+                self._read_jsonl(self._path)
+                self._counts["incremental_loads"] += 1
+                self._signatures = signatures
+                return
+            except Exception as e:
+                print(f"Failed loading {self._path}: {str(e)}")
+
+        self._path = None
+        for path, signature in zip(self.paths, signatures):
+            if signature is None:
+                continue
+            self._reset()
             try:
-                with open(sample_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    if isinstance(data, list) and data:
-                        return data
+                if _is_jsonl(path):
+                    self._read_jsonl(path)
+                else:
+                    self._read_json(path)
             except Exception as e:
-                print(f"Failed loading {sample_path}: {str(e)}")
-    
-    return []
+                print(f"Failed loading {path}: {str(e)}")
+                continue
+            if self._tickets:
+                self._path = path
+                break
+        if self._path is None:
+            self._reset()
+        self._counts["loads"] += 1
+        self._signatures = signatures
+
+    def all(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            return list(self._tickets)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._tickets)
+
+    def get(self, ticket_id: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            positions = self._by_id.get(ticket_key(ticket_id))
+            return self._tickets[positions[0]] if positions else None
+
+    def get_many(self, ticket_ids: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Every ticket whose id is in `ticket_ids`, in file order"""
+        with self._lock:
+            self._refresh()
+            positions = set()
+            for ticket_id in ticket_ids:
+                positions.update(self._by_id.get(ticket_key(ticket_id), ()))
+            return [self._tickets[i] for i in sorted(positions)]
+
+    def page(self, offset: int = 0, limit: int = 50, where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        One page of tickets. `where` maps a field to a value or a list of
+        accepted values; `total` counts every ticket that matches.
+        """
+        filters = {field: {ticket_key(v) for v in (value if isinstance(value, (list, tuple, set)) else [value])}
+                   for field, value in (where or {}).items()}
+        with self._lock:
+            self._refresh()
+            if "id" in filters and len(filters) == 1:
+                rows = sorted(i for key in filters["id"] for i in self._by_id.get(key, ()))
+                matches = [self._tickets[i] for i in rows]
+            elif filters:
+                matches = [t for t in self._tickets
+                           if all(field in t and ticket_key(t[field]) in accepted for field, accepted in filters.items())]
+            else:
+                matches = self._tickets
+            return {
+                "tickets": matches[offset:offset + limit],
+                "offset": offset,
+                "limit": limit,
+                "total": len(matches),
+            }
+
+    def ingest_jsonl(self, stream: IO[bytes], batch_size: int = 1000) -> int:
+        """
+        Append tickets from a binary JSONL stream to the repository's JSONL
+        file (the first path, normally SAMPLE_TICKETS_PATH), `batch_size` at a
+        time, without loading the whole dump. Returns the number appended.
+        """
+        path = self.paths[0]
+        if not _is_jsonl(path):
+            raise ValueError(f"JSONL ingest needs a .jsonl ticket file, got {path} (set SAMPLE_TICKETS_PATH)")
+
+        ingested, batch = 0, []
+        for ticket, _ in iter_jsonl(stream, complete_lines=False):
+            batch.append(ticket)
+            if len(batch) >= batch_size:
+                ingested += self._append(path, batch)
+                batch = []
+        if batch:
+            ingested += self._append(path, batch)
+        return ingested
+
+    def _append(self, path: str, tickets: List[Dict[str, Any]]) -> int:
+        if not save_tickets(tickets, path, append=True):
+            raise OSError(f"Failed appending tickets to {path}")
+        with self._lock:
+            # Picks up this batch (and any other writer's) from the stored offset
+            self._refresh()
+            self._counts["ingested"] += len(tickets)
+        return len(tickets)
 
-def save_tickets(tickets: List[Dict[str, Any]], filepath: str) -> bool:
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"path": self._path, "tickets": len(self._tickets), "ids": len(self._by_id), **self._counts}
+
+ticket_repository = TicketRepository()
+
+def load_sample_tickets() -> List[Dict[str, Any]]:
+    return ticket_repository.all()
+
+def save_tickets(tickets: List[Dict[str, Any]], filepath: str, append: bool = False) -> bool:
+    """
+    Write tickets atomically. A full save writes a temporary file in the same
+    directory and renames it over `filepath`, so readers see the old or the
+    new file, never a partial one. `append=True` adds JSONL lines with a
+    single O_APPEND write; readers ignore a trailing line until it is complete.
+    """
     try:
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(tickets, f, indent=2, ensure_ascii=False)
+        directory = os.path.dirname(os.path.abspath(filepath))
+        os.makedirs(directory, exist_ok=True)
+        if append:
+            if not _is_jsonl(filepath):
+                raise ValueError("append mode needs a .jsonl file")
+            data = "".join(json.dumps(t, ensure_ascii=False) + "\n" for t in tickets).encode("utf-8")
+            fd = os.open(filepath, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            return True
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tickets-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                if _is_jsonl(filepath):
+                    for ticket in tickets:
+                        f.write(json.dumps(ticket, ensure_ascii=False) + "\n")
+                else:
+                    json.dump(tickets, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
         return True
     except Exception as e:
         print(f"Failed to save tickets to {filepath}: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Append a JSONL ticket dump to SAMPLE_TICKETS_PATH")
+    parser.add_argument("dump", nargs="?", default="-", help="JSONL file to ingest, - for stdin")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.dump == "-":
+        count = ticket_repository.ingest_jsonl(sys.stdin.buffer, args.batch_size)
+    else:
+        with open(args.dump, "rb") as dump:
+            count = ticket_repository.ingest_jsonl(dump, args.batch_size)
+    print(f"Ingested {count} tickets into {ticket_repository.paths[0]}")
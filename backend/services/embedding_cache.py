@@ -0,0 +1,81 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    LRU cache of query embeddings keyed by (embedding model, text hash).
+
+    Vectors are kept as float32 NumPy arrays (half the size of the float64
+    lists the OpenAI client returns) and the cache is bounded by total vector
+    bytes rather than entry count, so the cap holds whatever the dimensions.
+    """
+
+    def __init__(self, model: str, max_bytes: int = 64 * 1024 * 1024):
+        self.model = model
+        self.max_bytes = max_bytes
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def key_for(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\n{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = self.key_for(text)
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is None:
+                self._counters["misses"] += 1
+                return None
+            self._vectors.move_to_end(key)
+            self._counters["hits"] += 1
+            return vector
+
+    def put(self, text: str, vector) -> np.ndarray:
+        key = self.key_for(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            previous = self._vectors.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._vectors[key] = vector
+            self._bytes += vector.nbytes
+            while self._bytes > self.max_bytes and len(self._vectors) > 1:
+                _, evicted = self._vectors.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self._counters["evictions"] += 1
+        return vector
+
+    def embed_query(self, text: str, embed_fn: Callable[[str], List[float]]) -> List[float]:
+        vector = self.get(text)
+        if vector is None:
+            vector = self.put(text, embed_fn(text))
+        return vector.tolist()
+
+    async def aembed_query(self, text: str, aembed_fn: Callable[[str], Awaitable[List[float]]]) -> List[float]:
+        vector = self.get(text)
+        if vector is None:
+            vector = self.put(text, await aembed_fn(text))
+        return vector.tolist()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            entries = len(self._vectors)
+            used = self._bytes
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": counters["hits"] / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": used,
+            "max_bytes": self.max_bytes,
+            "model": self.model,
+        }
@@ -0,0 +1,50 @@
+import os
+from typing import Optional
+
+QUANTIZATION_MODES = ("none", "float16", "int8")
+
+class EmbeddingProfile:
+    """
+    Which embedding vectors we produce and how we store them, from env config:
+
+      EMBEDDING_MODEL          OpenAI embedding model (text-embedding-3-large)
+      EMBEDDING_DIMENSIONS     reduced output size, e.g. 1024 or 256 (unset = native 3072)
+      EMBEDDING_QUANTIZATION   none | float16 | int8 storage for the search matrix
+      EMBEDDING_RESCORE_FACTOR candidates per result re-ranked at full precision
+
+    Shared by graph.py and build_index.py so queries and documents always agree.
+    """
+
+    def __init__(self, model: str = "text-embedding-3-large", dimensions: Optional[int] = None,
+                 quantization: str = "none", rescore_factor: int = 4):
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"EMBEDDING_QUANTIZATION must be one of {QUANTIZATION_MODES}, got {quantization!r}")
+        self.model = model
+        self.dimensions = dimensions
+        self.quantization = quantization
+        self.rescore_factor = max(1, rescore_factor)
+
+    @classmethod
+    def from_env(cls) -> "EmbeddingProfile":
+        dimensions = os.getenv("EMBEDDING_DIMENSIONS")
+        return cls(
+            model=os.getenv("EMBEDDING_MODEL", "text-embedding-3-large"),
+            dimensions=int(dimensions) if dimensions else None,
+            quantization=os.getenv("EMBEDDING_QUANTIZATION", "none").lower(),
+            rescore_factor=int(os.getenv("EMBEDDING_RESCORE_FACTOR", "4")),
+        )
+
+    @property
+    def name(self) -> str:
+        """Cache key component: vectors from different profiles are not comparable"""
+        return f"{self.model}@{self.dimensions}" if self.dimensions else self.model
+
+    def collection_name(self, base: str = "example_collection") -> str:
+        # Vectors of different sizes cannot share a Chroma collection
+        return f"{base}_{self.dimensions}d" if self.dimensions else base
+
+    def make_embeddings(self):
+        from langchain_openai import OpenAIEmbeddings
+        if self.dimensions:
+            return OpenAIEmbeddings(model=self.model, dimensions=self.dimensions)
+        return OpenAIEmbeddings(model=self.model)
@@ -5,8 +5,10 @@ import seaborn as sns
 from typing import List, Dict, Any
 try:
     from graph import run_rag_graph, run_classification_only
+    from services.ticket_analytics import TicketAnalytics
 except ImportError:
     from backend.graph import run_rag_graph, run_classification_only
+    from backend.services.ticket_analytics import TicketAnalytics
 import pandas as pd
 
 class EvaluationMetrics:
@@ -47,21 +49,7 @@ class EvaluationMetrics:
         success_rate = len(successful) / len(results) if results else 0
         avg_processing_time = sum(r["processing_time"] for r in successful) / len(successful) if successful else 0
         
-        topics = {}
-        for result in successful:
-            labels = result["classification"].get("label", [])
-            for label in labels:
-                topics[label] = topics.get(label, 0) + 1
-        
-        priorities = {}
-        for result in successful:
-            priority = result["classification"].get("priority", "P2")
-            priorities[priority] = priorities.get(priority, 0) + 1
-        
-        sentiments = {}
-        for result in successful:
-            sentiment = result["classification"].get("sentiment", "Neutral")
-            sentiments[sentiment] = sentiments.get(sentiment, 0) + 1
+        analytics = TicketAnalytics.from_classifications(successful)
         
         return {
             "total_tickets": len(results),
@@ -69,9 +57,10 @@ class EvaluationMetrics:
             "success_rate": success_rate,
             "total_processing_time": total_time,
             "avg_processing_time_per_ticket": avg_processing_time,
-            "topic_distribution": topics,
-            "priority_distribution": priorities,
-            "sentiment_distribution": sentiments,
+            "topic_distribution": dict(analytics.distribution("topic")),
+            "priority_distribution": dict(analytics.distribution("priority")),
+            "sentiment_distribution": dict(analytics.distribution("sentiment")),
+            "priority_by_sentiment": analytics.cross_tab("priority", "sentiment"),
             "results": results
         }
     
@@ -0,0 +1,77 @@
+import hashlib
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Set, Tuple
+
+MANIFEST_FILE = "index_manifest.sqlite3"
+
+def chunk_id(source: str, text: str) -> str:
+    """Content-addressed chunk id: identical text from the same page keeps its id across runs"""
+    return hashlib.sha256(f"{source}\n{text}".encode("utf-8")).hexdigest()
+
+class IndexManifest:
+    """
+    Per-chunk record of what is in the vector store: chunk id, source URL and
+    source site. Lets build_index diff a crawl against the index without
+    loading every metadata record out of Chroma.
+    """
+
+    def __init__(self, persist_directory: str, collection_name: str = "example_collection"):
+        os.makedirs(persist_directory, exist_ok=True)
+        # One manifest per collection: a collection with other embedding dimensions starts empty
+        filename = MANIFEST_FILE if collection_name == "example_collection" else f"index_manifest_{collection_name}.sqlite3"
+        self.path = os.path.join(persist_directory, filename)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                source_site TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_by_source ON chunks(source)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_by_site ON chunks(source_site)")
+        self._conn.commit()
+
+    def is_empty(self) -> bool:
+        return self._conn.execute("SELECT 1 FROM chunks LIMIT 1").fetchone() is None
+
+    def get_meta(self, key: str):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+        self._conn.commit()
+
+    def chunk_ids_for(self, source: str) -> Set[str]:
+        rows = self._conn.execute("SELECT chunk_id FROM chunks WHERE source = ?", (source,))
+        return {row[0] for row in rows}
+
+    def sources_for_site(self, source_site: str) -> Set[str]:
+        rows = self._conn.execute("SELECT DISTINCT source FROM chunks WHERE source_site = ?", (source_site,))
+        return {row[0] for row in rows}
+
+    def chunk_count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def add(self, entries: Iterable[Tuple[str, str, str]]):
+        """Record (chunk_id, source, source_site) rows once they are in the vector store"""
+        self._conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?)", list(entries))
+        self._conn.commit()
+
+    def remove(self, chunk_ids: Iterable[str]):
+        self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(c,) for c in chunk_ids])
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+def diff_source(manifest: IndexManifest, source: str, new_ids: List[str]) -> Dict[str, Set[str]]:
+    """Split a page's current chunk ids into ones to embed, to delete and to leave alone"""
+    old = manifest.chunk_ids_for(source)
+    new = set(new_ids)
+    return {"add": new - old, "delete": old - new, "keep": new & old, "existed": bool(old)}
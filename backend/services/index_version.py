@@ -0,0 +1,27 @@
+import os
+import uuid
+from datetime import datetime
+from typing import Optional
+
+INDEX_VERSION_FILE = "index_version"
+
+def index_version_path(persist_directory: str) -> str:
+    return os.path.join(persist_directory, INDEX_VERSION_FILE)
+
+def read_index_version(persist_directory: str) -> Optional[str]:
+    """Current index version, or None if the index was never stamped"""
+    try:
+        with open(index_version_path(persist_directory), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def write_index_version(persist_directory: str) -> str:
+    """Stamp the index as rebuilt so caches derived from it drop their entries"""
+    version = f"{datetime.utcnow().isoformat()}-{uuid.uuid4().hex[:8]}"
+    os.makedirs(persist_directory, exist_ok=True)
+    tmp_path = index_version_path(persist_directory) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, index_version_path(persist_directory))
+    return version
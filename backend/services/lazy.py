@@ -0,0 +1,33 @@
+import functools
+import threading
+import time
+from typing import Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+# Seconds spent building each lazily created component, in creation order
+component_timings: Dict[str, float] = {}
+
+def lazy_component(name: str) -> Callable[[Callable[[], T]], Callable[[], T]]:
+    """
+    Turn a zero-argument factory into a thread-safe getter that builds the
+    component on first use and records how long that took.
+    """
+    def decorator(factory: Callable[[], T]) -> Callable[[], T]:
+        lock = threading.Lock()
+        instance = []
+
+        @functools.wraps(factory)
+        def getter() -> T:
+            if not instance:
+                with lock:
+                    if not instance:
+                        start = time.perf_counter()
+                        instance.append(factory())
+                        component_timings[name] = time.perf_counter() - start
+            return instance[0]
+
+        getter.is_initialized = lambda: bool(instance)
+        return getter
+
+    return decorator
@@ -0,0 +1,215 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+
+class _Pending:
+    __slots__ = ("item", "future", "enqueued_at")
+
+    def __init__(self, item: Any):
+        self.item = item
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class _BatchStats:
+    """Batch-size histogram and queueing delay shared by both batchers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._batch_sizes: Counter = Counter()
+        self._items = 0
+        self._batches = 0
+        self._total_delay = 0.0
+        self._max_delay = 0.0
+        self._errors = 0
+
+    def batch(self, delays: List[float]):
+        with self._lock:
+            self._batches += 1
+            self._items += len(delays)
+            self._batch_sizes[len(delays)] += 1
+            self._total_delay += sum(delays)
+            self._max_delay = max(self._max_delay, max(delays))
+
+    def error(self):
+        with self._lock:
+            self._errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "errors": self._errors,
+                "avg_batch_size": self._items / self._batches if self._batches else 0.0,
+                "batch_size_histogram": {str(k): v for k, v in sorted(self._batch_sizes.items())},
+                "avg_queue_delay_ms": 1000.0 * self._total_delay / self._items if self._items else 0.0,
+                "max_queue_delay_ms": 1000.0 * self._max_delay,
+            }
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item calls into batched calls.
+
+    Callers `submit` an item and block on the returned future. A collector
+    thread waits up to `max_wait_ms` after the first queued item (or until
+    `max_batch_size` items are queued) and hands the whole batch to
+    `batch_fn`, which must return one result or exception per item, in order.
+    Batches are dispatched on a small pool so a slow batch does not hold up
+    collection of the next one.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 16,
+                 max_wait_ms: float = 10.0, max_concurrent_batches: int = 4, name: str = "micro-batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrent_batches), thread_name_prefix=name)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats = _BatchStats()
+
+    def submit(self, item: Any) -> Future:
+        self._ensure_started()
+        pending = _Pending(item)
+        self._queue.put(pending)
+        return pending.future
+
+    def __call__(self, item: Any) -> Any:
+        return self.submit(item).result()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._collect, name=f"{self.name}-collector", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = batch[0].enqueued_at + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    if timeout <= 0:
+                        batch.append(self._queue.get_nowait())
+                    else:
+                        batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: List[_Pending]):
+        dispatched_at = time.monotonic()
+        self._stats.batch([dispatched_at - p.enqueued_at for p in batch])
+
+        try:
+            results = self.batch_fn([p.item for p in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name}: batch_fn returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for pending, result in zip(batch, results):
+            if isinstance(result, Exception):
+                self._stats.error()
+                pending.future.set_exception(result)
+            else:
+                pending.future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats.snapshot(),
+            "queued": self._queue.qsize(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+
+class AsyncMicroBatcher:
+    """
+    asyncio counterpart of MicroBatcher: `await submit(item)` queues the item
+    on the running event loop, and a collector task awaits `abatch_fn` with
+    each batch, so no thread is held while the batch is in flight. State is
+    bound to one loop; a call from a new loop starts a fresh collector there.
+    """
+
+    def __init__(self, abatch_fn: Callable[[List[Any]], Awaitable[List[Any]]], max_batch_size: int = 16,
+                 max_wait_ms: float = 10.0, name: str = "async-micro-batcher"):
+        self.abatch_fn = abatch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional["asyncio.Queue[tuple]"] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats = _BatchStats()
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._spawn(self._collect(self._queue))
+        future = loop.create_future()
+        self._queue.put_nowait((item, future, time.monotonic()))
+        return await future
+
+    def _spawn(self, coro):
+        # Keep a reference so the task is not garbage-collected mid-flight
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _collect(self, pending: "asyncio.Queue[tuple]"):
+        while True:
+            batch = [await pending.get()]
+            deadline = batch[0][2] + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    if timeout <= 0:
+                        batch.append(pending.get_nowait())
+                    else:
+                        batch.append(await asyncio.wait_for(pending.get(), timeout))
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+            self._spawn(self._dispatch(batch))
+
+    async def _dispatch(self, batch: List[tuple]):
+        dispatched_at = time.monotonic()
+        self._stats.batch([dispatched_at - enqueued_at for _, _, enqueued_at in batch])
+
+        try:
+            results = await self.abatch_fn([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name}: abatch_fn returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                self._stats.error()
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats.snapshot(),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
@@ -0,0 +1,255 @@
+import glob
+import json
+import math
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from services.vector_quant import approximate_scores, normalize_rows, quantize
+except ImportError:
+    from backend.services.vector_quant import approximate_scores, normalize_rows, quantize
+
+def mmap_index_pointer(persist_directory: str, collection_name: str) -> str:
+    """JSON file naming the current generation; replaced last so readers never see a partial build"""
+    return os.path.join(persist_directory, f"{collection_name}.mmap.json")
+
+def _generation_prefix(persist_directory: str, collection_name: str, generation: str) -> str:
+    return os.path.join(persist_directory, f"{collection_name}.mmap-{generation}")
+
+def default_probes(n_lists: int) -> int:
+    """IVF lists to scan when MMAP_IVF_PROBES is unset: a third of them, at least 8"""
+    return min(n_lists, max(8, math.ceil(n_lists / 3)))
+
+def kmeans(vectors: np.ndarray, n_lists: int, iterations: int = 10, sample_size: int = 50000,
+           seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a sample of normalized rows; returns (n_lists, dims) centroids"""
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(n_lists):
+            members = sample[assignments == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        centroids = normalize_rows(centroids)
+    return centroids
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray, block_rows: int = 4096) -> np.ndarray:
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), block_rows):
+        assignments[start:start + block_rows] = np.argmax(vectors[start:start + block_rows] @ centroids.T, axis=1)
+    return assignments
+
+# Rows per block when copying the raw matrix into list order
+_COPY_BLOCK_ROWS = 16384
+
+def write_mmap_pages(persist_directory: str, collection_name: str,
+                     pages: Iterable[Tuple[Sequence[str], np.ndarray, Sequence[str], Sequence[Optional[Dict[str, Any]]]]],
+                     count: int, quantization: str = "none", ivf_lists: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    Write a new generation of the memory-mapped index and switch the pointer to it:
+
+      <prefix>.vectors.npy   row-major search matrix (float32, float16 or int8 codes)
+      <prefix>.full.npy      float32 rows for rescoring, only when quantized
+      <prefix>.aux.npz       int8 row scales, IVF centroids and list offsets
+      <prefix>.docs.sqlite3  row -> chunk id, text and metadata
+
+    `pages` yields (ids, vectors, documents, metadatas) and `count` bounds the
+    total. Each page is normalized into a preallocated memmap and its text into
+    SQLite, so memory holds one page, not the corpus. With `ivf_lists > 0` rows
+    are then copied block by block in centroid order so every list is one
+    contiguous slice of the mapped file. The generation the pointer named
+    before is kept for readers that were opening it; older ones are unlinked,
+    and processes that still map them keep reading until they reopen.
+    """
+    generation = f"{int(time.time() * 1000)}"
+    prefix = _generation_prefix(persist_directory, collection_name, generation)
+    raw_path = prefix + ".raw.npy"
+    conn = sqlite3.connect(prefix + ".docs.sqlite3")
+    conn.execute("CREATE TABLE raw_docs (raw INTEGER PRIMARY KEY, id TEXT NOT NULL, text TEXT NOT NULL, metadata TEXT NOT NULL)")
+
+    raw = None
+    n = 0
+    for ids, vectors, documents, metadatas in pages:
+        vectors = normalize_rows(vectors)
+        if raw is None:
+            raw = np.lib.format.open_memmap(raw_path, mode="w+", dtype=np.float32, shape=(count, vectors.shape[1]))
+        raw[n:n + len(ids)] = vectors
+        conn.executemany(
+            "INSERT INTO raw_docs VALUES (?, ?, ?, ?)",
+            ((n + i, ids[i], documents[i] or "", json.dumps(metadatas[i] or {})) for i in range(len(ids))),
+        )
+        n += len(ids)
+    conn.commit()
+    if raw is None:
+        conn.close()
+        os.remove(prefix + ".docs.sqlite3")
+        return None
+    raw.flush()
+    vectors = raw[:n]
+    dimensions = vectors.shape[1]
+
+    centroids = np.zeros((0, dimensions), dtype=np.float32)
+    offsets = np.array([0, n], dtype=np.int64)
+    order = np.arange(n)
+    if ivf_lists > 0 and n > ivf_lists:
+        centroids = kmeans(vectors, ivf_lists)
+        assignments = assign_lists(vectors, centroids)
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=ivf_lists))]).astype(np.int64)
+
+    code_dtype = quantize(vectors[:1], quantization)[0].dtype
+    codes = np.lib.format.open_memmap(prefix + ".vectors.npy", mode="w+", dtype=code_dtype, shape=(n, dimensions))
+    full = None
+    if quantization != "none":
+        full = np.lib.format.open_memmap(prefix + ".full.npy", mode="w+", dtype=np.float32, shape=(n, dimensions))
+    scales = np.empty(n, dtype=np.float32) if quantization == "int8" else None
+    for start in range(0, n, _COPY_BLOCK_ROWS):
+        rows = order[start:start + _COPY_BLOCK_ROWS]
+        # Read in file order for locality, then put the rows back in list order
+        sorted_rows = np.sort(rows)
+        block = np.asarray(vectors[sorted_rows], dtype=np.float32)[np.searchsorted(sorted_rows, rows)]
+        block_codes, block_scales = quantize(block, quantization)
+        codes[start:start + len(block)] = block_codes
+        if full is not None:
+            full[start:start + len(block)] = block
+        if scales is not None:
+            scales[start:start + len(block)] = block_scales
+    codes.flush()
+    if full is not None:
+        full.flush()
+    np.savez(
+        prefix + ".aux.npz",
+        scales=scales if scales is not None else np.zeros(0, dtype=np.float32),
+        centroids=centroids,
+        offsets=offsets,
+    )
+    del raw, vectors, codes, full
+    os.remove(raw_path)
+
+    conn.execute("CREATE TEMP TABLE ordering (row INTEGER PRIMARY KEY, raw INTEGER NOT NULL)")
+    conn.executemany("INSERT INTO ordering VALUES (?, ?)", enumerate(order.tolist()))
+    conn.execute("CREATE TABLE docs (row INTEGER PRIMARY KEY, id TEXT NOT NULL, text TEXT NOT NULL, metadata TEXT NOT NULL)")
+    conn.execute(
+        "INSERT INTO docs SELECT o.row, r.id, r.text, r.metadata FROM ordering o JOIN raw_docs r ON r.raw = o.raw "
+        "ORDER BY o.row"
+    )
+    conn.execute("DROP TABLE raw_docs")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+    info = {
+        "generation": generation,
+        "count": int(n),
+        "dimensions": int(dimensions),
+        "quantization": quantization,
+        "ivf_lists": int(len(centroids)),
+    }
+    pointer = mmap_index_pointer(persist_directory, collection_name)
+    try:
+        with open(pointer, "r", encoding="utf-8") as f:
+            previous = json.load(f)["generation"]
+    except (OSError, ValueError, KeyError):
+        previous = None
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(info, f)
+    os.replace(pointer + ".tmp", pointer)
+
+    # A worker that read the old pointer just before the swap may still be
+    # opening that generation's files, so it survives until the next build.
+    keep = {_generation_prefix(persist_directory, collection_name, g) + "." for g in (generation, previous) if g}
+    for path in glob.glob(_generation_prefix(persist_directory, collection_name, "*")):
+        if not any(path.startswith(k) for k in keep):
+            os.remove(path)
+    return info
+
+def write_mmap_index(persist_directory: str, collection_name: str, ids: Sequence[str], vectors: np.ndarray,
+                     documents: Sequence[str], metadatas: Sequence[Optional[Dict[str, Any]]],
+                     quantization: str = "none", ivf_lists: int = 0) -> Optional[Dict[str, Any]]:
+    """write_mmap_pages for records already in memory"""
+    return write_mmap_pages(persist_directory, collection_name, [(ids, vectors, documents, metadatas)],
+                            len(ids), quantization, ivf_lists)
+
+class MmapVectorIndex:
+    """
+    Read side of write_mmap_pages. The search matrix is opened with
+    np.load(mmap_mode="r"), so opening is O(1) and every worker process on the
+    host shares the same page-cached copy of the vectors. A quantized index
+    also maps the float32 rows; only the rescored candidates are read from it.
+    """
+
+    def __init__(self, persist_directory: str, collection_name: str):
+        with open(mmap_index_pointer(persist_directory, collection_name), "r", encoding="utf-8") as f:
+            self.info = json.load(f)
+        prefix = _generation_prefix(persist_directory, collection_name, self.info["generation"])
+        self.codes = np.load(prefix + ".vectors.npy", mmap_mode="r")
+        full_path = prefix + ".full.npy"
+        self.full = np.load(full_path, mmap_mode="r") if os.path.exists(full_path) else None
+        aux = np.load(prefix + ".aux.npz")
+        self.scales = aux["scales"] if aux["scales"].size else None
+        self.centroids = aux["centroids"]
+        self.offsets = aux["offsets"]
+        self.docs_path = prefix + ".docs.sqlite3"
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    def _scores(self, start: int, stop: int, query: np.ndarray) -> np.ndarray:
+        scales = self.scales[start:stop] if self.scales is not None else None
+        return approximate_scores(self.codes[start:stop], scales, query)
+
+    def search(self, query, k: int = 4, probes: Optional[int] = None,
+               rescore_factor: int = 4) -> List[Tuple[int, float]]:
+        """
+        Top-k (row, score) pairs. Exact blocked matmul over every row, or over
+        the `probes` IVF lists whose centroids are closest to the query
+        (default_probes() when None). A quantized matrix only picks
+        `k * rescore_factor` candidates; their float32 rows give the final
+        scores, as in QuantizedIndex.
+        """
+        if not len(self):
+            return []
+        query = normalize_rows(np.asarray(query, dtype=np.float32)[None, :self.codes.shape[1]])[0]
+
+        if len(self.centroids):
+            if probes is None:
+                probes = default_probes(len(self.centroids))
+            lists = np.argsort(-(self.centroids @ query))[:probes]
+            ranges = [(int(self.offsets[c]), int(self.offsets[c + 1])) for c in lists]
+        else:
+            ranges = [(0, len(self))]
+
+        rows = np.concatenate([np.arange(start, stop) for start, stop in ranges])
+        scores = np.concatenate([self._scores(start, stop, query) for start, stop in ranges])
+        if not len(rows):
+            return []
+        n = min(k * rescore_factor if self.full is not None else k, len(rows))
+        top = np.argpartition(-scores, n - 1)[:n]
+
+        if self.full is not None:
+            candidates = np.sort(rows[top])
+            exact = np.asarray(self.full[candidates], dtype=np.float32) @ query
+            order = np.argsort(-exact)[:k]
+            return [(int(candidates[i]), float(exact[i])) for i in order]
+
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def documents(self, rows: List[int]) -> List[Tuple[int, str, str, Dict[str, Any]]]:
+        """(row, chunk id, text, metadata) for `rows` still stored, in the order given"""
+        if not rows:
+            return []
+        conn = sqlite3.connect(f"file:{self.docs_path}?mode=ro", uri=True)
+        try:
+            placeholders = ",".join("?" * len(rows))
+            records = conn.execute(f"SELECT row, id, text, metadata FROM docs WHERE row IN ({placeholders})", rows)
+            by_row = {row: (row, doc_id, text, json.loads(metadata)) for row, doc_id, text, metadata in records}
+        finally:
+            conn.close()
+        return [by_row[row] for row in rows if row in by_row]
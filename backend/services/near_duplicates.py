@@ -0,0 +1,207 @@
+import hashlib
+import itertools
+import re
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+def shingles(text: str, size: int = 5) -> np.ndarray:
+    """
+    32-bit hashes of the character `size`-grams of the normalized text.
+    Character shingles keep typo variants ("pasword" / "password") close.
+    """
+    normalized = _NON_WORD_RE.sub(" ", text.lower()).strip()
+    if len(normalized) <= size:
+        grams = {normalized} if normalized else set()
+    else:
+        grams = {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """(bands, rows) whose LSH S-curve midpoint (1/b)^(1/r) is nearest `threshold`"""
+    best = (1, num_perm)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if abs((1 / bands) ** (1 / rows) - threshold) < abs((1 / best[0]) ** (1 / best[1]) - threshold):
+            best = (bands, rows)
+    return best
+
+class MinHasher:
+    """MinHash signatures from `num_perm` universal hash functions (a*x + b) mod (2^61 - 1)"""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # a, b < 2^30 and x < 2^32 keep a*x + b inside uint64 before the modulus
+        self.a = rng.integers(1, 1 << 30, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 30, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        if hashes.size == 0:
+            return np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        values = (np.outer(self.a, hashes) + self.b[:, None]) % _MERSENNE_PRIME
+        return values.min(axis=1)
+
+class NearDuplicateIndex:
+    """
+    Incremental near-duplicate clustering of tickets with MinHash + LSH.
+
+    Each ticket's signature is cut into bands; tickets that share any band
+    bucket are candidates, and a candidate whose estimated Jaccard similarity
+    is at least `threshold` is merged into the ticket's cluster (union-find).
+    An insert touches only its own buckets, so clustering n tickets costs
+    about O(n) signature work instead of comparing all pairs. Within a bucket
+    a new ticket stops at the first verified match, which already joins it to
+    that cluster.
+
+    Removing a ticket can split a cluster; clusters are then rebuilt from the
+    buckets on the next read.
+    """
+
+    def __init__(self, threshold: float = 0.6, num_perm: int = 128, shingle_size: int = 5):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+        self._lock = threading.Lock()
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+        self._parent: Dict[str, str] = {}
+        self._dirty = False
+        self._counts = {"inserted": 0, "removed": 0, "candidate_checks": 0, "rebuilds": 0}
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _find(self, key: str) -> str:
+        root = key
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[key] != root:
+            self._parent[key], key = root, self._parent[key]
+        return root
+
+    def _union(self, a: str, b: str):
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a != root_b:
+            # The earlier-inserted root stays root, so it is the cluster's representative
+            if self._items[root_a]["order"] > self._items[root_b]["order"]:
+                root_a, root_b = root_b, root_a
+            self._parent[root_b] = root_a
+
+    def _similar(self, a: str, b: str) -> bool:
+        self._counts["candidate_checks"] += 1
+        return float(np.mean(self._items[a]["signature"] == self._items[b]["signature"])) >= self.threshold
+
+    def _link(self, key: str, bucket: Iterable[str]):
+        for member in bucket:
+            if member == key:
+                continue
+            if self._find(member) == self._find(key) or self._similar(key, member):
+                self._union(key, member)
+                return
+
+    def _remove(self, key: str):
+        item = self._items.pop(key)
+        for band, band_key in enumerate(item["band_keys"]):
+            bucket = self._buckets[band].get(band_key, [])
+            if key in bucket:
+                bucket.remove(key)
+            if not bucket:
+                self._buckets[band].pop(band_key, None)
+        self._counts["removed"] += 1
+        self._dirty = True
+
+    def _insert(self, key: str, text: str, digest: str, info: Dict[str, Any]):
+        hashes = shingles(text, self.shingle_size)
+        signature = self.hasher.signature(hashes)
+        # Empty tickets get no buckets rather than all matching each other
+        band_keys = self._band_keys(signature) if hashes.size else []
+        self._items[key] = {"digest": digest, "signature": signature, "band_keys": band_keys,
+                            "info": info, "order": self._counts["inserted"]}
+        self._parent[key] = key
+        for band, band_key in enumerate(band_keys):
+            bucket = self._buckets[band].setdefault(band_key, [])
+            if not self._dirty:
+                self._link(key, bucket)
+            bucket.append(key)
+        self._counts["inserted"] += 1
+
+    def _rebuild(self):
+        self._parent = {key: key for key in self._items}
+        for buckets in self._buckets:
+            for bucket in buckets.values():
+                for i, key in enumerate(bucket):
+                    self._link(key, itertools.islice(bucket, i))
+        self._dirty = False
+        self._counts["rebuilds"] += 1
+
+    def sync(self, tickets: List[Dict[str, Any]], key_fn: Callable[[Dict[str, Any]], str],
+             text_fn: Callable[[Dict[str, Any]], str], prune: bool = False) -> Dict[str, int]:
+        """
+        Insert tickets that are new or whose text changed. With `prune`,
+        `tickets` is the whole source and anything else is removed.
+        """
+        added = 0
+        with self._lock:
+            keys = set()
+            for ticket in tickets:
+                key = key_fn(ticket)
+                keys.add(key)
+                text = text_fn(ticket)
+                digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+                existing = self._items.get(key)
+                if existing is not None and existing["digest"] == digest:
+                    continue
+                if existing is not None:
+                    self._remove(key)
+                self._insert(key, text, digest, {"id": ticket.get("id"), "subject": ticket.get("subject", "")})
+                added += 1
+            removed = 0
+            if prune:
+                stale = [key for key in self._items if key not in keys]
+                for key in stale:
+                    self._remove(key)
+                removed = len(stale)
+        return {"inserted": added, "removed": removed}
+
+    def clusters(self, keys: Optional[Iterable[str]] = None, min_size: int = 2) -> List[Dict[str, Any]]:
+        """
+        Clusters of at least `min_size` tickets, largest first, restricted to
+        `keys` when given. The representative is the earliest-inserted member.
+        """
+        with self._lock:
+            if self._dirty:
+                self._rebuild()
+            selected = self._items.keys() if keys is None else [k for k in keys if k in self._items]
+            groups: Dict[str, List[str]] = {}
+            for key in selected:
+                groups.setdefault(self._find(key), []).append(key)
+            result = []
+            for root, members in groups.items():
+                if len(members) < min_size:
+                    continue
+                members.sort(key=lambda k: self._items[k]["order"])
+                result.append({
+                    "cluster_id": hashlib.sha1(root.encode("utf-8")).hexdigest()[:12],
+                    "size": len(members),
+                    "representative": self._items[members[0]]["info"],
+                    "ticket_ids": [self._items[k]["info"]["id"] for k in members],
+                })
+        result.sort(key=lambda c: -c["size"])
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tickets": len(self._items),
+                "threshold": self.threshold,
+                "bands": self.bands,
+                "rows": self.rows,
+                **self._counts,
+            }
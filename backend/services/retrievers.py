@@ -0,0 +1,318 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+try:
+    from services.bm25_index import BM25Index, bm25_index_path
+    from services.embedding_profile import EmbeddingProfile
+    from services.mmap_index import MmapVectorIndex, default_probes, mmap_index_pointer
+    from services.vector_quant import QuantizedIndex, quantized_index_path
+except ImportError:
+    from backend.services.bm25_index import BM25Index, bm25_index_path
+    from backend.services.embedding_profile import EmbeddingProfile
+    from backend.services.mmap_index import MmapVectorIndex, default_probes, mmap_index_pointer
+    from backend.services.vector_quant import QuantizedIndex, quantized_index_path
+
+VECTOR_BACKENDS = ("chroma", "mmap")
+RETRIEVAL_MODES = ("dense", "hybrid", "lexical_first")
+
+def open_chroma(profile: EmbeddingProfile, embedding_function, persist_directory: str):
+    """The Chroma collection for `profile`; graph.py and build_index.py both open it through here"""
+    from langchain_chroma import Chroma
+    return Chroma(
+        collection_name=profile.collection_name(),
+        embedding_function=embedding_function,
+        persist_directory=persist_directory,
+    )
+
+class _ReloadingFile:
+    """Holds an object loaded from `path` and reloads it when the file's mtime changes"""
+
+    def __init__(self, path: str, loader: Callable[[str], Any]):
+        self.path = path
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._value = None
+
+    def get(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return None
+        with self._lock:
+            if self._mtime != mtime:
+                self._value = self.loader(self.path)
+                self._mtime = mtime
+            return self._value
+
+def with_score(doc: Document, score: float) -> Document:
+    """Copy of `doc` carrying its cosine similarity in metadata["score"] for the context builder"""
+    return Document(id=doc.id, page_content=doc.page_content, metadata={**(doc.metadata or {}), "score": score})
+
+class VectorRetriever:
+    """
+    What graph.retrieve searches through. Backends return the top-k chunks as
+    Documents for an already embedded query, best first, with the cosine
+    similarity in metadata["score"].
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.searches = 0
+        self.search_seconds = 0.0
+
+    def _record(self, started: float):
+        with self._lock:
+            self.searches += 1
+            self.search_seconds += time.perf_counter() - started
+
+    def search_by_vector(self, query_vector: List[float], k: int = 4) -> List[Document]:
+        raise NotImplementedError
+
+    async def asearch_by_vector(self, query_vector: List[float], k: int = 4) -> List[Document]:
+        return await asyncio.to_thread(self.search_by_vector, query_vector, k)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "searches": self.searches,
+                "avg_search_ms": 1000.0 * self.search_seconds / self.searches if self.searches else 0.0,
+            }
+
+class ChromaRetriever(VectorRetriever):
+    """
+    Chroma similarity search. With EMBEDDING_QUANTIZATION set, candidates come
+    from the compact matrix build_index exports and are rescored with the
+    float32 vectors Chroma keeps.
+    """
+
+    name = "chroma"
+
+    def __init__(self, store_fn: Callable[[], Any], profile: EmbeddingProfile, persist_directory: str):
+        super().__init__()
+        self.store_fn = store_fn
+        self.profile = profile
+        self._quantized = _ReloadingFile(
+            quantized_index_path(persist_directory, profile.collection_name()), QuantizedIndex.load
+        )
+
+    def quantized_index(self) -> Optional[QuantizedIndex]:
+        if self.profile.quantization == "none":
+            return None
+        return self._quantized.get()
+
+    def _stored_vectors(self, ids: List[str]) -> Dict[str, Any]:
+        # Full-precision rows for the rescoring step; ids deleted since the matrix was exported are absent
+        records = self.store_fn().get(ids=ids, include=["embeddings"])
+        return dict(zip(records["ids"], records["embeddings"]))
+
+    def _stored_documents(self, hits: List[Tuple[str, float]]) -> List[Document]:
+        ids = [doc_id for doc_id, _ in hits]
+        records = self.store_fn().get(ids=ids, include=["documents", "metadatas"])
+        by_id = {i: Document(id=i, page_content=text, metadata=metadata or {})
+                 for i, text, metadata in zip(records["ids"], records["documents"], records["metadatas"])}
+        return [with_score(by_id[i], score) for i, score in hits if i in by_id]
+
+    def search_by_vector(self, query_vector, k: int = 4) -> List[Document]:
+        started = time.perf_counter()
+        index = self.quantized_index()
+        if index is None:
+            # Chroma's default space is squared L2; on unit vectors cosine = 1 - d / 2
+            hits = self.store_fn().similarity_search_by_vector_with_relevance_scores(query_vector, k=k)
+            docs = [with_score(doc, 1.0 - distance / 2.0) for doc, distance in hits]
+        else:
+            hits = index.search(query_vector, k, self.profile.rescore_factor, full_vectors_fn=self._stored_vectors)
+            docs = self._stored_documents(hits)
+        self._record(started)
+        return docs
+
+class MmapRetriever(VectorRetriever):
+    """
+    Search the memory-mapped NumPy index build_index writes when
+    VECTOR_BACKEND=mmap. Serving needs no Chroma client, and a rebuild is
+    picked up on the next query.
+    """
+
+    name = "mmap"
+
+    def __init__(self, persist_directory: str, collection_name: str, probes: Optional[int] = None,
+                 rescore_factor: int = 4):
+        super().__init__()
+        self.probes = probes
+        self.rescore_factor = rescore_factor
+        self._index = _ReloadingFile(
+            mmap_index_pointer(persist_directory, collection_name),
+            lambda _: MmapVectorIndex(persist_directory, collection_name),
+        )
+
+    def search_by_vector(self, query_vector, k: int = 4) -> List[Document]:
+        started = time.perf_counter()
+        index = self._index.get()
+        if index is None:
+            raise FileNotFoundError(
+                f"No mmap vector index at {self._index.path}; run services/build_index.py with VECTOR_BACKEND=mmap"
+            )
+        hits = index.search(query_vector, k, self.probes, self.rescore_factor)
+        scores = dict(hits)
+        docs = [with_score(Document(id=doc_id, page_content=text, metadata=metadata), scores[row])
+                for row, doc_id, text, metadata in index.documents([row for row, _ in hits])]
+        self._record(started)
+        return docs
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        index = self._index.get()
+        if index is not None:
+            probes = self.probes
+            if probes is None and len(index.centroids):
+                probes = default_probes(len(index.centroids))
+            rescore_factor = self.rescore_factor if index.full is not None else None
+            stats.update(index.info, probes=probes, rescore_factor=rescore_factor, mapped_bytes=int(index.codes.nbytes))
+        return stats
+
+def make_retriever(backend: str, profile: EmbeddingProfile, persist_directory: str,
+                   store_fn: Callable[[], Any]) -> VectorRetriever:
+    if backend == "chroma":
+        return ChromaRetriever(store_fn, profile, persist_directory)
+    if backend == "mmap":
+        # 0 or unset scales the probes with the number of IVF lists
+        probes = int(os.getenv("MMAP_IVF_PROBES", "0")) or None
+        return MmapRetriever(persist_directory, profile.collection_name(), probes, profile.rescore_factor)
+    raise ValueError(f"VECTOR_BACKEND must be one of {VECTOR_BACKENDS}, got {backend!r}")
+
+def doc_key(doc: Document) -> str:
+    return doc.id or doc.page_content
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 4, rrf_k: int = 60) -> List[Document]:
+    """Merge ranked lists by summing 1 / (rrf_k + rank); needs no score calibration between them"""
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)[:k]]
+
+class HybridRetriever:
+    """
+    BM25 over the chunk text plus a dense VectorRetriever, fused with
+    reciprocal-rank fusion. Exact identifiers (connector names, SDK methods,
+    error codes) that embeddings blur are caught by the lexical side.
+
+    `lexical_first` returns BM25 results on their own when the best lexical
+    score is at least `min_score` and `margin` times the runner-up, so the
+    caller can skip the query embedding altogether.
+    """
+
+    def __init__(self, dense: VectorRetriever, bm25_path: str, candidates_factor: int = 4,
+                 margin: float = 2.0, min_score: float = 5.0):
+        self.dense = dense
+        self.candidates_factor = max(1, candidates_factor)
+        self.margin = margin
+        self.min_score = min_score
+        self._bm25 = _ReloadingFile(bm25_path, BM25Index)
+        self._lock = threading.Lock()
+        self._paths = {path: {"queries": 0, "seconds": 0.0} for path in ("lexical_shortcut", "hybrid", "dense_only")}
+        self._fused = {"from_lexical": 0, "from_dense": 0, "from_both": 0}
+
+    def _record(self, path: str, started: float):
+        with self._lock:
+            self._paths[path]["queries"] += 1
+            self._paths[path]["seconds"] += time.perf_counter() - started
+
+    def lexical(self, question: str, k: int) -> List[Tuple[Document, float]]:
+        index = self._bm25.get()
+        if index is None:
+            return []
+        hits = index.search(question, k)
+        scores = dict(hits)
+        # documents() skips rows no longer stored, so scores are matched by row, not position
+        return [(Document(id=doc_id, page_content=text, metadata=metadata), scores[row])
+                for row, doc_id, text, metadata in index.documents([row for row, _ in hits])]
+
+    def lexical_first(self, question: str, k: int = 4) -> Optional[List[Document]]:
+        """BM25 results if the top hit is decisive, otherwise None (embed and call search)"""
+        started = time.perf_counter()
+        hits = self.lexical(question, max(k, 2))
+        if not hits:
+            return None
+        top = hits[0][1]
+        runner_up = hits[1][1] if len(hits) > 1 else 0.0
+        if top < self.min_score or top < self.margin * runner_up:
+            return None
+        self._record("lexical_shortcut", started)
+        return [doc for doc, _ in hits[:k]]
+
+    def _fuse(self, lexical_docs: List[Document], dense_docs: List[Document], k: int, started: float) -> List[Document]:
+        if not lexical_docs:
+            self._record("dense_only", started)
+            return dense_docs[:k]
+
+        fused = reciprocal_rank_fusion([lexical_docs, dense_docs], k)
+        lexical_keys = {doc_key(d) for d in lexical_docs}
+        dense_keys = {doc_key(d) for d in dense_docs}
+        with self._lock:
+            for doc in fused:
+                key = doc_key(doc)
+                if key in lexical_keys and key in dense_keys:
+                    self._fused["from_both"] += 1
+                elif key in lexical_keys:
+                    self._fused["from_lexical"] += 1
+                else:
+                    self._fused["from_dense"] += 1
+        self._record("hybrid", started)
+        return fused
+
+    def search(self, question: str, query_vector: List[float], k: int = 4) -> List[Document]:
+        started = time.perf_counter()
+        candidates = k * self.candidates_factor
+        lexical_docs = [doc for doc, _ in self.lexical(question, candidates)]
+        dense_docs = self.dense.search_by_vector(query_vector, candidates)
+        return self._fuse(lexical_docs, dense_docs, k, started)
+
+    async def asearch(self, question: str, query_vector: List[float], k: int = 4) -> List[Document]:
+        started = time.perf_counter()
+        candidates = k * self.candidates_factor
+        lexical_docs, dense_docs = await asyncio.gather(
+            asyncio.to_thread(lambda: [doc for doc, _ in self.lexical(question, candidates)]),
+            self.dense.asearch_by_vector(query_vector, candidates),
+        )
+        return self._fuse(lexical_docs, dense_docs, k, started)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            paths = {
+                path: {
+                    "queries": counts["queries"],
+                    "avg_ms": 1000.0 * counts["seconds"] / counts["queries"] if counts["queries"] else 0.0,
+                }
+                for path, counts in self._paths.items()
+            }
+            fused_total = sum(self._fused.values())
+            return {
+                "paths": paths,
+                "embedding_calls_saved": paths["lexical_shortcut"]["queries"],
+                # Share of fused results each side contributed: how often BM25 found what dense search missed
+                "fused_hit_rate": {
+                    source: count / fused_total if fused_total else 0.0 for source, count in self._fused.items()
+                },
+                "bm25_documents": len(self._bm25.get() or []),
+            }
+
+def make_hybrid_retriever(dense: VectorRetriever, profile: EmbeddingProfile, persist_directory: str) -> HybridRetriever:
+    return HybridRetriever(
+        dense,
+        bm25_index_path(persist_directory, profile.collection_name()),
+        candidates_factor=int(os.getenv("HYBRID_CANDIDATES_FACTOR", "4")),
+        margin=float(os.getenv("LEXICAL_MARGIN", "2.0")),
+        min_score=float(os.getenv("LEXICAL_MIN_SCORE", "5.0")),
+    )
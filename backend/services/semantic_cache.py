@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Cache of high-confidence RAG answers looked up by question similarity.
+
+    Question embeddings are L2-normalized into a fixed-size float32 matrix, so
+    a lookup is one matrix-vector product. When full, the oldest entry is
+    overwritten. Every lookup and store first compares `index_version_fn()`
+    with the version the entries were built against and drops them all if the
+    vector index has been rebuilt since.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 2000, min_confidence: float = 0.75,
+                 index_version_fn: Optional[Callable[[], Optional[str]]] = None):
+        self.threshold = threshold
+        self.max_entries = max(0, max_entries)
+        self.min_confidence = min_confidence
+        self.index_version_fn = index_version_fn or (lambda: None)
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * self.max_entries
+        self._size = 0
+        self._next = 0
+        self._index_version = self.index_version_fn()
+        self._similarities: Counter = Counter()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _check_index_version(self):
+        version = self.index_version_fn()
+        if version != self._index_version:
+            self._matrix = None
+            self._entries = [None] * self.max_entries
+            self._size = 0
+            self._next = 0
+            self._index_version = version
+            self._counters["invalidations"] += 1
+
+    @staticmethod
+    def _normalize(vector) -> Optional[np.ndarray]:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    def lookup(self, vector) -> Optional[Dict[str, Any]]:
+        """Return the cached answer for the most similar question above the threshold"""
+        if not self.enabled:
+            return None
+        query = self._normalize(vector)
+        with self._lock:
+            self._check_index_version()
+            if query is None or self._size == 0 or self._matrix.shape[1] != query.shape[0]:
+                self._counters["misses"] += 1
+                return None
+
+            scores = self._matrix[:self._size] @ query
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            # 0.05-wide buckets of the best-match similarity, hit or miss
+            self._similarities[f"{min(int(similarity * 20), 19) / 20:.2f}"] += 1
+
+            if similarity < self.threshold:
+                self._counters["misses"] += 1
+                return None
+            self._counters["hits"] += 1
+            return {**self._entries[best], "similarity": similarity}
+
+    def store(self, vector, question: str, answer: str, confidence: float, sources: List[str]):
+        if not self.enabled or confidence < self.min_confidence:
+            return
+        row = self._normalize(vector)
+        if row is None:
+            return
+        with self._lock:
+            self._check_index_version()
+            if self._matrix is None or self._matrix.shape[1] != row.shape[0]:
+                self._matrix = np.zeros((self.max_entries, row.shape[0]), dtype=np.float32)
+                self._size = 0
+                self._next = 0
+            self._matrix[self._next] = row
+            self._entries[self._next] = {
+                "question": question,
+                "answer": answer,
+                "confidence": confidence,
+                "sources": list(sources),
+                "stored_at": time.time(),
+            }
+            self._next = (self._next + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+            self._counters["stores"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            similarities = dict(sorted(self._similarities.items()))
+            size = self._size
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": counters["hits"] / lookups if lookups else 0.0,
+            "entries": size,
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "similarity_distribution": similarities,
+        }
@@ -0,0 +1,148 @@
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+try:
+    from services.ticket_results import HIGH_PRIORITIES
+except ImportError:
+    from backend.services.ticket_results import HIGH_PRIORITIES
+
+# First of these present on a ticket is its creation time (ISO 8601 string or epoch seconds)
+TIMESTAMP_FIELDS = ("created_at", "timestamp", "created", "date")
+
+def _counter(counts: pd.Series) -> Counter:
+    return Counter(dict(zip(counts.index.tolist(), counts.tolist())))
+
+def parse_timestamps(values: List[Any]) -> pd.Series:
+    """UTC datetimes for mixed ISO strings / epoch seconds; NaT where unparseable"""
+    raw = pd.Series(values, dtype=object)
+    epochs = pd.to_numeric(raw, errors="coerce")
+    parsed = pd.to_datetime(raw.where(epochs.isna()), errors="coerce", utc=True, format="mixed")
+    return parsed.fillna(pd.to_datetime(epochs, unit="s", errors="coerce", utc=True))
+
+def ticket_timestamps(tickets: Iterable[Dict[str, Any]], key_fn: Callable[[Dict[str, Any]], str]) -> pd.DataFrame:
+    """ticket_id -> created_at for tickets carrying one of TIMESTAMP_FIELDS"""
+    ids, values = [], []
+    for ticket in tickets:
+        value = next((ticket[f] for f in TIMESTAMP_FIELDS if ticket.get(f) not in (None, "")), None)
+        if value is not None:
+            ids.append(key_fn(ticket))
+            values.append(value)
+    frame = pd.DataFrame({"ticket_id": ids, "created_at": parse_timestamps(values)})
+    return frame.dropna(subset=["created_at"])
+
+class TicketAnalytics:
+    """
+    Report analytics over two columnar frames: one row per classified ticket
+    (ticket_id, subject, sentiment, priority[, created_at]) and one row per
+    (ticket_id, label). Every distribution, cross-tab and time rollup is a
+    vectorized group-by; nothing loops over tickets in Python.
+    """
+
+    def __init__(self, tickets: pd.DataFrame, labels: pd.DataFrame, timestamps: Optional[pd.DataFrame] = None):
+        if timestamps is not None and not timestamps.empty:
+            tickets = tickets.merge(timestamps, on="ticket_id", how="left")
+        self.tickets = tickets
+        self.labels = labels
+
+    @classmethod
+    def from_store(cls, store, ticket_ids: Optional[List[str]] = None,
+                   timestamps: Optional[pd.DataFrame] = None, with_labels: bool = True) -> "TicketAnalytics":
+        tickets, labels = store.frames(ticket_ids, with_labels)
+        return cls(tickets, labels, timestamps)
+
+    @classmethod
+    def from_classifications(cls, rows: Iterable[Dict[str, Any]]) -> "TicketAnalytics":
+        """From {"id": ..., "classification": {...}} rows, e.g. evaluation results"""
+        ids, subjects, sentiments, priorities, label_ids, labels = [], [], [], [], [], []
+        for row in rows:
+            ticket_id = str(row.get("id"))
+            classification = row["classification"]
+            ids.append(ticket_id)
+            subjects.append(row.get("subject", ""))
+            sentiments.append(classification.get("sentiment", "Neutral"))
+            priorities.append(classification.get("priority", "P2"))
+            for label in classification.get("label", []):
+                label_ids.append(ticket_id)
+                labels.append(label)
+        tickets = pd.DataFrame({"ticket_id": ids, "subject": subjects, "sentiment": sentiments, "priority": priorities})
+        return cls(tickets, pd.DataFrame({"ticket_id": label_ids, "label": labels}))
+
+    def distribution(self, dimension: str) -> Counter:
+        """Ticket counts per topic, sentiment, priority or (normalized) subject"""
+        if dimension == "topic":
+            return _counter(self.labels["label"].value_counts())
+        if dimension == "subject":
+            return _counter(self.tickets["subject"].fillna("").str.lower().str.strip().value_counts())
+        return _counter(self.tickets[dimension].value_counts())
+
+    def cross_tab(self, rows: str, columns: str) -> Dict[str, Dict[str, int]]:
+        """{row value: {column value: count}}; "topic" joins the label frame"""
+        frame = self.tickets
+        if "topic" in (rows, columns):
+            frame = frame.merge(self.labels.rename(columns={"label": "topic"}), on="ticket_id")
+        table = pd.crosstab(frame[rows], frame[columns])
+        return {str(r): {str(c): int(n) for c, n in counts.items() if n} for r, counts in table.iterrows()}
+
+    def high_priority(self) -> List[Dict[str, Any]]:
+        high = self.tickets[self.tickets["priority"].isin(HIGH_PRIORITIES)]
+        topics = self.labels[self.labels["ticket_id"].isin(high["ticket_id"])].groupby("ticket_id")["label"].agg(list)
+        return [
+            {"id": ticket_id, "subject": subject, "priority": priority, "sentiment": sentiment,
+             "topics": topics.get(ticket_id, [])}
+            for ticket_id, subject, priority, sentiment in
+            high[["ticket_id", "subject", "priority", "sentiment"]].itertuples(index=False)
+        ]
+
+    def aggregates(self) -> Dict[str, Any]:
+        """Same shape as TicketResultsStore.aggregates()"""
+        return {
+            "topic": self.distribution("topic"),
+            "sentiment": self.distribution("sentiment"),
+            "priority": self.distribution("priority"),
+            "subject": self.distribution("subject"),
+            "priority_by_sentiment": self.cross_tab("priority", "sentiment"),
+            "topic_by_priority": self.cross_tab("topic", "priority"),
+            "high_priority": self.high_priority(),
+        }
+
+    @staticmethod
+    def no_time_data() -> Dict[str, Any]:
+        return {
+            "hourly_distribution": {},
+            "daily_distribution": {},
+            "trend_analysis": "No timestamp data available"
+        }
+
+    def time_rollups(self) -> Dict[str, Any]:
+        """Hour-of-day, daily and weekly ticket volume, daily volume per priority, week-over-week trend"""
+        if "created_at" not in self.tickets or self.tickets["created_at"].isna().all():
+            return self.no_time_data()
+        timed = self.tickets.dropna(subset=["created_at"])
+        created = timed["created_at"]
+        hourly = created.dt.hour.value_counts().sort_index()
+        daily = created.dt.floor("D").value_counts().sort_index()
+        weekly = created.dt.tz_convert(None).dt.to_period("W-SUN").dt.start_time.value_counts().sort_index()
+        by_priority = pd.crosstab(created.dt.floor("D"), timed["priority"])
+
+        week_start = created.max() - pd.Timedelta(days=7)
+        this_week = int((created > week_start).sum())
+        previous_week = int(((created <= week_start) & (created > week_start - pd.Timedelta(days=7))).sum())
+        if previous_week:
+            change = (this_week - previous_week) / previous_week * 100
+            trend = f"{this_week} tickets in the last 7 days, {change:+.1f}% vs the 7 days before"
+        else:
+            trend = f"{this_week} tickets in the last 7 days"
+
+        return {
+            "hourly_distribution": {int(h): int(n) for h, n in hourly.items()},
+            "daily_distribution": {d.strftime("%Y-%m-%d"): int(n) for d, n in daily.items()},
+            "weekly_distribution": {w.strftime("%Y-%m-%d"): int(n) for w, n in weekly.items()},
+            "daily_by_priority": {
+                d.strftime("%Y-%m-%d"): {str(p): int(n) for p, n in counts.items() if n}
+                for d, counts in by_priority.iterrows()
+            },
+            "timestamped_tickets": int(len(timed)),
+            "trend_analysis": trend
+        }
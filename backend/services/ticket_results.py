@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+HIGH_PRIORITIES = ("P0", "P1")
+# Counter kinds keyed by a pair of values, stored as "<row>\t<column>"
+CROSS_TAB_KINDS = {"priority_sentiment": "priority_by_sentiment", "topic_priority": "topic_by_priority"}
+
+def content_hash(text: str, namespace: str = "") -> str:
+    """Ticket text hashed with the classifier namespace: a prompt or model change makes every row stale"""
+    return hashlib.sha256(f"{namespace}\n{text}".encode("utf-8")).hexdigest()
+
+class TicketResultsStore:
+    """
+    Classification result per ticket id plus running report aggregates.
+
+    `results` holds the latest classification of every ticket together with
+    the content hash it was computed from. `counters` holds the topic,
+    sentiment, priority and subject counts over all stored tickets, and is
+    adjusted in the same transaction as each result write. A report over the
+    whole store is then a read of `counters`, however many tickets there are.
+    """
+
+    def __init__(self, db_path: str):
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                ticket_id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                labels TEXT NOT NULL,
+                sentiment TEXT NOT NULL,
+                priority TEXT NOT NULL,
+                classification TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_by_priority ON results(priority)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS counters (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (kind, key)
+            )
+            """
+        )
+        self._conn.commit()
+        self._counts = {"reused": 0, "classified": 0, "removed": 0}
+        self._backfill_cross_tabs()
+
+    @staticmethod
+    def _counter_keys(subject: str, labels: List[str], sentiment: str, priority: str):
+        keys = [("topic", label) for label in labels]
+        keys += [("sentiment", sentiment), ("priority", priority), ("subject", subject.lower().strip())]
+        keys += [("priority_sentiment", f"{priority}\t{sentiment}")]
+        keys += [("topic_priority", f"{label}\t{priority}") for label in labels]
+        return keys
+
+    def _backfill_cross_tabs(self):
+        """Stores written before the cross-tab counters existed get them rebuilt once from their rows"""
+        has_rows = self._conn.execute("SELECT 1 FROM results LIMIT 1").fetchone()
+        has_cross_tabs = self._conn.execute("SELECT 1 FROM counters WHERE kind = 'priority_sentiment' LIMIT 1").fetchone()
+        if not has_rows or has_cross_tabs:
+            return
+        totals: Counter = Counter()
+        for subject, labels, sentiment, priority in self._conn.execute(
+            "SELECT subject, labels, sentiment, priority FROM results"
+        ):
+            totals.update(self._counter_keys(subject, json.loads(labels), sentiment, priority))
+        self._conn.execute("DELETE FROM counters")
+        self._conn.executemany("INSERT INTO counters VALUES (?, ?, ?)",
+                               [(kind, key, count) for (kind, key), count in totals.items()])
+        self._conn.commit()
+
+    def _adjust(self, keys, delta: int):
+        self._conn.executemany(
+            "INSERT INTO counters VALUES (?, ?, ?) "
+            "ON CONFLICT(kind, key) DO UPDATE SET count = count + excluded.count",
+            [(kind, key, delta) for kind, key in keys],
+        )
+
+    def _delete_row(self, ticket_id: str):
+        row = self._conn.execute(
+            "SELECT subject, labels, sentiment, priority FROM results WHERE ticket_id = ?", (ticket_id,)
+        ).fetchone()
+        if row is None:
+            return
+        subject, labels, sentiment, priority = row
+        self._adjust(self._counter_keys(subject, json.loads(labels), sentiment, priority), -1)
+        self._conn.execute("DELETE FROM results WHERE ticket_id = ?", (ticket_id,))
+
+    def hashes_for(self, ticket_ids: Iterable[str]) -> Dict[str, str]:
+        ids = list(ticket_ids)
+        found: Dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT ticket_id, content_hash FROM results WHERE ticket_id IN ({placeholders})", chunk
+                )
+                found.update(rows)
+        return found
+
+    def put(self, ticket_id: str, digest: str, subject: str, classification: Dict[str, Any]):
+        """Store (or replace) one ticket's result and move the counters from its old values to the new"""
+        labels = list(classification.get("label", []))
+        sentiment = classification.get("sentiment", "Neutral")
+        priority = classification.get("priority", "P2")
+        with self._lock:
+            self._delete_row(ticket_id)
+            self._conn.execute(
+                "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (ticket_id, digest, subject or "", json.dumps(labels), sentiment, priority,
+                 json.dumps(classification), time.time()),
+            )
+            self._adjust(self._counter_keys(subject or "", labels, sentiment, priority), 1)
+            self._conn.commit()
+
+    def remove_except(self, keep_ids: Iterable[str]) -> int:
+        """Drop tickets that are no longer in the source, with their counter contributions"""
+        keep = set(keep_ids)
+        with self._lock:
+            stale = [row[0] for row in self._conn.execute("SELECT ticket_id FROM results") if row[0] not in keep]
+            for ticket_id in stale:
+                self._delete_row(ticket_id)
+            self._conn.execute("DELETE FROM counters WHERE count <= 0")
+            self._conn.commit()
+            self._counts["removed"] += len(stale)
+        return len(stale)
+
+    def sync(self, tickets: List[Dict[str, Any]], ticket_id_fn: Callable[[Dict[str, Any]], str],
+             text_fn: Callable[[Dict[str, Any]], str], classify_fn: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+             namespace: str = "") -> Dict[str, int]:
+        """
+        Classify only tickets whose id is new or whose content hash changed.
+        `classify_fn` takes the tickets to classify and returns one
+        {"classification": ...} or {"error": ...} result per ticket, in order.
+        An edited ticket that fails to reclassify loses its stored result, so
+        the aggregates never count a classification of text it no longer has;
+        it is counted in "errors" and, of those, in "dropped".
+        """
+        digests = {ticket_id_fn(t): content_hash(text_fn(t), namespace) for t in tickets}
+        stored = self.hashes_for(digests)
+        todo = [t for t in tickets if stored.get(ticket_id_fn(t)) != digests[ticket_id_fn(t)]]
+
+        errors = 0
+        stale = []
+        for ticket, result in zip(todo, classify_fn(todo) if todo else []):
+            ticket_id = ticket_id_fn(ticket)
+            if "error" in result:
+                print(f"Error processing ticket {ticket.get('id')}: {result['error']}")
+                errors += 1
+                if ticket_id in stored:
+                    stale.append(ticket_id)
+                continue
+            self.put(ticket_id, digests[ticket_id], ticket.get("subject", ""), result["classification"])
+
+        with self._lock:
+            for ticket_id in stale:
+                self._delete_row(ticket_id)
+            self._conn.execute("DELETE FROM counters WHERE count <= 0")
+            self._conn.commit()
+            self._counts["reused"] += len(tickets) - len(todo)
+            self._counts["classified"] += len(todo) - errors
+            self._counts["removed"] += len(stale)
+        return {"reused": len(tickets) - len(todo), "classified": len(todo) - errors, "errors": errors,
+                "dropped": len(stale)}
+
+    def _high_priority(self, where: str = "", params: tuple = ()) -> List[Dict[str, Any]]:
+        rows = self._conn.execute(
+            "SELECT ticket_id, subject, priority, sentiment, labels FROM results "
+            f"WHERE priority IN ({','.join('?' * len(HIGH_PRIORITIES))}) {where} ORDER BY rowid",
+            HIGH_PRIORITIES + params,
+        )
+        return [
+            {"id": ticket_id, "subject": subject, "priority": priority, "sentiment": sentiment, "topics": json.loads(labels)}
+            for ticket_id, subject, priority, sentiment, labels in rows
+        ]
+
+    def aggregates(self) -> Dict[str, Any]:
+        """Counters over every stored ticket, read without touching per-ticket rows"""
+        with self._lock:
+            counters: Dict[str, Counter] = {"topic": Counter(), "sentiment": Counter(), "priority": Counter(), "subject": Counter()}
+            cross_tabs: Dict[str, Dict[str, Dict[str, int]]] = {name: {} for name in CROSS_TAB_KINDS.values()}
+            for kind, key, count in self._conn.execute("SELECT kind, key, count FROM counters WHERE count > 0"):
+                if kind in CROSS_TAB_KINDS:
+                    row, column = key.split("\t", 1)
+                    cross_tabs[CROSS_TAB_KINDS[kind]].setdefault(row, {})[column] = count
+                else:
+                    counters[kind][key] = count
+            high_priority = self._high_priority()
+        return {**counters, **cross_tabs, "high_priority": high_priority}
+
+    def frames(self, ticket_ids: Optional[List[str]] = None, with_labels: bool = True):
+        """
+        (tickets, labels) DataFrames for the analytics engine: one row per
+        stored ticket, and one per (ticket, label) unnested by SQLite's
+        json_each (empty unless `with_labels`). `ticket_ids` restricts both
+        through a temp-table join.
+        """
+        import pandas as pd
+        with self._lock:
+            where = ""
+            if ticket_ids is not None:
+                self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS selected_ids (ticket_id TEXT PRIMARY KEY)")
+                self._conn.execute("DELETE FROM selected_ids")
+                self._conn.executemany("INSERT OR IGNORE INTO selected_ids VALUES (?)", ((i,) for i in ticket_ids))
+                where = "WHERE r.ticket_id IN (SELECT ticket_id FROM selected_ids)"
+            tickets = pd.read_sql_query(
+                f"SELECT r.ticket_id, r.subject, r.sentiment, r.priority FROM results r {where} ORDER BY r.rowid",
+                self._conn,
+            )
+            if with_labels:
+                labels = pd.read_sql_query(
+                    f"SELECT r.ticket_id, j.value AS label FROM results r, json_each(r.labels) j {where}",
+                    self._conn,
+                )
+            else:
+                labels = pd.DataFrame({"ticket_id": [], "label": []})
+            self._conn.commit()
+        return tickets, labels
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stored = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            return {"stored": stored, **self._counts}
@@ -0,0 +1,148 @@
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+def quantized_index_path(persist_directory: str, collection_name: str) -> str:
+    return os.path.join(persist_directory, f"{collection_name}.quantized.npz")
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def reduce_dimensions(matrix: np.ndarray, dimensions: int) -> np.ndarray:
+    """
+    Truncate then renormalize. text-embedding-3 models are trained so that a
+    prefix of the vector is itself a usable embedding (what `dimensions=` does).
+    """
+    return normalize_rows(np.asarray(matrix)[..., :dimensions])
+
+def quantize(matrix: np.ndarray, mode: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Compress L2-normalized rows for storage. Returns (codes, scales):
+    float16 keeps no scales; int8 uses one symmetric scale per row.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if mode == "none":
+        return matrix, None
+    if mode == "float16":
+        return matrix.astype(np.float16), None
+    if mode == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unknown quantization mode {mode!r}")
+
+def approximate_scores(codes: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray,
+                       block_rows: int = 4096) -> np.ndarray:
+    """Inner products of a float32 query against quantized rows, upcasting one block at a time"""
+    scores = np.empty(codes.shape[0], dtype=np.float32)
+    for start in range(0, codes.shape[0], block_rows):
+        block = codes[start:start + block_rows]
+        scores[start:start + block_rows] = block.astype(np.float32, copy=False) @ query
+    if scales is not None:
+        scores *= scales
+    return scores
+
+class QuantizedIndex:
+    """
+    Compact in-memory search matrix with full-precision rescoring.
+
+    The quantized matrix picks `k * rescore_factor` candidates; their exact
+    scores come from `full_vectors_fn(ids)` (e.g. the float32 vectors Chroma
+    keeps on disk), so only a few full-precision rows are read per query.
+    It returns {id: vector} for the ids still stored; candidates missing
+    there (the matrix predates a build that deleted them) are dropped.
+    """
+
+    def __init__(self, ids: Sequence[str], codes: np.ndarray, scales: Optional[np.ndarray], mode: str, dimensions: int):
+        self.ids = list(ids)
+        self.codes = codes
+        self.scales = scales
+        self.mode = mode
+        self.dimensions = dimensions
+
+    @classmethod
+    def build(cls, ids: Sequence[str], vectors: np.ndarray, mode: str) -> "QuantizedIndex":
+        vectors = normalize_rows(vectors)
+        codes, scales = quantize(vectors, mode)
+        return cls(ids, codes, scales, mode, vectors.shape[1])
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[Tuple[Sequence[str], np.ndarray]], count: int, mode: str) -> "QuantizedIndex":
+        """
+        Build from (ids, vectors) pages into preallocated codes, so only one
+        page of float32 vectors is held at a time. `count` is an upper bound.
+        """
+        ids: List[str] = []
+        codes = scales = None
+        for page_ids, vectors in pages:
+            page_codes, page_scales = quantize(normalize_rows(vectors), mode)
+            if codes is None:
+                codes = np.empty((count, page_codes.shape[1]), dtype=page_codes.dtype)
+                scales = np.empty(count, dtype=np.float32) if page_scales is not None else None
+            start = len(ids)
+            codes[start:start + len(page_ids)] = page_codes
+            if scales is not None:
+                scales[start:start + len(page_ids)] = page_scales
+            ids.extend(page_ids)
+        if codes is None:
+            return cls([], np.zeros((0, 0), dtype=np.float32), None, mode, 0)
+        return cls(ids, codes[:len(ids)], scales[:len(ids)] if scales is not None else None, mode, codes.shape[1])
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def search(self, query, k: int = 4, rescore_factor: int = 4,
+               full_vectors_fn: Optional[Callable[[List[str]], Dict[str, Any]]] = None) -> List[Tuple[str, float]]:
+        if not self.ids:
+            return []
+        query = normalize_rows(np.asarray(query, dtype=np.float32)[None, :self.dimensions])[0]
+        scores = approximate_scores(self.codes, self.scales, query)
+        n_candidates = min(len(self.ids), k * rescore_factor if full_vectors_fn else k)
+        candidates = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+
+        if full_vectors_fn is not None and self.mode != "none":
+            stored = full_vectors_fn([self.ids[i] for i in candidates])
+            candidate_ids = [self.ids[i] for i in candidates if self.ids[i] in stored]
+            if not candidate_ids:
+                return []
+            full = normalize_rows(np.asarray([stored[i] for i in candidate_ids], dtype=np.float32)[:, :self.dimensions])
+            exact = full @ query
+            order = np.argsort(-exact)[:k]
+            return [(candidate_ids[i], float(exact[i])) for i in order]
+
+        order = candidates[np.argsort(-scores[candidates])][:k]
+        return [(self.ids[i], float(scores[i])) for i in order]
+
+    def save(self, path: str):
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            ids=np.array(self.ids, dtype=object),
+            codes=self.codes,
+            scales=self.scales if self.scales is not None else np.zeros(0, dtype=np.float32),
+            mode=np.array(self.mode),
+            dimensions=np.array(self.dimensions),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "QuantizedIndex":
+        data = np.load(path, allow_pickle=True)
+        scales = data["scales"] if data["scales"].size else None
+        return cls(data["ids"].tolist(), data["codes"], scales, str(data["mode"]), int(data["dimensions"]))
+
+def recall_at_k(exact: np.ndarray, approx: np.ndarray, k: int) -> float:
+    """Mean fraction of the exact top-k neighbours found in the approximate top-k"""
+    hits = [len(set(e[:k]) & set(a[:k])) / k for e, a in zip(exact, approx)]
+    return float(np.mean(hits)) if hits else 0.0
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, part, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(part, order, axis=1)
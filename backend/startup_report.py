@@ -0,0 +1,92 @@
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+import time
+
+# Imported in dependency order so each step is charged only for what it adds
+IMPORT_STEPS = [
+    ("dotenv", "dotenv"),
+    ("pydantic", "pydantic"),
+    ("numpy", "numpy"),
+    ("pandas", "pandas"),
+    ("langchain_core", "langchain_core.prompts"),
+    ("langgraph", "langgraph.graph"),
+    ("classification_cache", "services.classification_cache"),
+    ("micro_batcher", "services.micro_batcher"),
+    ("bm25_index", "services.bm25_index"),
+    ("mmap_index", "services.mmap_index"),
+    ("ticket_analytics", "services.ticket_analytics"),
+    ("chart_renderer", "services.chart_renderer"),
+    ("crawler", "services.crawler"),
+    ("graph", "graph"),
+    ("flask_app", "api"),
+    # Loaded by each chart_worker.py process, not by the API process
+    ("matplotlib (chart worker)", "matplotlib.figure"),
+]
+
+# State the backend writes: the stores open on first use, the chart cache at
+# import when CHART_CACHE_DIR is set. Redirected to a temp dir while timing.
+STATE_PATH_VARS = {
+    "CLASSIFICATION_CACHE_PATH": "classification_cache.sqlite3",
+    "TICKET_RESULTS_PATH": "ticket_results.sqlite3",
+    "BULK_JOBS_PATH": "bulk_jobs.sqlite3",
+    "CHART_CACHE_DIR": "chart_cache",
+}
+
+def isolate_state(directory: str):
+    """Point every store at `directory` so measuring leaves nothing behind"""
+    for var, name in STATE_PATH_VARS.items():
+        os.environ[var] = os.path.join(directory, name)
+
+def time_imports():
+    timings = []
+    for name, module in IMPORT_STEPS:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(module)
+            status = "ok"
+        except Exception as e:
+            status = f"failed: {e}"
+        timings.append((name, time.perf_counter() - start, status))
+    return timings
+
+def warm_components():
+    """Build the lazy components the first request would otherwise pay for"""
+    import graph
+    for getter in [graph.get_llm, graph.get_embeddings, graph.get_vector_store, graph.get_retriever,
+                   graph.get_structured_llm, graph.get_confidence_llm]:
+        try:
+            getter()
+        except Exception as e:
+            print(f"  {getter.__name__} failed: {e}")
+    return dict(graph.component_timings)
+
+def report(timings, total: float, warm: bool):
+    print("Import time by component:")
+    for name, seconds, status in timings:
+        print(f"  {name:<26} {seconds * 1000:8.1f} ms  {status}")
+    print(f"  {'total':<26} {total * 1000:8.1f} ms")
+
+    if warm:
+        print("\nLazy component initialization:")
+        for name, seconds in warm_components().items():
+            print(f"  {name:<26} {seconds * 1000:8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Break backend startup time down by component")
+    parser.add_argument("--warm", action="store_true",
+                        help="Also initialize the LLM, embeddings and vector store (needs API keys)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="startup_report-") as state_dir:
+        isolate_state(state_dir)
+        total_start = time.perf_counter()
+        timings = time_imports()
+        total = time.perf_counter() - total_start
+        report(timings, total, args.warm)
+
+if __name__ == "__main__":
+    sys.path.insert(0, ".")
+    main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+try:
+    from services.bm25_index import BM25Index, BM25Writer
+except ImportError:
+    from backend.services.bm25_index import BM25Index, BM25Writer
+
+TEXTS = {
+    "chunk-0": "Configure the snowflake-connector with a service account",
+    "chunk-1": "Lineage graph shows upstream columns",
+    "chunk-2": "Snowflake lineage is extracted from query history",
+    "chunk-3": "Reset a user password from the admin page",
+}
+
+class BM25WriterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def build(self, name, texts):
+        path = os.path.join(self.directory.name, name)
+        writer = BM25Writer(path)
+        writer.add(list(texts), list(texts.values()), [{"source": doc_id} for doc_id in texts])
+        writer.mark_complete()
+        return writer, BM25Index(path)
+
+    def ranked(self, index, query):
+        hits = index.search(query, k=10)
+        scores = dict(hits)
+        return [(doc_id, round(scores[row], 6)) for row, doc_id, _, _ in index.documents([row for row, _ in hits])]
+
+    def test_incremental_updates_match_fresh_build(self):
+        writer, index = self.build("incremental.sqlite3", TEXTS)
+        # A later build edits one chunk, deletes another and adds a new one
+        writer.remove(["chunk-3"])
+        writer.add(["chunk-1", "chunk-4"], ["Column lineage for dbt models", "Snowflake warehouse sizing"],
+                   [{"source": "chunk-1"}, {"source": "chunk-4"}])
+        writer.close()
+
+        expected = {k: v for k, v in TEXTS.items() if k not in ("chunk-1", "chunk-3")}
+        expected.update({"chunk-1": "Column lineage for dbt models", "chunk-4": "Snowflake warehouse sizing"})
+        fresh_writer, fresh = self.build("fresh.sqlite3", expected)
+        fresh_writer.close()
+
+        self.assertEqual(len(index), len(expected))
+        for query in ("snowflake lineage", "connector", "password", "dbt column"):
+            self.assertEqual(self.ranked(index, query), self.ranked(fresh, query), query)
+        self.assertEqual(self.ranked(index, "password"), [])
+
+    def test_reopened_index_keeps_completion(self):
+        writer, _ = self.build("index.sqlite3", TEXTS)
+        writer.close()
+        reopened = BM25Writer(os.path.join(self.directory.name, "index.sqlite3"))
+        self.assertTrue(reopened.complete)
+        self.assertEqual(len(reopened), len(TEXTS))
+        reopened.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.documents import Document
+
+try:
+    from services.crawler import crawl
+except ImportError:
+    from backend.services.crawler import crawl
+
+PAGE_TEXT = "Static documentation text long enough to count as a real page. " * 10
+JS_SHELL = "<html><head><title>App</title></head><body><div id=\"root\"></div></body></html>"
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """/page/<n> serves static HTML, /js/<n> a client-rendered shell; both answer 304 to a matching ETag"""
+
+    def do_GET(self):
+        site = self.server.site
+        with site["lock"]:
+            site["in_flight"] += 1
+            site["max_in_flight"] = max(site["max_in_flight"], site["in_flight"])
+            site["conditional"] += 1 if self.headers.get("If-None-Match") else 0
+        try:
+            time.sleep(site["latency"])
+            etag = f'"{self.path}-v1"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            if self.path.startswith("/js/"):
+                body = JS_SHELL
+            else:
+                body = f"<html><head><title>{self.path}</title></head><body><main>{PAGE_TEXT}</main></body></html>"
+            payload = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with site["lock"]:
+                site["in_flight"] -= 1
+
+    def log_message(self, *args):
+        pass
+
+class CrawlerTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), SiteHandler)
+        self.server.site = {"lock": threading.Lock(), "in_flight": 0, "max_in_flight": 0, "conditional": 0,
+                            "latency": 0.02}
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.rendered = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.cache_dir.cleanup()
+
+    def js_loader(self, urls):
+        self.rendered.extend(urls)
+        return [Document(page_content=f"Rendered {url}", metadata={"source": url, "title": "App"}) for url in urls]
+
+    def crawl(self, urls, **kwargs):
+        kwargs.setdefault("max_workers", 8)
+        kwargs.setdefault("per_host", 4)
+        return crawl(urls, delay=0.0, cache_dir=self.cache_dir.name, js_loader=self.js_loader, **kwargs)
+
+    def test_second_crawl_is_conditional(self):
+        urls = [f"{self.base}/page/{i}" for i in range(10)]
+        docs, stats = self.crawl(urls)
+        self.assertEqual(stats["fetched"], 10)
+        self.assertEqual(self.server.site["conditional"], 0)
+
+        again, stats = self.crawl(urls)
+        self.assertEqual(stats["not_modified"], 10)
+        self.assertEqual(stats["fetched"], 0)
+        self.assertEqual(self.server.site["conditional"], 10)
+        self.assertEqual(sorted(d.page_content for d in again), sorted(d.page_content for d in docs))
+
+    def test_per_host_limit(self):
+        urls = [f"{self.base}/page/{i}" for i in range(16)]
+        _, stats = self.crawl(urls, max_workers=8, per_host=2)
+        self.assertEqual(stats["fetched"], 16)
+        self.assertLessEqual(self.server.site["max_in_flight"], 2)
+
+    def test_reports_pages_per_second(self):
+        urls = [f"{self.base}/page/{i}" for i in range(8)]
+        docs, stats = self.crawl(urls)
+        self.assertEqual(stats["pages"], len(docs))
+        self.assertEqual(stats["pages"], 8)
+        self.assertGreater(stats["pages_per_second"], 0.0)
+
+    def test_rendered_pages_are_revalidated(self):
+        urls = [f"{self.base}/js/{i}" for i in range(3)]
+        docs, stats = self.crawl(urls)
+        self.assertEqual(stats["needs_js"], 3)
+        self.assertEqual(sorted(self.rendered), sorted(urls))
+
+        self.rendered.clear()
+        again, stats = self.crawl(urls)
+        self.assertEqual(stats["not_modified"], 3)
+        self.assertEqual(self.rendered, [])
+        self.assertEqual(sorted(d.page_content for d in again), sorted(d.page_content for d in docs))
+
+if __name__ == "__main__":
+    unittest.main()
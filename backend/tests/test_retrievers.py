@@ -0,0 +1,100 @@
+import sqlite3
+import tempfile
+import unittest
+import zlib
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    from services.embedding_profile import EmbeddingProfile
+    from services.mmap_index import write_mmap_index
+    from services.retrievers import ChromaRetriever, MmapRetriever, open_chroma
+    from services.vector_quant import QuantizedIndex, quantized_index_path
+except ImportError:
+    from backend.services.embedding_profile import EmbeddingProfile
+    from backend.services.mmap_index import write_mmap_index
+    from backend.services.retrievers import ChromaRetriever, MmapRetriever, open_chroma
+    from backend.services.vector_quant import QuantizedIndex, quantized_index_path
+
+DIMENSIONS = 32
+
+class WordEmbeddings(Embeddings):
+    """Deterministic bag-of-words vectors, so searches need no API key"""
+
+    def _embed(self, text):
+        vector = np.zeros(DIMENSIONS, dtype=np.float32)
+        for word in text.lower().split():
+            vector[zlib.crc32(word.encode("utf-8")) % DIMENSIONS] += 1.0
+        return (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+class ChromaRetrieverTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.profile = EmbeddingProfile(model="test", quantization="int8", rescore_factor=4)
+        self.store = open_chroma(self.profile, WordEmbeddings(), self.directory.name)
+        texts = [f"snowflake connector setup step {i}" for i in range(6)] + \
+                [f"lineage graph shows column {i}" for i in range(6)]
+        self.ids = [f"chunk-{i}" for i in range(len(texts))]
+        self.store.add_texts(texts, metadatas=[{"source": f"page-{i}"} for i in range(len(texts))], ids=self.ids)
+
+        # What build_index exports after a build
+        records = self.store.get(include=["embeddings"])
+        index = QuantizedIndex.build(records["ids"], np.asarray(records["embeddings"]), self.profile.quantization)
+        index.save(quantized_index_path(self.directory.name, self.profile.collection_name()))
+        self.retriever = ChromaRetriever(lambda: self.store, self.profile, self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_search_after_chunk_deleted_from_chroma(self):
+        query = WordEmbeddings().embed_query("snowflake connector setup step 0")
+        self.assertEqual(self.retriever.search_by_vector(query, k=1)[0].id, "chunk-0")
+
+        # An incremental build deleted the chunk but has not re-exported the matrix yet
+        self.store.delete(ids=["chunk-0"])
+        docs = self.retriever.search_by_vector(query, k=4)
+        self.assertEqual(len(docs), 4)
+        self.assertNotIn("chunk-0", [d.id for d in docs])
+        self.assertTrue(all(d.id.startswith("chunk-") for d in docs))
+        scores = [d.metadata["score"] for d in docs]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+class MmapRetrieverTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        texts = [f"snowflake connector setup step {i}" for i in range(6)] + \
+                [f"lineage graph shows column {i}" for i in range(6)]
+        self.ids = [f"chunk-{i}" for i in range(len(texts))]
+        vectors = np.asarray(WordEmbeddings().embed_documents(texts), dtype=np.float32)
+        write_mmap_index(self.directory.name, "docs", self.ids, vectors, texts, [{}] * len(texts))
+        self.retriever = MmapRetriever(self.directory.name, "docs")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_scores_follow_rows_when_a_row_is_missing(self):
+        query = WordEmbeddings().embed_query("snowflake connector setup step 0")
+        expected = {d.id: d.metadata["score"] for d in self.retriever.search_by_vector(query, k=4)}
+        top = max(expected, key=expected.get)
+
+        index = self.retriever._index.get()
+        conn = sqlite3.connect(index.docs_path)
+        conn.execute("DELETE FROM docs WHERE id = ?", (top,))
+        conn.commit()
+        conn.close()
+
+        docs = self.retriever.search_by_vector(query, k=4)
+        self.assertEqual(len(docs), 3)
+        self.assertNotIn(top, [d.id for d in docs])
+        for doc in docs:
+            self.assertAlmostEqual(doc.metadata["score"], expected[doc.id])
+
+if __name__ == "__main__":
+    unittest.main()
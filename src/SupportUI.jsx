@@ -87,7 +87,7 @@ const SupportDashboard = () => {
         if (response.ok) {
           const data = await response.json();
           const results = data?.results || [];
-          const mapped = results.map(r => ({
+          const mapped = results.filter(r => r.classification).map(r => ({
             id: r.id || Math.random().toString(36).slice(2),
             subject: (r.classification?.original_question || '').split('\n')[0],
             body: (r.classification?.original_question || ''),